@@ -0,0 +1,5 @@
+"""Benchmarks of MNE-Python, run with airspeed velocity (asv)
+
+See README.rst. The data are generated synthetically, so the benchmarks
+run offline.
+"""
@@ -0,0 +1,85 @@
+"""Synthetic data for the benchmarks, so that they run offline
+"""
+
+# License: BSD (3-clause)
+
+import numpy as np
+from scipy import sparse
+
+from mne import create_info, SourceEstimate, EpochsArray
+from mne.io import RawArray
+
+
+def make_info(n_channels, sfreq, stim=False):
+    """Make the measurement info of EEG channels (and a stim channel)
+
+    The data are unfiltered, as the filtering and covariance functions
+    expect it to be stated in the info.
+    """
+    ch_names = ['EEG %03d' % (ii + 1) for ii in range(n_channels)]
+    ch_types = ['eeg'] * n_channels
+    if stim:
+        ch_names.append('STI 014')
+        ch_types.append('stim')
+    info = create_info(ch_names, sfreq, ch_types)
+    info['highpass'], info['lowpass'] = 0., sfreq / 2.
+    return info
+
+
+def make_raw(n_channels=60, duration=60., sfreq=1000., seed=0):
+    """Make Raw data with an event every second in the stim channel"""
+    rng = np.random.RandomState(seed)
+    n_times = int(duration * sfreq)
+    data = np.zeros((n_channels + 1, n_times))
+    data[:-1] = rng.randn(n_channels, n_times) * 1e-5
+    event_times = np.arange(int(sfreq) // 2, n_times, int(sfreq))
+    data[-1, event_times] = 1 + np.arange(len(event_times)) % 2
+    return RawArray(data, make_info(n_channels, sfreq, stim=True),
+                    verbose=False)
+
+
+def make_epochs(n_epochs=100, n_channels=60, n_times=500, sfreq=500.,
+                seed=0):
+    """Make EpochsArray of white noise"""
+    rng = np.random.RandomState(seed)
+    data = rng.randn(n_epochs, n_channels, n_times) * 1e-5
+    events = np.c_[np.arange(n_epochs) * n_times, np.zeros(n_epochs, int),
+                   np.ones(n_epochs, int)]
+    return EpochsArray(data, make_info(n_channels, sfreq), events,
+                       tmin=-0.2, event_id=dict(stim=1), verbose=False)
+
+
+def make_source_space(n_side=40):
+    """Make the vertices and triangles of two flat hemispheres
+
+    Each hemisphere is a triangulated n_side x n_side grid, which stands
+    for a source space without requiring FreeSurfer surfaces.
+    """
+    idx = np.arange(n_side * n_side).reshape(n_side, n_side)
+    upper = np.c_[idx[:-1, :-1].ravel(), idx[:-1, 1:].ravel(),
+                  idx[1:, :-1].ravel()]
+    lower = np.c_[idx[:-1, 1:].ravel(), idx[1:, 1:].ravel(),
+                  idx[1:, :-1].ravel()]
+    tris = np.r_[upper, lower]
+    n_vertices = n_side * n_side
+    vertices = [np.arange(n_vertices), np.arange(n_vertices)]
+    tris = np.r_[tris, tris + n_vertices]  # both hemispheres
+    return vertices, tris
+
+
+def make_stc(vertices, n_times=100, seed=0):
+    """Make a SourceEstimate of white noise"""
+    rng = np.random.RandomState(seed)
+    n_vertices = sum(len(v) for v in vertices)
+    return SourceEstimate(rng.randn(n_vertices, n_times), vertices,
+                          tmin=0., tstep=1e-3, subject='sample')
+
+
+def make_morph_matrix(vertices_from, n_to, seed=0):
+    """Make a sparse morph matrix, averaging 6 random sources per vertex"""
+    rng = np.random.RandomState(seed)
+    n_from = sum(len(v) for v in vertices_from)
+    rows = np.repeat(np.arange(n_to), 6)
+    cols = rng.randint(0, n_from, len(rows))
+    return sparse.csr_matrix((np.ones(len(rows)) / 6., (rows, cols)),
+                             shape=(n_to, n_from))
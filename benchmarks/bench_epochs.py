@@ -0,0 +1,53 @@
+"""Benchmarks of extracting epochs and computing covariances
+"""
+
+# License: BSD (3-clause)
+
+from mne import Epochs, find_events, compute_covariance
+
+from ._data import make_raw, make_epochs
+
+
+class EpochsExtraction(object):
+    """Extract 60 epochs of 700 ms from 60 s of raw data"""
+    params = [False, True]
+    param_names = ['preload']
+
+    def setup(self, preload):
+        self.raw = make_raw()
+        self.events = find_events(self.raw, verbose=False)
+
+    def _epochs(self, preload):
+        return Epochs(self.raw, self.events, None, -0.2, 0.5,
+                      preload=preload, add_eeg_ref=False, verbose=False)
+
+    def time_epochs(self, preload):
+        self._epochs(preload).get_data()
+
+    def peakmem_epochs(self, preload):
+        self._epochs(preload).get_data()
+
+    def time_reject(self, preload):
+        epochs = Epochs(self.raw, self.events, None, -0.2, 0.5,
+                        reject=dict(eeg=40e-6), preload=preload,
+                        add_eeg_ref=False, verbose=False)
+        epochs.drop_bad_epochs()
+
+    def time_average(self, preload):
+        self._epochs(preload).average()
+
+
+class Covariance(object):
+    """Estimate the covariance of 100 epochs of 60 channels"""
+    params = ['empirical', 'shrunk']
+    param_names = ['method']
+    timeout = 300
+
+    def setup(self, method):
+        self.epochs = make_epochs()
+
+    def time_compute_covariance(self, method):
+        compute_covariance(self.epochs, method=method, verbose=False)
+
+    def peakmem_compute_covariance(self, method):
+        compute_covariance(self.epochs, method=method, verbose=False)
@@ -0,0 +1,34 @@
+"""Benchmarks of filtering and resampling
+"""
+
+# License: BSD (3-clause)
+
+from ._data import make_raw
+
+
+class RawFiltering(object):
+    """Filter 60 s of 60 channels sampled at 1 kHz"""
+    params = [1, 4]
+    param_names = ['n_jobs']
+
+    def setup(self, n_jobs):
+        self.raw = make_raw()
+
+    def time_band_pass(self, n_jobs):
+        self.raw.filter(1., 40., n_jobs=n_jobs, verbose=False)
+
+    def peakmem_band_pass(self, n_jobs):
+        self.raw.filter(1., 40., n_jobs=n_jobs, verbose=False)
+
+    def time_band_pass_iir(self, n_jobs):
+        self.raw.filter(1., 40., n_jobs=n_jobs, method='iir', verbose=False)
+
+    def time_filter_bank(self, n_jobs):
+        self.raw.filter_bank([(4., 8.), (8., 12.), (13., 30.)],
+                             n_jobs=n_jobs, verbose=False)
+
+    def time_notch(self, n_jobs):
+        self.raw.notch_filter([50., 100.], n_jobs=n_jobs, verbose=False)
+
+    def time_resample(self, n_jobs):
+        self.raw.copy().resample(250., n_jobs=n_jobs, verbose=False)
@@ -0,0 +1,37 @@
+"""Benchmarks of reading raw FIF data
+"""
+
+# License: BSD (3-clause)
+
+import os.path as op
+import shutil
+import tempfile
+
+from mne.io import Raw
+
+from ._data import make_raw
+
+
+class RawReading(object):
+    """Read 60 s of 60 channels sampled at 1 kHz"""
+    def setup(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.fname = op.join(self.tempdir, 'bench_raw.fif')
+        make_raw().save(self.fname, verbose=False)
+
+    def teardown(self):
+        shutil.rmtree(self.tempdir)
+
+    def time_open(self):
+        Raw(self.fname, verbose=False)
+
+    def time_preload(self):
+        Raw(self.fname, preload=True, verbose=False)
+
+    def peakmem_preload(self):
+        Raw(self.fname, preload=True, verbose=False)
+
+    def time_segments(self):
+        raw = Raw(self.fname, verbose=False)
+        for start in range(0, raw.n_times - 1000, 1000):
+            raw[:, start:start + 1000]
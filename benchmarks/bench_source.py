@@ -0,0 +1,51 @@
+"""Benchmarks of source space statistics and morphing
+"""
+
+# License: BSD (3-clause)
+
+import numpy as np
+
+from mne import morph_data_precomputed, spatial_tris_connectivity
+from mne.stats import spatio_temporal_cluster_1samp_test
+
+from ._data import make_source_space, make_stc, make_morph_matrix
+
+
+class ClusterTest(object):
+    """Spatio-temporal cluster test of 10 subjects on 2 x 400 sources"""
+    params = [1, 4]
+    param_names = ['n_jobs']
+    timeout = 300
+
+    def setup(self, n_jobs):
+        vertices, tris = make_source_space(n_side=20)
+        self.connectivity = spatial_tris_connectivity(tris, verbose=False)
+        rng = np.random.RandomState(0)
+        n_vertices = sum(len(v) for v in vertices)
+        self.X = rng.randn(10, 20, n_vertices)
+        self.X[:, 5:10, :50] += 1.
+
+    def time_spatio_temporal_cluster_1samp_test(self, n_jobs):
+        spatio_temporal_cluster_1samp_test(
+            self.X, threshold=3., n_permutations=64,
+            connectivity=self.connectivity, n_jobs=n_jobs, seed=0,
+            verbose=False)
+
+    def peakmem_spatio_temporal_cluster_1samp_test(self, n_jobs):
+        spatio_temporal_cluster_1samp_test(
+            self.X, threshold=3., n_permutations=64,
+            connectivity=self.connectivity, n_jobs=n_jobs, seed=0,
+            verbose=False)
+
+
+class Morphing(object):
+    """Morph 100 time points from 2 x 1600 to 2 x 2500 sources"""
+    def setup(self):
+        vertices, _ = make_source_space(n_side=40)
+        self.stc = make_stc(vertices)
+        self.vertices_to = [np.arange(2500), np.arange(2500)]
+        self.morph_mat = make_morph_matrix(vertices, 5000)
+
+    def time_morph_data_precomputed(self):
+        morph_data_precomputed('sample', 'fsaverage', self.stc,
+                               self.vertices_to, self.morph_mat)
@@ -0,0 +1,51 @@
+"""Benchmarks of time-frequency analysis and connectivity
+"""
+
+# License: BSD (3-clause)
+
+import numpy as np
+
+from mne.time_frequency import tfr_morlet
+from mne.connectivity import spectral_connectivity
+
+from ._data import make_epochs
+
+
+class TimeFrequency(object):
+    """Compute the TFR of 50 epochs of 30 channels"""
+    params = [False, True]
+    param_names = ['use_fft']
+
+    def setup(self, use_fft):
+        self.epochs = make_epochs(n_epochs=50, n_channels=30)
+        self.freqs = np.arange(6., 40., 2.)
+
+    def time_tfr_morlet(self, use_fft):
+        tfr_morlet(self.epochs, self.freqs, n_cycles=self.freqs / 2.,
+                   use_fft=use_fft)
+
+    def peakmem_tfr_morlet(self, use_fft):
+        tfr_morlet(self.epochs, self.freqs, n_cycles=self.freqs / 2.,
+                   use_fft=use_fft)
+
+
+class Connectivity(object):
+    """Compute the coherence between 30 channels over 50 epochs"""
+    params = ['multitaper', 'cwt_morlet']
+    param_names = ['mode']
+    timeout = 300
+
+    def setup(self, mode):
+        self.epochs = make_epochs(n_epochs=50, n_channels=30)
+
+    def time_spectral_connectivity(self, mode):
+        spectral_connectivity(self.epochs, method=['coh', 'pli'], mode=mode,
+                              fmin=8., fmax=30.,
+                              cwt_frequencies=np.arange(8., 30., 4.),
+                              verbose=False)
+
+    def peakmem_spectral_connectivity(self, mode):
+        spectral_connectivity(self.epochs, method=['coh', 'pli'], mode=mode,
+                              fmin=8., fmax=30.,
+                              cwt_frequencies=np.arange(8., 30., 4.),
+                              verbose=False)
@@ -19,84 +19,129 @@
 
 __version__ = '0.9.dev'
 
+import sys
+
 # have to import verbose first since it's needed by many things
 from .utils import (set_log_level, set_log_file, verbose, set_config,
                     get_config, get_config_path, set_cache_dir,
-                    set_memmap_min_size)
-from .io.pick import (pick_types, pick_channels, pick_types_evoked,
-                      pick_channels_regexp, pick_channels_forward,
-                      pick_types_forward, pick_channels_cov,
-                      pick_channels_evoked, pick_info)
-from .io.base import concatenate_raws, get_chpi_positions
-from .io.meas_info import create_info
-from .cov import (read_cov, write_cov, Covariance,
-                  compute_covariance, compute_raw_data_covariance,
-                  whiten_evoked)
-from .event import (read_events, write_events, find_events, merge_events,
-                    pick_events, make_fixed_length_events, concatenate_events,
-                    find_stim_steps)
-from .forward import (read_forward_solution, apply_forward, apply_forward_raw,
-                      do_forward_solution, average_forward_solutions,
-                      write_forward_solution, make_forward_solution,
-                      convert_forward_solution, make_field_map)
-from .source_estimate import (read_source_estimate, MixedSourceEstimate,
-                              SourceEstimate, VolSourceEstimate, morph_data,
-                              morph_data_precomputed, compute_morph_matrix,
-                              grade_to_tris, grade_to_vertices,
-                              spatial_src_connectivity,
-                              spatial_tris_connectivity,
-                              spatial_dist_connectivity,
-                              spatio_temporal_src_connectivity,
-                              spatio_temporal_tris_connectivity,
-                              spatio_temporal_dist_connectivity,
-                              save_stc_as_volume, extract_label_time_course)
-from .surface import (read_bem_surfaces, read_surface, write_bem_surface,
-                      write_surface, decimate_surface, read_morph_map,
-                      read_bem_solution, get_head_surf,
-                      get_meg_helmet_surf)
-from .source_space import (read_source_spaces, vertex_to_mni,
-                           write_source_spaces, setup_source_space,
-                           setup_volume_source_space, SourceSpaces,
-                           add_source_space_distances,
-                           get_volume_labels_from_aseg)
-from .epochs import Epochs, EpochsArray, read_epochs
-from .evoked import (Evoked, EvokedArray, read_evokeds, write_evokeds,
-                     grand_average, combine_evoked)
-from .label import (label_time_courses, read_label, label_sign_flip,
-                    write_label, stc_to_label, grow_labels, Label, split_label,
-                    BiHemiLabel, read_labels_from_annot, write_labels_to_annot)
-from .misc import parse_config, read_reject_parameters
-from .coreg import (create_default_subject, scale_bem, scale_mri, scale_labels,
-                    scale_source_space)
-from .transforms import (transform_coordinates, read_trans, write_trans,
-                         transform_surface_to)
-from .proj import (read_proj, write_proj, compute_proj_epochs,
-                   compute_proj_evoked, compute_proj_raw, sensitivity_map)
-from .selection import read_selection
-from .dipole import read_dip
-from . import channels
-from .channels import equalize_channels, rename_channels, find_layout
-
-from . import beamformer
-from . import commands
-from . import connectivity
-from . import coreg
-from . import cuda
-from . import datasets
-from . import epochs
-from . import externals
+                    set_memmap_min_size, set_memory_limit, set_num_threads,
+                    _start_config_profiler)
+
+# mne.io is imported eagerly: it is the root of the import cycles between
+# mne.io.base and mne.event, mne.channels, mne.epochs, etc., which only
+# resolve when mne.io is imported first
 from . import io
-from . import filter
-from . import gui
-from . import layouts
-from . import minimum_norm
-from . import preprocessing
-from . import simulation
-from . import stats
-from . import time_frequency
-from . import viz
-from . import decoding
-from . import realtime
+
+# The rest of the namespace is imported on first access (see __getattr__),
+# so that "import mne" does not import matplotlib, the forward and inverse
+# modules, etc. The submodules are listed in the order of their
+# dependencies, which is the order of the imports on Python < 3.7.
+# There, the functions below and _eager_submodules are imported, as
+# before, and the other submodules are only available once imported.
+_lazy_functions = [
+    ('io.pick', ['pick_types', 'pick_channels', 'pick_types_evoked',
+                 'pick_channels_regexp', 'pick_channels_forward',
+                 'pick_types_forward', 'pick_channels_cov',
+                 'pick_channels_evoked', 'pick_info']),
+    ('io.base', ['concatenate_raws', 'get_chpi_positions']),
+    ('io.meas_info', ['create_info']),
+    ('cov', ['read_cov', 'write_cov', 'Covariance', 'compute_covariance',
+             'compute_raw_data_covariance', 'whiten_evoked']),
+    ('event', ['read_events', 'write_events', 'find_events', 'merge_events',
+               'pick_events', 'make_fixed_length_events',
+               'concatenate_events', 'find_stim_steps', 'Events']),
+    ('forward', ['read_forward_solution', 'apply_forward',
+                 'apply_forward_raw', 'do_forward_solution',
+                 'average_forward_solutions', 'write_forward_solution',
+                 'make_forward_solution', 'convert_forward_solution',
+                 'make_field_map']),
+    ('source_estimate', ['read_source_estimate', 'MixedSourceEstimate',
+                         'SourceEstimate', 'VolSourceEstimate', 'morph_data',
+                         'morph_data_precomputed', 'compute_morph_matrix',
+                         'grade_to_tris', 'grade_to_vertices',
+                         'spatial_src_connectivity',
+                         'spatial_tris_connectivity',
+                         'spatial_dist_connectivity',
+                         'spatio_temporal_src_connectivity',
+                         'spatio_temporal_tris_connectivity',
+                         'spatio_temporal_dist_connectivity',
+                         'save_stc_as_volume', 'extract_label_time_course']),
+    ('surface', ['read_bem_surfaces', 'read_surface', 'write_bem_surface',
+                 'write_surface', 'decimate_surface', 'read_morph_map',
+                 'read_bem_solution', 'get_head_surf',
+                 'get_meg_helmet_surf']),
+    ('source_space', ['read_source_spaces', 'vertex_to_mni',
+                      'write_source_spaces', 'setup_source_space',
+                      'setup_volume_source_space', 'SourceSpaces',
+                      'add_source_space_distances',
+                      'get_volume_labels_from_aseg']),
+    ('epochs', ['Epochs', 'EpochsArray', 'read_epochs']),
+    ('evoked', ['Evoked', 'EvokedArray', 'read_evokeds', 'write_evokeds',
+                'grand_average', 'combine_evoked']),
+    ('label', ['label_time_courses', 'read_label', 'label_sign_flip',
+               'write_label', 'stc_to_label', 'grow_labels', 'Label',
+               'split_label', 'BiHemiLabel', 'read_labels_from_annot',
+               'write_labels_to_annot']),
+    ('misc', ['parse_config', 'read_reject_parameters']),
+    ('coreg', ['create_default_subject', 'scale_bem', 'scale_mri',
+               'scale_labels', 'scale_source_space']),
+    ('transforms', ['transform_coordinates', 'read_trans', 'write_trans',
+                    'transform_surface_to']),
+    ('proj', ['read_proj', 'write_proj', 'compute_proj_epochs',
+              'compute_proj_evoked', 'compute_proj_raw', 'sensitivity_map']),
+    ('selection', ['read_selection']),
+    ('dipole', ['read_dip']),
+    ('channels', ['equalize_channels', 'rename_channels', 'find_layout']),
+]
+_lazy_names = dict((name, module) for module, names in _lazy_functions
+                   for name in names)
+_submodules = ['channels', 'baseline', 'beamformer', 'cache', 'commands',
+               'connectivity', 'coreg', 'cov', 'cuda', 'datasets', 'dipole',
+               'epochs', 'event', 'evoked', 'externals', 'fft', 'filter',
+               'fixes', 'forward', 'gui', 'inverse_sparse', 'io', 'label',
+               'layouts', 'minimum_norm', 'misc', 'parallel',
+               'preprocessing', 'proj', 'selection', 'simulation',
+               'source_estimate', 'source_space', 'stats', 'surface',
+               'time_frequency', 'transforms', 'viz', 'decoding',
+               'realtime', 'report']
+_eager_submodules = ['channels', 'beamformer', 'commands', 'connectivity',
+                     'coreg', 'cuda', 'datasets', 'epochs', 'externals',
+                     'io', 'filter', 'gui', 'layouts', 'minimum_norm',
+                     'preprocessing', 'simulation', 'stats',
+                     'time_frequency', 'viz', 'decoding', 'realtime']
+
+
+def _import_submodule(name):
+    """Import a submodule of mne (importlib is not available on Python 2.6)
+    """
+    name = '%s.%s' % (__name__, name)
+    __import__(name)
+    return sys.modules[name]
+
+
+def __getattr__(name):
+    """Import a submodule or a public function on first access"""
+    if name in _lazy_names:
+        value = getattr(_import_submodule(_lazy_names[name]), name)
+    elif name in _submodules:
+        value = _import_submodule(name)
+    else:
+        raise AttributeError('module %r has no attribute %r'
+                             % (__name__, name))
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_names) | set(_submodules))
+
+
+if sys.version_info < (3, 7):  # modules cannot define __getattr__
+    for _module, _names in _lazy_functions:
+        for _name in _names:
+            __getattr__(_name)
+    for _name in _eager_submodules:
+        __getattr__(_name)
 
 # initialize logging
 set_log_level(None, False)
@@ -104,4 +149,8 @@ set_log_file()
 
 # initialize CUDA
 if get_config('MNE_USE_CUDA', 'false').lower() == 'true':
+    from . import cuda
     cuda.init_cuda()
+
+# profile the session, if requested
+_start_config_profiler()
@@ -89,14 +89,17 @@ def _triage_write(key, value, root, comp_kw, where):
         _create_titled_dataset(root, key, title, value, comp_kw)
     elif isinstance(value, np.ndarray):
         _create_titled_dataset(root, key, 'ndarray', value)
-    elif isinstance(value, sparse.csc_matrix):
-        sub_root = _create_titled_group(root, key, 'csc_matrix')
+    elif isinstance(value, (sparse.csc_matrix, sparse.csr_matrix)):
+        title = value.getformat() + '_matrix'
+        sub_root = _create_titled_group(root, key, title)
         _triage_write('data', value.data, sub_root, comp_kw,
-                      where + '.csc_matrix_data')
+                      where + '.%s_data' % title)
         _triage_write('indices', value.indices, sub_root, comp_kw,
-                      where + '.csc_matrix_indices')
+                      where + '.%s_indices' % title)
         _triage_write('indptr', value.indptr, sub_root, comp_kw,
-                      where + '.csc_matrix_indptr')
+                      where + '.%s_indptr' % title)
+        _triage_write('shape', np.array(value.shape), sub_root, comp_kw,
+                      where + '.%s_shape' % title)
     else:
         raise TypeError('unsupported type %s (in %s)' % (type(value), where))
 
@@ -149,10 +152,14 @@ def _triage_read(node):
             assert len(data) == ii
             data = tuple(data) if type_str == 'tuple' else data
             return data
-        elif type_str == 'csc_matrix':
-            data = sparse.csc_matrix((_triage_read(node['data']),
-                                      _triage_read(node['indices']),
-                                      _triage_read(node['indptr'])))
+        elif type_str in ('csc_matrix', 'csr_matrix'):
+            klass = getattr(sparse, type_str)
+            shape = None  # not written by older versions
+            if 'shape' in node:
+                shape = tuple(_triage_read(node['shape']))
+            data = klass((_triage_read(node['data']),
+                          _triage_read(node['indices']),
+                          _triage_read(node['indptr'])), shape=shape)
         else:
             raise NotImplementedError('Unknown group type: {0}'
                                       ''.format(type_str))
@@ -0,0 +1,249 @@
+"""On-disk memoization of deterministic computations
+"""
+
+# License: BSD (3-clause)
+
+import glob
+import inspect
+import os
+from os import path as op
+import tempfile
+
+from .externals.decorator import decorator
+from .externals.six import string_types
+from .utils import (logger, get_config, get_config_path, object_hash,
+                    sizeof_fmt, _size_to_bytes, _file_identity)
+
+
+def _get_memoize_dir():
+    """Get the directory of the memoized results, creating it if needed
+
+    It is "memoize" in MNE_CACHE_DIR if set, otherwise next to the config.
+    """
+    cache_dir = get_config('MNE_CACHE_DIR', None)
+    if cache_dir is None:
+        cache_dir = op.dirname(get_config_path())
+    memoize_dir = op.join(cache_dir, 'memoize')
+    if not op.isdir(memoize_dir):
+        os.makedirs(memoize_dir)
+    return memoize_dir
+
+
+def _get_fiff_io():
+    """Get the classes stored as FIFF, with their extension, writer, reader"""
+    from .cov import Covariance, write_cov, read_cov
+    from .forward import Forward, write_forward_solution, read_forward_solution
+    from .minimum_norm.inverse import (InverseOperator, write_inverse_operator,
+                                       read_inverse_operator)
+    from .source_space import (SourceSpaces, write_source_spaces,
+                               read_source_spaces)
+    return [(Forward, '-fwd.fif', write_forward_solution,
+             read_forward_solution),
+            (InverseOperator, '-inv.fif', write_inverse_operator,
+             read_inverse_operator),
+            (Covariance, '-cov.fif', write_cov, read_cov),
+            (SourceSpaces, '-src.fif', write_source_spaces,
+             read_source_spaces)]
+
+
+def _quiet_call(function, *args, **kwargs):
+    """Call a reader or writer with verbose=False if it takes verbose
+
+    The keyword arguments that the function does not take are ignored.
+    """
+    arg_names = inspect.getargspec(function).args
+    kwargs = dict((key, value) for key, value in kwargs.items()
+                  if key in arg_names)
+    if 'verbose' in arg_names:
+        kwargs['verbose'] = False
+    return function(*args, **kwargs)
+
+
+def _read_result(fname):
+    """Read a memoized result"""
+    from ._hdf5 import read_hdf5
+    for _, ext, _, read in _get_fiff_io():
+        if fname.endswith(ext):
+            return _quiet_call(read, fname)
+    return read_hdf5(fname)
+
+
+def _write_result(fname, value):
+    """Write a memoized result, return False if it cannot be written
+
+    The result is written to a hidden temporary file that is then renamed,
+    so that concurrent processes never read a partially written file.
+    """
+    from ._hdf5 import write_hdf5
+    for klass, ext, write, _ in _get_fiff_io():
+        if isinstance(value, klass):
+            break
+    else:
+        ext, write = '.h5', None
+    fd, tmp_fname = tempfile.mkstemp(prefix='.', suffix=ext,
+                                     dir=op.dirname(fname))
+    os.close(fd)
+    try:
+        if write is None:
+            write_hdf5(tmp_fname, value, overwrite=True)
+        else:
+            # the temporary file exists already
+            _quiet_call(write, tmp_fname, value, overwrite=True)
+        os.rename(tmp_fname, fname + ext)
+    except (ImportError, TypeError, IOError, OSError) as exp:
+        # no h5py, unsupported type, file cannot be written
+        logger.info('The result cannot be memoized (%s)' % exp)
+        return False
+    finally:
+        if op.isfile(tmp_fname):
+            os.remove(tmp_fname)
+    return True
+
+
+def _get_function_code(function):
+    """Get the source code of a function, or its bytecode and constants"""
+    try:
+        return inspect.getsource(function)
+    except (IOError, TypeError):  # source not available
+        code = function.__code__
+        consts = [repr(c) for c in code.co_consts
+                  if not inspect.iscode(c)]  # nested code has its address
+        return [code.co_code, consts]
+
+
+def _get_key(function, args, kwargs, ignore):
+    """Hash the code of the function, its arguments and the MNE version
+
+    Files passed by name are identified by their name, size and
+    modification time.
+    """
+    from . import __version__
+    call_args = inspect.getcallargs(function, *args, **kwargs)
+    for name in ignore:
+        call_args.pop(name, None)
+    for name, value in call_args.items():
+        if isinstance(value, string_types) and op.isfile(value):
+            call_args[name] = _file_identity(value)
+    return object_hash([function.__module__, function.__name__,
+                        _get_function_code(function), __version__,
+                        call_args])
+
+
+def _evict(memoize_dir, max_size):
+    """Remove the least recently used results above max_size bytes
+
+    The files removed meanwhile by other processes are skipped.
+    """
+    stats = list()
+    for fname in glob.glob(op.join(memoize_dir, '*')):
+        try:
+            stats.append((os.stat(fname), fname))
+        except OSError:
+            pass
+    stats.sort(key=lambda s: s[0].st_mtime, reverse=True)
+    size = 0
+    for stat, fname in stats:
+        size += stat.st_size
+        if size > max_size:
+            logger.info('Removing %s from the cache' % op.basename(fname))
+            try:
+                os.remove(fname)
+            except OSError:
+                pass
+
+
+def _memoized_call(function, args, kwargs, ignore):
+    """Call a function or load its memoized result"""
+    try:
+        key = _get_key(function, args, kwargs, ignore)
+    except RuntimeError as exp:  # unsupported type
+        logger.info('%s cannot be memoized (%s)' % (function.__name__, exp))
+        return function(*args, **kwargs)
+    memoize_dir = _get_memoize_dir()
+    fname = op.join(memoize_dir, '%s-%032x' % (function.__name__, key))
+    fnames = glob.glob(fname + '*')
+    if len(fnames) > 0:
+        logger.info('Loading the memoized result of %s'
+                    % function.__name__)
+        try:
+            os.utime(fnames[0], None)  # mark as recently used
+            return _read_result(fnames[0])
+        except Exception as exp:  # removed or corrupted, compute again
+            logger.info('The memoized result cannot be read (%s)' % exp)
+    value = function(*args, **kwargs)
+    if _write_result(fname, value):
+        max_size = get_config('MNE_MEMOIZE_MAX_SIZE', '1G')
+        _evict(memoize_dir, _size_to_bytes(max_size))
+    return value
+
+
+def memoize(function=None, ignore=('n_jobs', 'verbose')):
+    """Decorator to store the results of a function on disk
+
+    The results are stored in a "memoize" directory in MNE_CACHE_DIR (or
+    in the directory of the MNE config file if MNE_CACHE_DIR is not set),
+    keyed by a hash of the source code of the function, its arguments and
+    the MNE version, so editing the function invalidates its results.
+    Forward solutions, inverse operators, covariances and source spaces
+    are stored as FIFF files, other results as HDF5 files (which requires
+    h5py). When the results exceed MNE_MEMOIZE_MAX_SIZE (default '1G'),
+    the least recently used ones are removed.
+
+    Parameters
+    ----------
+    function : callable | None
+        The function to memoize. If None, return a decorator.
+    ignore : tuple of str
+        The names of the arguments that do not change the result.
+
+    Returns
+    -------
+    memoized : callable
+        The memoized function.
+
+    Notes
+    -----
+    The arguments can be nested dict, list, tuple, str, int, float, None,
+    ndarray, sparse matrices, Raw, Epochs and Evoked (see
+    mne.utils.object_hash). Files passed by name are identified by their
+    name, size and modification time, but the files read by the function
+    are not tracked: use clear_cache when they change. Results that cannot
+    be hashed or stored are not memoized.
+    """
+    if function is None:
+        return lambda function: memoize(function, ignore)
+
+    def caller(function, *args, **kwargs):
+        return _memoized_call(function, args, kwargs, ignore)
+    return decorator(caller, function)
+
+
+def _use_memoize():
+    """Check if MNE computations are memoized (MNE_MEMOIZE config)"""
+    return get_config('MNE_MEMOIZE', 'false').lower() == 'true'
+
+
+def _memoize_mne(function):
+    """Memoize an MNE computation if the MNE_MEMOIZE config is 'true'"""
+    def caller(function, *args, **kwargs):
+        if not _use_memoize():
+            return function(*args, **kwargs)
+        return _memoized_call(function, args, kwargs, ('n_jobs', 'verbose'))
+    return decorator(caller, function)
+
+
+def clear_cache():
+    """Remove all the memoized results
+
+    Returns
+    -------
+    size : int
+        The number of bytes removed.
+    """
+    memoize_dir = _get_memoize_dir()
+    size = 0
+    for fname in glob.glob(op.join(memoize_dir, '*')):
+        size += os.stat(fname).st_size
+        os.remove(fname)
+    logger.info('Removed %s of memoized results' % sizeof_fmt(size))
+    return size
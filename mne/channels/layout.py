@@ -20,7 +20,6 @@ from ..io.constants import FIFF
 from ..utils import _clean_names
 from ..externals.six.moves import map
 from .channels import _contains_ch_type
-from ..viz import plot_montage
 from ..transforms import (_sphere_to_cartesian, _polar_to_cartesian,
                           _cartesian_to_sphere)
 
@@ -756,6 +755,7 @@ class Montage(object):
         fig : Instance of matplotlib.figure.Figure
             The figure object.
         """
+        from ..viz import plot_montage
         return plot_montage(self, scale_factor=scale_factor,
                             show_names=show_names)
 
@@ -11,7 +11,7 @@ from scipy.fftpack import fftfreq
 
 from .utils import check_indices
 from ..fixes import tril_indices, partial
-from ..parallel import parallel_func
+from ..parallel import parallel_func, check_n_jobs, _auto_chunk_size
 from ..source_estimate import _BaseSourceEstimate
 from .. import Epochs
 from ..time_frequency.multitaper import (dpss_windows, _mt_spectra,
@@ -675,11 +675,13 @@ def spectral_connectivity(data, method='coh', indices=None, sfreq=2 * np.pi,
     cwt_n_cycles: float | array of float
         Number of cycles. Fixed number or one per frequency. Only used in
         'cwt_morlet' mode.
-    block_size : int
+    block_size : int | str
         How many connections to compute at once (higher numbers are faster
-        but require more memory).
-    n_jobs : int
-        How many epochs to process in parallel.
+        but require more memory). If 'auto', the largest blocks that fit in
+        the memory limit (see mne.set_memory_limit) are used.
+    n_jobs : int | str
+        How many epochs to process in parallel. If 'auto', as many jobs as
+        threads (see mne.set_num_threads) are used.
     verbose : bool, str, int, or None
         If not None, override default verbose level (see mne.verbose).
 
@@ -703,6 +705,10 @@ def spectral_connectivity(data, method='coh', indices=None, sfreq=2 * np.pi,
         The number of DPSS tapers used. Only defined in 'multitaper' mode.
         Otherwise None is returned.
     """
+    n_jobs = check_n_jobs(n_jobs)
+    if isinstance(block_size, string_types) and block_size != 'auto':
+        raise ValueError('block_size must be an int or "auto", got %s'
+                         % block_size)
     if n_jobs > 1:
         parallel, my_epoch_spectral_connectivity, _ = \
                 parallel_func(_epoch_spectral_connectivity, n_jobs,
@@ -955,6 +961,18 @@ def spectral_connectivity(data, method='coh', indices=None, sfreq=2 * np.pi,
             con_methods = [mtype(n_cons, n_freqs, n_times_spectrum)
                            for mtype in con_method_types]
 
+            if block_size == 'auto':
+                # the spectra of the two signals of each connection and
+                # their cross-spectral density, while each job accumulates
+                # its own connectivity scores
+                n_spec = max(n_times_spectrum, 1) * (n_tapers or 1)
+                con_bytes = 16 * n_freqs * max(n_times_spectrum, 1)
+                block_size = _auto_chunk_size(3 * 16 * n_freqs * n_spec,
+                                              n_jobs,
+                                              n_methods * n_cons * con_bytes,
+                                              1000)
+                logger.info('    using block_size=%d' % block_size)
+
             sep = ', '
             metrics_str = sep.join([method.name for method in con_methods])
             logger.info('    the following metrics will be computed: %s'
@@ -33,6 +33,7 @@ from .utils import (check_fname, logger, verbose, estimate_rank,
 
 from .externals.six.moves import zip
 from .fixes import nanmean
+from .cache import _memoize_mne, _use_memoize
 
 
 def _check_covs_algebra(cov1, cov2):
@@ -591,16 +592,18 @@ def compute_covariance(epochs, keep_sample_mean=True, tmin=None, tmax=None,
 
     epochs = epochs.T  # sklearn | C-order
     if ok_sklearn:
-        cov_data = _compute_covariance_auto(epochs, method=method,
-                                            method_params=_method_params,
-                                            info=info,
-                                            verbose=verbose,
-                                            cv=cv,
-                                            n_jobs=n_jobs,
-                                            # XXX expose later
-                                            stop_early=True,  # if needed.
-                                            picks_list=picks_list,
-                                            scalings=scalings)
+        compute_auto = (_compute_covariance_auto_memoized if _use_memoize()
+                        else _compute_covariance_auto)
+        cov_data = compute_auto(epochs, method=method,
+                                method_params=_method_params,
+                                info=info,
+                                verbose=verbose,
+                                cv=cv,
+                                n_jobs=n_jobs,
+                                # XXX expose later
+                                stop_early=True,  # if needed.
+                                picks_list=picks_list,
+                                scalings=scalings)
     else:
         if _method_params['empirical']['assume_centered'] is True:
             cov = epochs.T.dot(epochs) / n_samples_tot
@@ -759,6 +762,22 @@ def _compute_covariance_auto(data, method, info, method_params, cv,
     return out
 
 
+@_memoize_mne
+def _compute_covariance_auto_memoized(data, method, info, method_params, cv,
+                                      scalings, n_jobs, stop_early, picks_list,
+                                      verbose):
+    """Helper to memoize _compute_covariance_auto
+
+    The fitted sklearn estimators cannot be stored, so they are left out.
+    """
+    out = _compute_covariance_auto(data, method, info, method_params, cv,
+                                   scalings, n_jobs, stop_early, picks_list,
+                                   verbose)
+    for this_out in out.values():
+        this_out.pop('estimator')
+    return out
+
+
 def _cross_val(data, est, cv, n_jobs):
     """Helper to compute cross validation"""
     from sklearn.cross_validation import cross_val_score
@@ -821,7 +840,7 @@ def _auto_low_rank_model(data, mode, n_jobs, method_params, cv, stop_early=True,
     logger.info('... best model at rank = %i' % best)
     runtime_info = {'ranks': np.array(iter_n_components),
                     'scores': scores,
-                    'best': best,
+                    'best': int(best),
                     'cv': cv}
     return est, runtime_info
 
@@ -3,7 +3,6 @@
 # License: BSD (3-clause)
 
 import numpy as np
-from scipy.fftpack import fft, ifft
 try:
     import pycuda.gpuarray as gpuarray
     from pycuda.driver import mem_get_info
@@ -13,6 +12,7 @@ except (ImportError, OSError):
     pass
 
 from .utils import sizeof_fmt, logger
+from .fft import fft, ifft
 
 
 # Support CUDA for FFTs; requires scikits.cuda and pycuda
@@ -133,6 +133,8 @@ def setup_cuda_fft_multiply_repeated(n_jobs, h_fft):
     Notes
     -----
     This function is designed to be used with fft_multiply_repeated().
+    The input h_fft is never modified, so that the spectra of the FIR filter
+    cache can be passed directly.
     """
     cuda_dict = dict(use_cuda=False, fft_plan=None, ifft_plan=None,
                      x_fft=None, x=None)
@@ -183,7 +185,7 @@ def fft_multiply_repeated(h_fft, x, cuda_dict=dict(use_cuda=False)):
     """
     if not cuda_dict['use_cuda']:
         # do the fourier-domain operations
-        x = np.real(ifft(h_fft * fft(x), overwrite_x=True)).ravel()
+        x = np.real(ifft(h_fft * fft(x))).ravel()
     else:
         # do the fourier-domain operations, results in second param
         cuda_dict['x'].set(x.astype(np.float64))
@@ -312,7 +314,7 @@ def fft_resample(x, W, new_len, npad, to_remove,
         y_fft[sl_1] = x_fft[sl_1]
         sl_2 = slice(-(N - 1) // 2, None)
         y_fft[sl_2] = x_fft[sl_2]
-        y = np.real(ifft(y_fft, overwrite_x=True)).ravel()
+        y = np.real(ifft(y_fft)).ravel()
     else:
         cuda_dict['x'].set(np.concatenate((x, np.zeros(max(new_len - old_len,
                                                            0), x.dtype))))
@@ -348,9 +350,11 @@ def fft_resample(x, W, new_len, npad, to_remove,
 
 # this has to go in mne.cuda instead of mne.filter to avoid import errors
 def _smart_pad(x, n_pad):
-    """Pad vector x
+    """Pad vector x, or each row of x, along the last axis
     """
     # need to pad with zeros if len(x) <= npad
-    z_pad = np.zeros(max(n_pad - len(x) + 1, 0), dtype=x.dtype)
-    return np.r_[z_pad, 2 * x[0] - x[n_pad:0:-1], x,
-                 2 * x[-1] - x[-2:-n_pad - 2:-1], z_pad]
+    z_pad = np.zeros(x.shape[:-1] + (max(n_pad - x.shape[-1] + 1, 0),),
+                     dtype=x.dtype)
+    return np.concatenate([z_pad, 2 * x[..., :1] - x[..., n_pad:0:-1], x,
+                           2 * x[..., -1:] - x[..., -2:-n_pad - 2:-1], z_pad],
+                          axis=-1)
@@ -13,6 +13,9 @@ from .externals.six import string_types
 import copy as cp
 import warnings
 import json
+import os
+import os.path as op
+import tempfile
 
 import numpy as np
 
@@ -20,25 +23,25 @@ from .io.write import (start_file, start_block, end_file, end_block,
                        write_int, write_float_matrix, write_float,
                        write_id, write_string)
 from .io.meas_info import read_meas_info, write_meas_info, _merge_info
-from .io.open import fiff_open
+from .io.open import fiff_open, _FidPool
 from .io.tree import dir_tree_find
-from .io.tag import read_tag
+from .io.tag import read_tag, read_tag_info
 from .io.constants import FIFF
 from .io.pick import (pick_types, channel_indices_by_type, channel_type,
-                      pick_channels, pick_info)
+                      pick_channels, pick_info, _picks_by_type)
 from .io.proj import setup_proj, ProjMixin
-from .io.base import _BaseRaw, _time_as_index, _index_as_time
+from .io.base import (_BaseRaw, _time_as_index, _index_as_time,
+                      _allocate_data)
 from .evoked import EvokedArray, aspect_rev
 from .baseline import rescale
 from .utils import (check_random_state, _check_pandas_index_arguments,
                     _check_pandas_installed, object_hash)
 from .channels.channels import (ContainsMixin, PickDropChannelsMixin,
                                 SetChannelsMixin, InterpolationMixin)
-from .filter import resample, detrend
+from .filter import resample, detrend, filter_bank
 from .event import _read_events_fif
 from .fixes import in1d
-from .viz import _mutable_defaults, plot_epochs, _drop_log_stats
-from .utils import check_fname, logger, verbose
+from .utils import check_fname, logger, verbose, get_config
 from .externals import six
 from .externals.six.moves import zip
 from .utils import deprecated, _check_type_picks
@@ -111,6 +114,7 @@ class _BaseEpochs(ProjMixin, ContainsMixin, PickDropChannelsMixin,
         self._bad_dropped = False
         self.drop_log = None
         self.selection = None
+        self._ptp = None
         self.detrend = detrend
 
         # Handle measurement info
@@ -155,10 +159,22 @@ class _BaseEpochs(ProjMixin, ContainsMixin, PickDropChannelsMixin,
         self.preload = False
         self._data = None
         self._offset = None
+        self._own_memmap = False
 
         # setup epoch rejection
         self._reject_setup()
 
+    def __del__(self):
+        # remove file for memmap, only from the instance that created it
+        if (getattr(self, '_own_memmap', False) and
+                getattr(getattr(self, '_data', None), 'filename', None)):
+            # First, close the file out; happens automatically on del
+            filename = self._data.filename
+            del self._data
+            # Now file can be removed
+            if op.isfile(filename):
+                os.remove(filename)
+
     def _reject_setup(self):
         """Sets self._reject_time and self._channel_type_idx (called from
         __init__)
@@ -211,23 +227,112 @@ class _BaseEpochs(ProjMixin, ContainsMixin, PickDropChannelsMixin,
                             self.reject, self.flat, full_report=True,
                             ignore_chs=self.info['bads'])
 
+    def _get_ptp(self, data):
+        """Peak-to-peak amplitudes of a block of epochs in the rejection
+        time window"""
+        # not set up if there are no rejection parameters
+        reject_time = getattr(self, '_reject_time', None)
+        if reject_time is not None:
+            data = data[..., reject_time]
+        return np.ptp(data, axis=-1)
+
+    def _reject_ptp(self, ptp, idx=None):
+        """Drop the epochs rejected based on their peak-to-peak amplitudes
+
+        ptp has one row per epoch in self.selection (or in idx, the indices
+        of a subset of the epochs). The amplitudes are stored, one row per
+        entry in the drop log, for get_reject_matrix. Returns the indices
+        of the good epochs.
+        """
+        if idx is None:
+            idx = np.arange(len(ptp))
+        _ptp = np.empty((len(self.drop_log), len(self.ch_names)))
+        _ptp.fill(np.nan)
+        _ptp[self.selection[idx]] = ptp
+        self._ptp = (list(self.ch_names), _ptp)
+        good = np.zeros(len(self.selection), dtype=bool)
+        good[idx] = True
+        if self.reject is not None or self.flat is not None:
+            _, bad_lists = _reject_from_ptp(ptp, self.ch_names,
+                                            self._channel_type_idx,
+                                            self.reject, self.flat,
+                                            ignore_chs=self.info['bads'],
+                                            verbose=self.verbose)
+            for ii, bad_list in zip(idx, bad_lists):
+                if len(bad_list) > 0:
+                    good[ii] = False
+                    self.drop_log[self.selection[ii]] += bad_list
+        return np.where(good)[0]
+
+    def get_reject_matrix(self, reject=None, flat=None):
+        """Find the channels that meet rejection criteria in each epoch
+
+        The peak-to-peak amplitudes computed when the bad epochs were dropped
+        are reused, so that rejection thresholds can be tuned without reading
+        the data again.
+
+        Parameters
+        ----------
+        reject : dict | None
+            Rejection parameters based on peak to peak amplitude, see the
+            Epochs constructor. If reject and flat are both None, the
+            parameters of the instance are used.
+        flat : dict | None
+            Rejection parameters based on flatness of signal, see the Epochs
+            constructor.
+
+        Returns
+        -------
+        bad : array of bool, shape (n_drop_log, n_channels)
+            The channels that meet the criteria in each epoch, with one row
+            per entry in drop_log. The rows of the epochs that were dropped
+            for other reasons (e.g., 'TOO_SHORT' or 'IGNORED') are False.
+        """
+        if reject is None and flat is None:
+            reject, flat = self.reject, self.flat
+        if self._ptp is None:
+            # dropping the bad epochs computes the amplitudes
+            data = self.get_data()
+        if self._ptp is None:
+            ptp = np.empty((len(self.drop_log), len(self.ch_names)))
+            ptp.fill(np.nan)
+            ptp[self.selection] = self._get_ptp(data)
+            self._ptp = (list(self.ch_names), ptp)
+        ch_names, ptp = self._ptp
+        # channels may have been picked or dropped since
+        ptp_ = np.empty((len(ptp), len(self.ch_names)))
+        ptp_.fill(np.nan)
+        for ii, ch_name in enumerate(self.ch_names):
+            if ch_name in ch_names:
+                ptp_[:, ii] = ptp[:, ch_names.index(ch_name)]
+        bad, _ = _reject_from_ptp(ptp_, self.ch_names,
+                                  channel_indices_by_type(self.info),
+                                  reject, flat, ignore_chs=self.info['bads'],
+                                  verbose=False)
+        return bad
+
     @verbose
     def _preprocess(self, epoch, verbose=None):
         """ Aux Function
+
+        epoch can be a single epoch (n_channels, n_times) or a block of
+        epochs (n_epochs, n_channels, n_times).
         """
         # Detrend
         if self.detrend is not None:
             picks = pick_types(self.info, meg=True, eeg=True, stim=False,
                                ref_meg=False, eog=False, ecg=False,
                                emg=False, exclude=[])
-            epoch[picks] = detrend(epoch[picks], self.detrend, axis=1)
+            epoch[..., picks, :] = detrend(epoch[..., picks, :],
+                                           self.detrend, axis=-1)
 
         # Baseline correct
         picks = pick_types(self.info, meg=True, eeg=True, stim=False,
                            ref_meg=True, eog=True, ecg=True,
                            emg=True, exclude=[])
-        epoch[picks] = rescale(epoch[picks], self._raw_times, self.baseline,
-                               'mean', copy=False, verbose=verbose)
+        epoch[..., picks, :] = rescale(epoch[..., picks, :], self._raw_times,
+                                       self.baseline, 'mean', copy=False,
+                                       verbose=verbose)
 
         # handle offset
         if self._offset is not None:
@@ -235,7 +340,7 @@ class _BaseEpochs(ProjMixin, ContainsMixin, PickDropChannelsMixin,
 
         # Decimate
         if self.decim > 1:
-            epoch = epoch[:, self._decim_idx]
+            epoch = epoch[..., self._decim_idx]
         return epoch
 
     def get_data(self):
@@ -357,11 +462,15 @@ class _BaseEpochs(ProjMixin, ContainsMixin, PickDropChannelsMixin,
         return self.next(*args, **kwargs)
 
     def __hash__(self):
+        return object_hash(self)
+
+    def _get_hash_obj(self):
+        """Get the content that identifies the data (see object_hash)"""
         if not self.preload:
             raise RuntimeError('Cannot hash epochs unless preloaded')
-        return object_hash(dict(info=self.info, data=self._data))
+        return dict(info=self.info, data=self._data)
 
-    def average(self, picks=None):
+    def average(self, picks=None, by_event_type=False):
         """Compute average of epochs
 
         Parameters
@@ -369,16 +478,20 @@ class _BaseEpochs(ProjMixin, ContainsMixin, PickDropChannelsMixin,
         picks : array-like of int | None
             If None only MEG and EEG channels are kept
             otherwise the channels indices in picks are kept.
+        by_event_type : bool
+            If True, compute the average of each event type (key of
+            event_id) in a single pass over the epochs.
 
         Returns
         -------
-        evoked : Evoked instance
-            The averaged epochs
+        evoked : Evoked instance | list of Evoked
+            The averaged epochs. If by_event_type is True, a list with one
+            Evoked per event type, sorted by event name.
         """
 
-        return self._compute_mean_or_stderr(picks, 'ave')
+        return self._compute_mean_or_stderr(picks, 'ave', by_event_type)
 
-    def standard_error(self, picks=None):
+    def standard_error(self, picks=None, by_event_type=False):
         """Compute standard error over epochs
 
         Parameters
@@ -386,59 +499,173 @@ class _BaseEpochs(ProjMixin, ContainsMixin, PickDropChannelsMixin,
         picks : array-like of int | None
             If None only MEG and EEG channels are kept
             otherwise the channels indices in picks are kept.
+        by_event_type : bool
+            If True, compute the standard error of each event type (key of
+            event_id) in a single pass over the epochs.
 
         Returns
         -------
-        evoked : Evoked instance
-            The standard error over epochs
+        evoked : Evoked instance | list of Evoked
+            The standard error over epochs. If by_event_type is True, a list
+            with one Evoked per event type, sorted by event name.
         """
-        return self._compute_mean_or_stderr(picks, 'stderr')
+        return self._compute_mean_or_stderr(picks, 'stderr', by_event_type)
 
-    def _compute_mean_or_stderr(self, picks, mode='ave'):
-        """Compute the mean or std over epochs and return Evoked"""
+    def compute_condition_stats(self, picks=None, return_cov=False):
+        """Compute the statistics of each event type in a single pass
 
-        _do_std = True if mode == 'stderr' else False
+        The average and standard error of all the event types (keys of
+        event_id) are computed while the epochs are read once, with running
+        sums and Welford's algorithm for the variance. This only needs
+        memory for a few evoked responses per event type, so the epochs do
+        not need to be preloaded.
 
+        Parameters
+        ----------
+        picks : array-like of int | None
+            If None only MEG and EEG channels are kept in the Evoked
+            otherwise the channels indices in picks are kept.
+        return_cov : bool
+            If True, also compute the empirical covariance of the MEG and
+            EEG channels of each event type (as compute_covariance with
+            method='empirical' over the whole epochs).
+
+        Returns
+        -------
+        evokeds : list of Evoked
+            The average of each event type, sorted by event name.
+        stderrs : list of Evoked
+            The standard error of each event type, sorted by event name.
+        covs : list of Covariance
+            The covariance of each event type. Only returned if return_cov
+            is True.
+        """
+        names = sorted(self.event_id.keys())
+        picks_cov = None
+        if return_cov:
+            picks_cov = np.sort(np.concatenate(
+                [b for _, b in _picks_by_type(self.info)]))
+        n_events, means, stds, covs = self._compute_stats(names, True,
+                                                          picks_cov)
+        evokeds = [self._make_evoked(mean, n, name, picks, False)
+                   for name, n, mean in zip(names, n_events, means)]
+        stderrs = [self._make_evoked(std, n, name, picks, True)
+                   for name, n, std in zip(names, n_events, stds)]
+        if not return_cov:
+            return evokeds, stderrs
+        from .cov import Covariance
+        ch_names = [self.ch_names[k] for k in picks_cov]
+        out_covs = list()
+        for n, data in zip(n_events, covs):
+            nfree = n * len(self.times)
+            cov = Covariance(None)
+            cov.update(kind=1, diag=False, dim=len(data), names=ch_names,
+                       data=data / max(nfree, 1),
+                       projs=cp.deepcopy(self.info['projs']),
+                       bads=self.info['bads'], nfree=nfree, eig=None,
+                       eigvec=None, method='empirical')
+            out_covs.append(cov)
+        return evokeds, stderrs, out_covs
+
+    def _compute_stats(self, names, do_std, picks_cov=None):
+        """Compute the mean, std and covariance of groups of epochs
+
+        The groups are the event types given in names, or all the epochs
+        if names is [None]. The epochs are read only once.
+        """
+        n_cond = len(names)
         n_channels = len(self.ch_names)
         n_times = len(self.times)
-        if self.preload:
-            n_events = len(self.events)
-            if not _do_std:
-                data = np.mean(self._data, axis=0)
-            else:
-                data = np.std(self._data, axis=0)
-            assert len(self.events) == len(self._data)
+        if names == [None]:
+            cond_idx = None
         else:
-            data = np.zeros((n_channels, n_times))
-            n_events = 0
-            for e in self:
-                data += e
-                n_events += 1
-
-            if n_events > 0:
-                data /= n_events
+            cond_idx = dict((self.event_id[name], ii)
+                            for ii, name in enumerate(names))
+        n_events = np.zeros(n_cond, dtype=np.int)
+        means = np.zeros((n_cond, n_channels, n_times))
+        stds = np.zeros((n_cond, n_channels, n_times)) if do_std else None
+        covs = None
+        if picks_cov is not None:
+            covs = np.zeros((n_cond, len(picks_cov), len(picks_cov)))
+
+        if self.preload:
+            for ii, name in enumerate(names):
+                if name is None:
+                    data = self._data
+                else:
+                    data = self._data[self.events[:, 2] ==
+                                      self.event_id[name]]
+                n_events[ii] = len(data)
+                # np.asarray in case the data are memory-mapped
+                means[ii] = np.asarray(np.mean(data, axis=0))
+                if do_std:
+                    stds[ii] = np.asarray(np.std(data, axis=0))
+                if covs is not None:
+                    data = data[:, picks_cov]
+                    covs[ii] = np.tensordot(data, data, ([0, 2], [0, 2]))
+            return n_events, means, stds, covs
+
+        # the means are running sums, and the variances are updated with
+        # Welford's algorithm, which does not lose precision for large
+        # numbers of epochs
+        running_means = np.zeros_like(means) if do_std else None
+        iter(self)
+        while True:
+            try:
+                e, event_id = self.next(return_event_id=True)
+            except StopIteration:
+                break
+            ii = 0 if cond_idx is None else cond_idx[event_id]
+            n_events[ii] += 1
+            means[ii] += e
+            if do_std:
+                delta = e - running_means[ii]
+                running_means[ii] += delta / n_events[ii]
+                stds[ii] += delta * (e - running_means[ii])
+            if covs is not None:
+                e = e[picks_cov]
+                covs[ii] += np.dot(e, e.T)
+
+        for ii in range(n_cond):
+            if n_events[ii] > 0:
+                means[ii] /= n_events[ii]
             else:
-                data.fill(np.nan)
+                means[ii].fill(np.nan)
+        if do_std:
+            stds = np.sqrt(stds / n_events[:, np.newaxis, np.newaxis])
+        return n_events, means, stds, covs
 
-            # convert to stderr if requested, could do in one pass but do in
-            # two (slower) in case there are large numbers
-            if _do_std:
-                data_mean = cp.copy(data)
-                data.fill(0.)
-                for e in self:
-                    data += (e - data_mean) ** 2
-                data = np.sqrt(data / n_events)
+    def _compute_mean_or_stderr(self, picks, mode='ave', by_event_type=False):
+        """Compute the mean or std over epochs and return Evoked"""
+
+        _do_std = True if mode == 'stderr' else False
+
+        names = sorted(self.event_id.keys()) if by_event_type else [None]
+        n_events, means, stds, _ = self._compute_stats(names, _do_std)
+        data = stds if _do_std else means
+        evokeds = [self._make_evoked(d, n, name, picks, _do_std)
+                   for name, n, d in zip(names, n_events, data)]
+        return evokeds if by_event_type else evokeds[0]
+
+    def _make_evoked(self, data, n_events, name, picks, _do_std):
+        """Make an Evoked from a mean or std of the epochs of event name"""
+        if name is None:
+            comment = self.name
+        else:
+            # same as self[name].name
+            comment = (name if self.name == 'Unknown'
+                       else 'epochs_%s' % name)
 
         if not _do_std:
             _aspect_kind = FIFF.FIFFV_ASPECT_AVERAGE
         else:
             _aspect_kind = FIFF.FIFFV_ASPECT_STD_ERR
-            data /= np.sqrt(n_events)
+            data = data / np.sqrt(n_events)
         kind = aspect_rev.get(str(_aspect_kind), 'Unknown')
 
         info = cp.deepcopy(self.info)
         evoked = EvokedArray(data, info, tmin=self.times[0],
-                             comment=self.name, nave=n_events, kind=kind,
+                             comment=comment, nave=int(n_events), kind=kind,
                              verbose=self.verbose)
         # XXX: above constructor doesn't recreate the times object precisely
         evoked.times = self.times.copy()
@@ -502,6 +729,7 @@ class _BaseEpochs(ProjMixin, ContainsMixin, PickDropChannelsMixin,
         fig : Instance of matplotlib.figure.Figure
             The figure.
         """
+        from .viz import plot_epochs
         return plot_epochs(self, epoch_idx=epoch_idx, picks=picks,
                            scalings=scalings, title_str=title_str,
                            show=show, block=block)
@@ -545,10 +773,13 @@ class Epochs(_BaseEpochs):
     picks : array-like of int | None (default)
         Indices of channels to include (if None, all channels
         are used).
-    preload : boolean
+    preload : bool | str
         Load all epochs from disk when creating the object
         or wait before accessing each epoch (more memory
-        efficient but can be slower).
+        efficient but can be slower). If preload is a string, preload is the
+        file name of a memory-mapped file which is used to store the data
+        on the hard drive (slower, requires less memory). The file is
+        removed when the Epochs object is deleted.
     reject : dict
         Epoch rejection parameters based on peak to peak amplitude.
         Valid keys are 'grad' | 'mag' | 'eeg' | 'eog' | 'ecg'.
@@ -745,9 +976,12 @@ class Epochs(_BaseEpochs):
             else:
                 self.drop_log.append(['IGNORED'])
 
-        self.preload = preload
+        self.preload = bool(preload)
         if self.preload:
-            self._data = self._get_data_from_disk()
+            data_buffer = preload if isinstance(preload,
+                                                string_types) else None
+            self._data = self._get_data_from_disk(data_buffer=data_buffer)
+            self._own_memmap = data_buffer is not None
             self.raw = None
         else:
             self._data = None
@@ -777,6 +1011,7 @@ class Epochs(_BaseEpochs):
         perc : float
             Total percentage of epochs dropped.
         """
+        from .viz import _drop_log_stats
         return _drop_log_stats(self.drop_log, ignore)
 
     def plot_drop_log(self, threshold=0, n_max_plot=20, subject='Unknown',
@@ -885,54 +1120,130 @@ class Epochs(_BaseEpochs):
     @verbose
     def _get_epoch_from_disk(self, idx, proj, verbose=None):
         """Load one epoch from disk"""
+        return list(next(self._iter_epochs_from_disk([idx], proj))[1:])
+
+    def _iter_epochs_from_disk(self, idx, proj):
+        """Load several epochs from disk
+
+        The epochs are sorted in time, and the ones that overlap or are
+        close to each other are read from the raw data as a single segment,
+        which is projected at once. The epochs cut from each segment are
+        then preprocessed as a single block.
+
+        Parameters
+        ----------
+        idx : array of int
+            Indices of the events to read.
+        proj : bool
+            Apply the projection. If proj is True but self.proj is not, an
+            unprojected copy of each epoch is also returned (delayed SSP).
+
+        Yields
+        ------
+        ii : int
+            The index of the event, in the order the epochs are read.
+        epoch : array, shape (n_channels, n_times) | None
+            The preprocessed epoch, None if it starts before the data.
+        epoch_raw : array, shape (n_channels, n_times) | None
+            The raw epoch, if needed for delayed SSP.
+        """
         if self.raw is None:
+            if getattr(self, '_epochs_file', None) is not None:
+                # epochs read with read_epochs(..., preload=False)
+                for item in self._iter_epochs_from_file(idx):
+                    yield item
+                return
             # This should never happen, as raw=None only if preload=True
             raise ValueError('An error has occurred, no valid raw file found.'
                              ' Please report this to the mne-python '
                              'developers.')
         sfreq = self.raw.info['sfreq']
-
-        if self.events.ndim == 1:
-            # single event
-            event_samp = self.events[0]
-        else:
-            event_samp = self.events[idx, 0]
-
-        # Read a data segment
         first_samp = self.raw.first_samp
-        start = int(round(event_samp + self.tmin * sfreq)) - first_samp
-        stop = start + self._epoch_stop
-        if start < 0:
-            return None, None
-
-        epoch_raw, _ = self.raw[self.picks, start:stop]
-
-        # setup list of epochs to handle delayed SSP
-        epochs = []
-        # whenever requested, the first epoch is being projected.
-        if self._projector is not None and proj is True:
-            epochs += [np.dot(self._projector, epoch_raw)]
-        else:
-            epochs += [epoch_raw]
-
-        # in case the proj passed is True but self proj is not we
-        # have delayed SSP
-        if self.proj != proj:  # so append another unprojected epoch
-            epochs += [epoch_raw.copy()]
-
-        # only preprocess first candidate, to make delayed SSP working
-        # we need to postpone the preprocessing since projection comes
-        # first.
-        epochs[0] = self._preprocess(epochs[0])
+        ep_len = self._epoch_stop
+        # merge epochs separated by less than an epoch, in segments of
+        # at most 10 seconds (or one epoch)
+        max_len = max(ep_len, int(10 * sfreq))
+        use_proj = self._projector is not None and proj is True
+        keep_raw = self.proj != proj
+
+        # find the first sample of each epoch
+        starts = dict()
+        for ii in idx:
+            if self.events.ndim == 1:
+                # single event
+                event_samp = self.events[0]
+            else:
+                event_samp = self.events[ii, 0]
+            start = int(round(event_samp + self.tmin * sfreq)) - first_samp
+            if start < 0:
+                yield ii, None, None
+            else:
+                starts[ii] = start
+
+        # group them into segments to read
+        segments = list()
+        for ii in sorted(starts, key=lambda ii: (starts[ii], ii)):
+            start = starts[ii]
+            if len(segments) > 0 and start - segments[-1][1] <= ep_len and \
+                    start + ep_len - segments[-1][0] <= max_len:
+                segments[-1][1] = start + ep_len
+                segments[-1][2].append(ii)
+            else:
+                segments.append([start, start + ep_len, [ii]])
+
+        for seg_start, seg_stop, seg_idx in segments:
+            seg_raw, _ = self.raw[self.picks, seg_start:seg_stop]
+            seg = np.dot(self._projector, seg_raw) if use_proj else seg_raw
+            offsets = [starts[ii] - seg_start for ii in seg_idx]
+            # epochs at the end of the data may be too short to be stacked
+            full = [o + ep_len <= seg.shape[1] for o in offsets]
+            if any(full):
+                block = np.array([seg[:, o:o + ep_len]
+                                  for o, f in zip(offsets, full) if f])
+                block = iter(self._preprocess(block))
+            for ii, o, f in zip(seg_idx, offsets, full):
+                if f:
+                    epoch = next(block)
+                else:
+                    epoch = self._preprocess(seg[:, o:o + ep_len].copy())
+                epoch_raw = seg_raw[:, o:o + ep_len].copy() if keep_raw \
+                    else None
+                yield ii, epoch, epoch_raw
 
-        # return a second None if nothing is projected
-        if len(epochs) == 1:
-            epochs += [None]
+    def _iter_epochs_from_file(self, idx, block_size=2 ** 26):
+        """Load several epochs from an epochs file
 
-        return epochs
+        The rows of the data tag are found from the selection. Consecutive
+        rows are read at once, in blocks of at most block_size bytes. The
+        items are yielded like in _iter_epochs_from_disk.
+        """
+        ep_file = self._epochs_file
+        rows = np.array([ep_file['rows'][self.selection[ii]] for ii in idx],
+                        dtype=np.int64)
+        order = np.argsort(rows, kind='mergesort')
+        n_channels, n_times = ep_file['shape'][1:]
+        dtype = np.dtype(ep_file['dtype'])
+        row_size = n_channels * n_times * dtype.itemsize
+        n_max = max(block_size // row_size, 1)
+        cals = ep_file['cals'][np.newaxis, :, np.newaxis]
+        runs = np.split(order, np.where(np.diff(rows[order]) != 1)[0] + 1)
+        for run in runs:
+            for start in range(0, len(run), n_max):
+                this_run = run[start:start + n_max]
+                fid = self._fid_pool.get(ep_file['fname'])
+                try:
+                    fid.seek(ep_file['pos'] + rows[this_run[0]] * row_size, 0)
+                    block = np.fromstring(fid.read(len(this_run) * row_size),
+                                          dtype=dtype)
+                finally:
+                    self._fid_pool.release(ep_file['fname'], fid)
+                block = block.reshape(len(this_run), n_channels, n_times)
+                block = block * cals
+                for ii, epoch in zip(this_run, block):
+                    yield idx[ii], epoch, None
 
     @verbose
-    def _get_data_from_disk(self, out=True, verbose=None):
+    def _get_data_from_disk(self, out=True, data_buffer=None, verbose=None):
         """Load all data from disk
 
         Parameters
@@ -940,6 +1251,8 @@ class Epochs(_BaseEpochs):
         out : bool
             Return the data. Setting this to False is used to reject bad
             epochs without caching all the data, which saves memory.
+        data_buffer : str | None
+            If str, the data are stored in a memory-mapped file of this name.
         verbose : bool, str, int, or None
             If not None, override default verbose level (see mne.verbose).
             Defaults to self.verbose.
@@ -950,36 +1263,44 @@ class Epochs(_BaseEpochs):
             proj = False if self._check_delayed() else self.proj
             if not out:
                 return
-            for ii in range(n_events):
+            for ii, epoch, epoch_raw in self._iter_epochs_from_disk(
+                    np.arange(n_events), proj=proj):
                 # faster to pre-allocate memory here
-                epoch, epoch_raw = self._get_epoch_from_disk(ii, proj=proj)
-                if ii == 0:
-                    data = np.empty((n_events, epoch.shape[0],
-                                     epoch.shape[1]), dtype=epoch.dtype)
+                if data.ndim == 1:
+                    data = _allocate_data(None, data_buffer,
+                                          (n_events,) + epoch.shape,
+                                          epoch.dtype)
                 if self._check_delayed():
                     epoch = epoch_raw
                 data[ii] = epoch
         else:
             proj = True if self._check_delayed() else self.proj
-            good_events = []
-            n_out = 0
-            for idx, sel in zip(range(n_events), self.selection):
-                epoch, epoch_raw = self._get_epoch_from_disk(idx, proj=proj)
-                is_good, offenders = self._is_good_epoch(epoch)
-                if is_good:
-                    good_events.append(idx)
-                    if self._check_delayed():
-                        epoch = epoch_raw
-                    if out:
-                        # faster to pre-allocate, then trim as necessary
-                        if n_out == 0:
-                            data = np.empty((n_events, epoch.shape[0],
-                                             epoch.shape[1]),
-                                            dtype=epoch.dtype, order='C')
-                        data[n_out] = epoch
-                        n_out += 1
-                else:
-                    self.drop_log[sel] += offenders
+            n_times = len(self.times)
+            ptp = np.empty((n_events, len(self.ch_names)))
+            read = np.zeros(n_events, dtype=bool)
+            for idx, epoch, epoch_raw in self._iter_epochs_from_disk(
+                    np.arange(n_events), proj=proj):
+                if epoch is None:
+                    self.drop_log[self.selection[idx]].append('NO_DATA')
+                    continue
+                if epoch.shape[1] < n_times:
+                    # epoch is too short ie at the end of the data
+                    self.drop_log[self.selection[idx]].append('TOO_SHORT')
+                    continue
+                read[idx] = True
+                # the rejection is done at once for all epochs at the end
+                ptp[idx] = self._get_ptp(epoch)
+                if self._check_delayed():
+                    epoch = epoch_raw
+                if out:
+                    # faster to pre-allocate, then trim as necessary
+                    if data.ndim == 1:
+                        data = _allocate_data(None, data_buffer,
+                                              (n_events,) + epoch.shape,
+                                              epoch.dtype)
+                    data[idx] = epoch
+            read = np.where(read)[0]
+            good_events = self._reject_ptp(ptp[read], read)
 
             self.selection = self.selection[good_events]
             self.events = np.atleast_2d(self.events[good_events])
@@ -989,12 +1310,21 @@ class Epochs(_BaseEpochs):
             if not out:
                 return
             # just take the good events
-            assert len(good_events) == n_out
+            n_out = len(good_events)
             if n_out > 0:
-                # slicing won't free the space, so we resize
-                # we have ensured the C-contiguity of the array in allocation
-                # so this operation will be safe unless np is very broken
-                data.resize((n_out,) + data.shape[1:], refcheck=False)
+                # move the good epochs to the front, in order
+                for ii, idx in enumerate(good_events):
+                    if ii != idx:
+                        data[ii] = data[idx]
+                if isinstance(data, np.memmap):
+                    # the end of the file is left unused
+                    data = data[:n_out]
+                else:
+                    # slicing won't free the space, so we resize
+                    # we have ensured the C-contiguity of the array in
+                    # allocation so this operation will be safe unless np is
+                    # very broken
+                    data.resize((n_out,) + data.shape[1:], refcheck=False)
         return data
 
     @verbose
@@ -1136,10 +1466,12 @@ class Epochs(_BaseEpochs):
         return '<Epochs  |  %s>' % s
 
     def _key_match(self, key):
-        """Helper function for event dict use"""
-        if key not in self.event_id:
-            raise KeyError('Event "%s" is not in Epochs.' % key)
-        return self.events[:, 2] == self.event_id[key]
+        """Helper function for event dict use, key can be a list of keys"""
+        keys = [key] if isinstance(key, string_types) else key
+        for k in keys:
+            if k not in self.event_id:
+                raise KeyError('Event "%s" is not in Epochs.' % k)
+        return np.in1d(self.events[:, 2], [self.event_id[k] for k in keys])
 
     def __getitem__(self, key):
         """Return an Epochs object with a subset of epochs
@@ -1153,8 +1485,7 @@ class Epochs(_BaseEpochs):
             key = [key]
 
         if isinstance(key, (list, tuple)) and isinstance(key[0], string_types):
-            select = np.any(np.atleast_2d([epochs._key_match(k)
-                                           for k in key]), axis=0)
+            select = epochs._key_match(key)
             epochs.name = ('+'.join(key) if epochs.name == 'Unknown'
                            else 'epochs_%s' % '+'.join(key))
         else:
@@ -1169,8 +1500,9 @@ class Epochs(_BaseEpochs):
             epochs._data = epochs._data[select]
 
         # update event id to reflect new content of epochs
+        ids = np.unique(epochs.events[:, 2])
         epochs.event_id = dict((k, v) for k, v in epochs.event_id.items()
-                               if v in epochs.events[:, 2])
+                               if v in ids)
 
         return epochs
 
@@ -1217,17 +1549,19 @@ class Epochs(_BaseEpochs):
 
         tmask = (self.times >= tmin) & (self.times <= tmax)
         tidx = np.where(tmask)[0]
+        # a slice keeps memory-mapped data on disk
+        tslice = slice(tidx[0], tidx[-1] + 1)
 
         this_epochs = self if not copy else self.copy()
         this_epochs.tmin = this_epochs.times[tidx[0]]
         this_epochs.tmax = this_epochs.times[tidx[-1]]
-        this_epochs.times = this_epochs.times[tmask]
-        this_epochs._data = this_epochs._data[:, :, tmask]
+        this_epochs.times = this_epochs.times[tslice]
+        this_epochs._data = this_epochs._data[:, :, tslice]
         return this_epochs
 
     @verbose
     def resample(self, sfreq, npad=100, window='boxcar', n_jobs=1,
-                 verbose=None):
+                 method='fft', verbose=None):
         """Resample preloaded data
 
         Parameters
@@ -1240,6 +1574,9 @@ class Epochs(_BaseEpochs):
             Window to use in resampling. See scipy.signal.resample.
         n_jobs : int
             Number of jobs to run in parallel.
+        method : str
+            'fft' will resample in the frequency domain, 'polyphase' will
+            use a polyphase FIR filter. See mne.filter.resample for details.
         verbose : bool, str, int, or None
             If not None, override default verbose level (see mne.verbose).
             Defaults to self.verbose.
@@ -1252,7 +1589,7 @@ class Epochs(_BaseEpochs):
         if self.preload:
             o_sfreq = self.info['sfreq']
             self._data = resample(self._data, sfreq, o_sfreq, npad,
-                                  n_jobs=n_jobs)
+                                  n_jobs=n_jobs, method=method)
             # adjust indirectly affected variables
             self.info['sfreq'] = sfreq
             self.times = (np.arange(self._data.shape[2], dtype=np.float)
@@ -1260,6 +1597,62 @@ class Epochs(_BaseEpochs):
         else:
             raise RuntimeError('Can only resample preloaded data')
 
+    @verbose
+    def filter_bank(self, bands, picks=None, filter_length='10s',
+                    l_trans_bandwidth=0.5, h_trans_bandwidth=0.5,
+                    envelope=False, return_generator=False, n_jobs=1,
+                    verbose=None):
+        """Filter the epochs with a bank of FIR filters
+
+        Applies a zero-phase FIR filter for each (l_freq, h_freq) band to
+        the channels selected by "picks" and returns the results. The data
+        of the Epochs are not modified. The spectrum of the data is computed
+        once and shared by all the bands.
+
+        Parameters
+        ----------
+        bands : list of tuple
+            The (l_freq, h_freq) cut-off frequencies in Hz of each band.
+            If l_freq is None the band is a low-pass at h_freq, if h_freq is
+            None the band is a high-pass at l_freq, otherwise it is a
+            band-pass.
+        picks : array-like of int | None
+            Indices of channels to filter. If None only the data (MEG/EEG)
+            channels will be filtered.
+        filter_length : str (Default: '10s') | int | None
+            Length of the filter to use. See mne.filter.filter_bank.
+        l_trans_bandwidth : float
+            Width of the transition band at the low cut-off frequency in Hz.
+        h_trans_bandwidth : float
+            Width of the transition band at the high cut-off frequency in Hz.
+        envelope : bool
+            If True, return the envelope of the output of each band.
+        return_generator : bool
+            If True, return a generator that yields the output of each band
+            in turn instead of an array with all of them.
+        n_jobs : int
+            Number of jobs to run in parallel.
+        verbose : bool, str, int, or None
+            If not None, override default verbose level (see mne.verbose).
+            Defaults to self.verbose.
+
+        Returns
+        -------
+        data : array | generator
+            The filtered data (or their envelopes) of each band, with shape
+            (n_bands, n_epochs, n_channels, n_times).
+        """
+        if picks is None:
+            picks = pick_types(self.info, meg=True, eeg=True, ref_meg=False,
+                               exclude=[])
+        data = self.get_data()[:, picks]
+        return filter_bank(data, self.info['sfreq'], bands,
+                           filter_length=filter_length,
+                           l_trans_bandwidth=l_trans_bandwidth,
+                           h_trans_bandwidth=h_trans_bandwidth,
+                           envelope=envelope,
+                           return_generator=return_generator, n_jobs=n_jobs)
+
     def copy(self):
         """Return copy of Epochs instance"""
         raw = self.raw
@@ -1267,6 +1660,7 @@ class Epochs(_BaseEpochs):
         new = cp.deepcopy(self)
         self.raw = raw
         new.raw = raw
+        new._own_memmap = False
 
         return new
 
@@ -1401,6 +1795,7 @@ class Epochs(_BaseEpochs):
         n_channel_types = 0
         ch_types_used = []
 
+        from .viz import _mutable_defaults
         scalings = _mutable_defaults(('scalings', scalings))[0]
         for t in scalings.keys():
             if t in types:
@@ -1550,10 +1945,7 @@ class Epochs(_BaseEpochs):
         for eq in event_ids:
             eq = np.atleast_1d(eq)
             # eq is now a list of types
-            key_match = np.zeros(epochs.events.shape[0])
-            for key in eq:
-                key_match = np.logical_or(key_match, epochs._key_match(key))
-            eq_inds.append(np.where(key_match)[0])
+            eq_inds.append(np.where(epochs._key_match(list(eq)))[0])
 
         event_times = [epochs.events[e, 0] for e in eq_inds]
         indices = _get_drop_indices(event_times, method)
@@ -1668,14 +2060,11 @@ class EpochsArray(Epochs):
         self.reject_tmin = reject_tmin
         self.reject_tmax = reject_tmax
         self._reject_setup()
+        self._ptp = None
         drop_inds = list()
         if self.reject is not None or self.flat is not None:
-            for i_epoch, epoch in enumerate(self):
-                is_good, chan = self._is_good_epoch(epoch,
-                                                    verbose=self.verbose)
-                if not is_good:
-                    drop_inds.append(i_epoch)
-                    self.drop_log[i_epoch].extend(chan)
+            good = self._reject_ptp(self._get_ptp(self._data))
+            drop_inds = np.setdiff1d(self.selection, good).tolist()
         if drop_inds:
             select = np.ones(len(events), dtype=np.bool)
             select[drop_inds] = False
@@ -1828,36 +2217,13 @@ def _is_good(e, ch_names, channel_type_idx, reject, flat, full_report=False,
     defined in reject and flat. If full_report=True, it will give
     True/False as well as a list of all offending channels.
     """
-    bad_list = list()
-    has_printed = False
-    checkable = np.ones(len(ch_names), dtype=bool)
-    checkable[np.array([c in ignore_chs
-                        for c in ch_names], dtype=bool)] = False
-    for refl, f, t in zip([reject, flat], [np.greater, np.less], ['', 'flat']):
-        if refl is not None:
-            for key, thresh in six.iteritems(refl):
-                idx = channel_type_idx[key]
-                name = key.upper()
-                if len(idx) > 0:
-                    e_idx = e[idx]
-                    deltas = np.max(e_idx, axis=1) - np.min(e_idx, axis=1)
-                    checkable_idx = checkable[idx]
-                    idx_deltas = np.where(np.logical_and(f(deltas, thresh),
-                                                         checkable_idx))[0]
-
-                    if len(idx_deltas) > 0:
-                        ch_name = [ch_names[idx[i]] for i in idx_deltas]
-                        if (not has_printed):
-                            logger.info('    Rejecting %s epoch based on %s : '
-                                        '%s' % (t, name, ch_name))
-                            has_printed = True
-                        if not full_report:
-                            return False
-                        else:
-                            bad_list.extend(ch_name)
+    ptp = np.ptp(e, axis=1)[np.newaxis]
+    _, bad_list = _reject_from_ptp(ptp, ch_names, channel_type_idx, reject,
+                                   flat, ignore_chs)
+    bad_list = bad_list[0]
 
     if not full_report:
-        return True
+        return len(bad_list) == 0
     else:
         if bad_list == []:
             return True, None
@@ -1866,7 +2232,64 @@ def _is_good(e, ch_names, channel_type_idx, reject, flat, full_report=False,
 
 
 @verbose
-def read_epochs(fname, proj=True, add_eeg_ref=True, verbose=None):
+def _reject_from_ptp(ptp, ch_names, channel_type_idx, reject, flat,
+                     ignore_chs=[], verbose=None):
+    """Apply the criteria defined in reject and flat to several epochs
+
+    Parameters
+    ----------
+    ptp : array, shape (n_epochs, n_channels)
+        The peak-to-peak amplitude of each channel in each epoch. Epochs
+        with NaN amplitudes are never rejected.
+    ch_names : list of str
+        The channel names.
+    channel_type_idx : dict
+        The indices of the channels of each type.
+    reject : dict | None
+        The peak-to-peak rejection thresholds.
+    flat : dict | None
+        The flatness rejection thresholds.
+    ignore_chs : list of str
+        The channels that are never checked.
+    verbose : bool, str, int, or None
+        If not None, override default verbose level (see mne.verbose).
+
+    Returns
+    -------
+    bad : array of bool, shape (n_epochs, n_channels)
+        The channels that meet the rejection criteria in each epoch.
+    bad_lists : list of list of str
+        The offending channels of each epoch, in the order of the criteria
+        (empty for good epochs).
+    """
+    checkable = np.array([c not in ignore_chs for c in ch_names], dtype=bool)
+    bad = np.zeros(ptp.shape, dtype=bool)
+    criteria = list()
+    for refl, f, t in zip([reject, flat], [np.greater, np.less], ['', 'flat']):
+        if refl is not None:
+            for key, thresh in six.iteritems(refl):
+                idx = np.array(channel_type_idx[key], dtype=int)
+                if len(idx) > 0:
+                    with np.errstate(invalid='ignore'):  # NaN amplitudes
+                        this_bad = f(ptp[:, idx], thresh) & checkable[idx]
+                    bad[:, idx] |= this_bad
+                    criteria.append((t, key.upper(), idx, this_bad))
+
+    bad_lists = [list() for _ in range(len(ptp))]
+    for ii in np.where(bad.any(axis=1))[0]:
+        for t, name, idx, this_bad in criteria:
+            ch_name = [ch_names[k] for k in idx[this_bad[ii]]]
+            if len(ch_name) > 0:
+                if len(bad_lists[ii]) == 0:
+                    logger.info('    Rejecting %s epoch based on %s : '
+                                '%s' % (t, name, ch_name))
+                bad_lists[ii].extend(ch_name)
+    return bad, bad_lists
+
+
+@verbose
+def read_epochs(fname, proj=True, add_eeg_ref=True, preload=True,
+                mmap=False, verbose=None):
     """Read epochs from a fif file
 
     Parameters
@@ -1887,6 +2310,19 @@ def read_epochs(fname, proj=True, add_eeg_ref=True, verbose=None):
     add_eeg_ref : bool
         If True, an EEG average reference will be added (unless one
         already exists).
+    preload : bool
+        If True (default), all the epochs are read into memory. If False,
+        only the position of the data in the file is recorded, and the
+        epochs are read on demand, e.g. when iterating over them or when
+        calling get_data after selecting a subset of them.
+    mmap : bool | str
+        If True, the data are stored in a memory-mapped temporary file
+        (in ``MNE_CACHE_DIR`` if it is set) instead of being loaded into
+        memory. If str, the name of the memory-mapped file to use. The data
+        are calibrated block by block, so the whole array is never held in
+        memory. The file is removed when the Epochs object is deleted.
+        Not supported for compressed (.gz) files. Only used if preload is
+        True.
     verbose : bool, str, int, or None
         If not None, override default verbose level (see mne.verbose).
         Defaults to raw.verbose.
@@ -1897,6 +2333,9 @@ def read_epochs(fname, proj=True, add_eeg_ref=True, verbose=None):
         The epochs
     """
     check_fname(fname, 'epochs', ('-epo.fif', '-epo.fif.gz'))
+    mmap = mmap if preload else False
+    if mmap and fname.endswith('.gz'):
+        raise ValueError('mmap cannot be used with compressed (.gz) files')
 
     epochs = Epochs(None, None, None, None, None)
 
@@ -1924,7 +2363,7 @@ def read_epochs(fname, proj=True, add_eeg_ref=True, verbose=None):
 
     # Now find the data in the block
     comment = None
-    data = None
+    data_pos = None
     bmin, bmax = None, None
     baseline = None
     selection = None
@@ -1942,8 +2381,8 @@ def read_epochs(fname, proj=True, add_eeg_ref=True, verbose=None):
             tag = read_tag(fid, pos)
             comment = tag.data
         elif kind == FIFF.FIFF_EPOCH:
-            tag = read_tag(fid, pos)
-            data = tag.data.astype(np.float)
+            # the data are read below
+            data_pos = pos
         elif kind == FIFF.FIFF_MNE_BASELINE_MIN:
             tag = read_tag(fid, pos)
             bmin = float(tag.data)
@@ -1970,28 +2409,52 @@ def read_epochs(fname, proj=True, add_eeg_ref=True, verbose=None):
                     % len(info['comps']))
 
     # Read the data
-    if data is None:
+    if data_pos is None:
         raise ValueError('Epochs data not found')
 
-    if data.shape[2] != nsamp:
+    cals = np.array([info['chs'][k]['cal'] * info['chs'][k].get('scale', 1.0)
+                     for k in range(info['nchan'])])
+    data_info = _get_epochs_data_info(fid, data_pos)
+    if not preload and data_info is None:
+        logger.info('    Cannot read the epochs on demand, preloading')
+        preload = True
+    data = None
+    if not preload:
+        shape = data_info[2]
+    elif mmap:
+        if isinstance(mmap, string_types):
+            data_buffer = mmap
+        else:
+            fd, data_buffer = tempfile.mkstemp(
+                suffix='-epo.dat', dir=get_config('MNE_CACHE_DIR', None))
+            os.close(fd)
+        data = _read_epochs_data_mmap(fid, data_pos, cals, data_buffer)
+        epochs._own_memmap = True
+        shape = data.shape
+    else:
+        tag = read_tag(fid, data_pos)
+        data = tag.data.astype(np.float)
+        shape = data.shape
+
+    if shape[2] != nsamp:
         fid.close()
         raise ValueError('Incorrect number of samples (%d instead of %d)'
-                         % (data.shape[2], nsamp))
+                         % (shape[2], nsamp))
 
     # Calibrate
-    cals = np.array([info['chs'][k]['cal'] * info['chs'][k].get('scale', 1.0)
-                     for k in range(info['nchan'])])
-    data *= cals[np.newaxis, :, np.newaxis]
+    if preload and not mmap:
+        data *= cals[np.newaxis, :, np.newaxis]
 
     times = np.arange(first, last + 1, dtype=np.float) / info['sfreq']
     tmin = times[0]
     tmax = times[-1]
 
     # Put it all together
-    epochs.preload = True
+    epochs.preload = preload
     epochs.raw = None
-    epochs.picks = np.arange(data.shape[1])
+    epochs.picks = np.arange(shape[1])
     epochs._bad_dropped = True
+    epochs._ptp = None
     epochs.events = events
     epochs._data = data
     epochs.info = info
@@ -2017,11 +2480,62 @@ def read_epochs(fname, proj=True, add_eeg_ref=True, verbose=None):
 
     epochs.selection = selection
     epochs.drop_log = drop_log
+    if not preload:
+        # the epochs are read by _iter_epochs_from_file
+        offset, dtype, _ = data_info
+        epochs.reject = epochs.flat = None
+        epochs._epochs_file = dict(fname=fname, pos=offset, dtype=dtype,
+                                   shape=shape, cals=cals,
+                                   rows=dict(zip(selection, range(shape[0]))))
+        epochs._fid_pool = _FidPool(max_fids=1)
     fid.close()
 
     return epochs
 
 
+def _get_epochs_data_info(fid, pos):
+    """Find the offset, dtype and shape of the data in an epochs tag
+
+    Returns None if the tag is not a dense floating-point matrix.
+    """
+    fid.seek(pos, 0)
+    tag = read_tag_info(fid)
+    dtype = {FIFF.FIFFT_FLOAT: '>f4',
+             FIFF.FIFFT_DOUBLE: '>f8'}.get(tag.type & 0xffff)
+    if tag.type >> 16 != 0x4000 or dtype is None:  # not a dense matrix
+        return None
+    fid.seek(pos + 16 + tag.size - 4, 0)
+    ndim = int(np.fromstring(fid.read(4), dtype='>i4'))
+    if ndim != 3:
+        return None
+    fid.seek(-(ndim + 1) * 4, 1)
+    dims = tuple(np.fromstring(fid.read(4 * ndim), dtype='>i4')[::-1])
+    return pos + 16, dtype, dims
+
+
+def _read_epochs_data_mmap(fid, pos, cals, data_buffer, block_size=2 ** 22):
+    """Copy the calibrated data of an epochs tag to a memory-mapped file
+
+    The tag is accessed through a read-only memory map and converted in
+    blocks of about block_size values.
+    """
+    data_info = _get_epochs_data_info(fid, pos)
+    if data_info is None:
+        tag = read_tag(fid, pos)
+        dims, src = tag.data.shape, tag.data
+    else:
+        offset, dtype, dims = data_info
+        src = np.memmap(fid, dtype=dtype, mode='r', offset=offset,
+                        shape=dims)
+    data = _allocate_data(None, data_buffer, dims, np.float)
+    n_epochs = max(block_size // max(dims[1] * dims[2], 1), 1)
+    for start in range(0, dims[0], n_epochs):
+        stop = min(start + n_epochs, dims[0])
+        data[start:stop] = src[start:stop] * cals[np.newaxis, :, np.newaxis]
+    data.flush()
+    return data
+
+
 def bootstrap(epochs, random_state=None):
     """Compute epochs selected by bootstrapping
 
@@ -19,6 +19,149 @@ from .io.write import write_int, start_block, start_file, end_block, end_file
 from .io.pick import pick_channels
 
 
+class Events(object):
+    """Events sorted by time, indexed by sample and id
+
+    Parameters
+    ----------
+    events : array, shape (n_events, 3)
+        The events, as returned by mne.find_events. They are sorted by
+        sample, keeping the order of the events of the same sample.
+
+    Attributes
+    ----------
+    events : array, shape (n_events, 3)
+        The sorted events.
+
+    Notes
+    -----
+    The events of a time range are found by binary search of the samples,
+    in O(log(n_events)), and the events of each id are indexed on the first
+    selection by id, so that selections do not scan all the events. Use
+    np.asarray(events) to get the array of events.
+    """
+    def __init__(self, events):
+        events = np.array(events)
+        if events.ndim != 2 or events.shape[1] != 3:
+            raise ValueError('events must be an array of shape (n_events, '
+                             '3), got shape %s' % (events.shape,))
+        # a stable sort keeps the order of simultaneous events
+        self.events = events[np.argsort(events[:, 0], kind='mergesort')]
+        self._id_index = None
+
+    def __repr__(self):
+        ids = np.unique(self.events[:, 2])
+        return '<Events  |  n_events : %d, ids : %s>' % (len(self), ids)
+
+    def __len__(self):
+        return len(self.events)
+
+    def __array__(self, dtype=None):
+        if dtype is None:
+            return self.events
+        return self.events.astype(dtype)
+
+    @property
+    def samples(self):
+        """The samples of the events"""
+        return self.events[:, 0]
+
+    @property
+    def ids(self):
+        """The ids of the events"""
+        return self.events[:, 2]
+
+    def _get_id_indices(self, event_id):
+        """Get the sorted indices of the events of an id"""
+        if self._id_index is None:
+            ids, inverse = np.unique(self.ids, return_inverse=True)
+            order = np.argsort(inverse, kind='mergesort')
+            splits = np.cumsum(np.bincount(inverse))[:-1]
+            self._id_index = dict(zip(ids.tolist(), np.split(order, splits)))
+        return self._id_index.get(event_id, np.empty(0, dtype=int))
+
+    def between(self, start, stop):
+        """Get the events from sample start to sample stop (excluded)
+
+        Parameters
+        ----------
+        start : int
+            The first sample.
+        stop : int
+            The first sample after the events.
+
+        Returns
+        -------
+        events : instance of Events
+            The events of the time range.
+        """
+        first, last = np.searchsorted(self.samples, [start, stop])
+        return Events(self.events[first:last])
+
+    def pick(self, include=None, exclude=None):
+        """Select the events of some ids
+
+        Parameters
+        ----------
+        include : int | list of int | None
+            The ids of the events to keep. If None all ids are kept.
+        exclude : int | list of int | None
+            The ids of the events to drop, ignored if include is not None.
+
+        Returns
+        -------
+        events : instance of Events
+            The selected events.
+        """
+        if include is not None:
+            idx = [self._get_id_indices(event_id)
+                   for event_id in np.atleast_1d(include)]
+            idx = np.sort(np.concatenate([np.empty(0, dtype=int)] + idx))
+            return Events(self.events[idx])
+        elif exclude is not None:
+            keep = np.logical_not(np.in1d(self.ids, exclude))
+            return Events(self.events[keep])
+        return Events(self.events)
+
+    def find_targets(self, reference_id, target_id, start, stop):
+        """Find the first target event that follows each reference event
+
+        Parameters
+        ----------
+        reference_id : int
+            The id of the reference events.
+        target_id : int
+            The id of the target events.
+        start : int
+            The target events must come more than start samples after the
+            reference event (start can be negative).
+        stop : int
+            The target events must come less than stop samples after the
+            reference event.
+
+        Returns
+        -------
+        reference_idx : array of int
+            The indices of the reference events.
+        target_idx : array of int
+            The index of the first target event of each reference event, -1
+            if there is none.
+        """
+        reference_idx = self._get_id_indices(reference_id)
+        target_idx = self._get_id_indices(target_id)
+        if len(target_idx) == 0:
+            return reference_idx, -np.ones(len(reference_idx), dtype=int)
+        # in int64, as the samples read from files are unsigned
+        reference_samples = self.samples[reference_idx].astype(np.int64)
+        target_samples = self.samples[target_idx].astype(np.int64)
+        first = np.searchsorted(target_samples, reference_samples + start,
+                                side='right')
+        found = first < len(target_samples)
+        first = np.minimum(first, len(target_samples) - 1)
+        found &= target_samples[first] < reference_samples + stop
+        return reference_idx, np.where(found, target_idx[first], -1)
+
+
 def pick_events(events, include=None, exclude=None):
     """Select some events
 
@@ -42,17 +185,11 @@ def pick_events(events, include=None, exclude=None):
     if include is not None:
         if not isinstance(include, list):
             include = [include]
-        mask = np.zeros(len(events), dtype=np.bool)
-        for e in include:
-            mask = np.logical_or(mask, events[:, 2] == e)
-        events = events[mask]
+        events = events[np.in1d(events[:, 2], include)]
     elif exclude is not None:
         if not isinstance(exclude, list):
             exclude = [exclude]
-        mask = np.ones(len(events), dtype=np.bool)
-        for e in exclude:
-            mask = np.logical_and(mask, events[:, 2] != e)
-        events = events[mask]
+        events = events[np.logical_not(np.in1d(events[:, 2], exclude))]
     else:
         events = np.copy(events)
 
@@ -98,6 +235,10 @@ def define_target_events(events, reference_id, target_id, sfreq, tmin, tmax,
         The new defined events
     lag : ndarray
         time lag between reference and target in milliseconds.
+
+    Notes
+    -----
+    The first target event in time within the time window is used.
     """
 
     if new_id is None:
@@ -107,24 +248,23 @@ def define_target_events(events, reference_id, target_id, sfreq, tmin, tmax,
     imin = int(tmin * sfreq)
     imax = int(tmax * sfreq)
 
-    new_events = []
-    lag = []
-    for event in events.copy().astype('f8'):
-        if event[2] == reference_id:
-            lower = event[0] + imin
-            upper = event[0] + imax
-            res = events[(events[:, 0] > lower) &
-                         (events[:, 0] < upper) & (events[:, 2] == target_id)]
-            if res.any():
-                lag += [event[0] - res[0][0]]
-                event[2] = new_id
-                new_events += [event]
-            elif fill_na is not None:
-                event[2] = fill_na
-                new_events += [event]
-                lag += [fill_na]
-
-    new_events = np.array(new_events)
+    order = np.argsort(events[:, 0], kind='mergesort')
+    events = Events(events[order])
+    ref_idx, target_idx = events.find_targets(reference_id, target_id, imin,
+                                              imax)
+    # keep the order of the reference events in events
+    restore = np.argsort(order[ref_idx], kind='mergesort')
+    ref_idx, target_idx = ref_idx[restore], target_idx[restore]
+    found = target_idx >= 0
+    if fill_na is None:  # drop the reference events without target
+        ref_idx, target_idx, found = (ref_idx[found], target_idx[found],
+                                      found[found])
+    new_events = events.events[ref_idx].astype('f8')
+    lag = new_events[:, 0] - events.samples[target_idx]
+    new_events[found, 2] = new_id
+    if fill_na is not None:
+        new_events[~found, 2] = fill_na
+        lag[~found] = fill_na
 
     lag = np.abs(lag, dtype='f8')
     if lag.any():
@@ -286,17 +426,22 @@ def write_events(filename, event_list):
         f.close()
 
 
-def _find_stim_steps(data, first_samp, pad_start=None, pad_stop=None, merge=0):
+def _stim_steps(data, first_samp):
+    """Find the samples where all the stim channels change, before padding"""
     changed = np.diff(data, axis=1) != 0
     idx = np.where(np.all(changed, axis=0))[0]
-    if len(idx) == 0:
-        return np.empty((0, 3), dtype='int32')
-
     pre_step = data[0, idx]
     idx += 1
     post_step = data[0, idx]
     idx += first_samp
-    steps = np.c_[idx, pre_step, post_step]
+    return np.c_[idx, pre_step, post_step]
+
+
+def _pad_merge_steps(steps, last_idx, pad_start=None, pad_stop=None,
+                     merge=0):
+    """Pad and merge the steps of a stim channel ending at last_idx"""
+    if len(steps) == 0:
+        return np.empty((0, 3), dtype='int32')
 
     if pad_start is not None:
         v = steps[0, 1]
@@ -306,7 +451,6 @@ def _find_stim_steps(data, first_samp, pad_start=None, pad_stop=None, merge=0):
     if pad_stop is not None:
         v = steps[-1, 2]
         if v != pad_stop:
-            last_idx = len(data[0]) + first_samp
             steps = np.append(steps, [[last_idx, v, pad_stop]], axis=0)
 
     if merge != 0:
@@ -331,6 +475,51 @@ def _find_stim_steps(data, first_samp, pad_start=None, pad_stop=None, merge=0):
     return steps
 
 
+def _find_stim_steps(data, first_samp, pad_start=None, pad_stop=None, merge=0):
+    steps = _stim_steps(data, first_samp)
+    return _pad_merge_steps(steps, len(data[0]) + first_samp,
+                            pad_start=pad_start, pad_stop=pad_stop,
+                            merge=merge)
+
+
+def _check_stim_data(data, warned=False):
+    """Make the stim channel data positive integers
+
+    Returns the data and whether the negative values were warned about.
+    """
+    if np.any(data < 0):
+        if not warned:
+            logger.warning('Trigger channel contains negative values. '
+                           'Taking absolute value.')
+            warned = True
+        data = np.abs(data)  # make sure trig channel is positive
+    return data.astype(np.int), warned
+
+
+def _find_raw_stim_steps(raw, picks, pad_start=None, pad_stop=None, merge=0):
+    """Find the steps of stim channels, reading the data chunk by chunk
+
+    The data that are not preloaded are read in chunks, keeping only the
+    stim channels, and the last sample of each chunk is carried over to
+    detect the steps at the chunk boundaries.
+    """
+    steps = list()
+    last = None
+    warned = False
+    for start, data in raw._iter_chunks(picks):
+        data, warned = _check_stim_data(data, warned)
+        if last is None:
+            steps.append(_stim_steps(data, raw.first_samp))
+        else:
+            steps.append(_stim_steps(np.c_[last, data],
+                                     raw.first_samp + start - 1))
+        last = data[:, -1]
+    steps = np.concatenate(steps, axis=0)
+    return _pad_merge_steps(steps, raw.n_times + raw.first_samp,
+                            pad_start=pad_start, pad_stop=pad_stop,
+                            merge=merge)
+
+
 def find_stim_steps(raw, pad_start=None, pad_stop=None, merge=0,
                     stim_channel=None):
     """Find all steps in data from a stim channel
@@ -376,35 +565,33 @@ def find_stim_steps(raw, pad_start=None, pad_stop=None, merge=0,
     picks = pick_channels(raw.info['ch_names'], include=stim_channel)
     if len(picks) == 0:
         raise ValueError('No stim channel found to extract event triggers.')
-    data, _ = raw[picks, :]
-    if np.any(data < 0):
-        logger.warning('Trigger channel contains negative values. '
-                       'Taking absolute value.')
-        data = np.abs(data)  # make sure trig channel is positive
-    data = data.astype(np.int)
-
-    return _find_stim_steps(data, raw.first_samp, pad_start=pad_start,
-                            pad_stop=pad_stop, merge=merge)
+    return _find_raw_stim_steps(raw, picks, pad_start=pad_start,
+                                pad_stop=pad_stop, merge=merge)
 
 
-@verbose
-def _find_events(data, first_samp, verbose=None, output='onset',
-                 consecutive='increasing', min_samples=0, mask=0):
-    """Helper function for find events"""
+def _min_samples_merge(min_samples):
+    """Get the merge of the steps shorter than min_samples"""
     if min_samples > 0:
         merge = int(min_samples // 1)
         if merge == min_samples:
             merge -= 1
     else:
         merge = 0
+    return merge
 
-    if np.any(data < 0):
-        logger.warning('Trigger channel contains negative values. '
-                       'Taking absolute value.')
-        data = np.abs(data)  # make sure trig channel is positive
-    data = data.astype(np.int)
 
-    events = _find_stim_steps(data, first_samp, pad_stop=0, merge=merge)
+@verbose
+def _find_events(data, first_samp, verbose=None, output='onset',
+                 consecutive='increasing', min_samples=0, mask=0):
+    """Helper function for find events"""
+    data, _ = _check_stim_data(data)
+    events = _find_stim_steps(data, first_samp, pad_stop=0,
+                              merge=_min_samples_merge(min_samples))
+    return _steps_to_events(events, output, consecutive, mask)
+
+
+def _steps_to_events(events, output, consecutive, mask):
+    """Helper to get the events from the steps of a stim channel"""
     events = _mask_trigs(events, mask)
 
     # Determine event onsets and offsets
@@ -574,11 +761,9 @@ def find_events(raw, stim_channel=None, verbose=None, output='onset',
     pick = pick_channels(raw.info['ch_names'], include=stim_channel)
     if len(pick) == 0:
         raise ValueError('No stim channel found to extract event triggers.')
-    data, _ = raw[pick, :]
-
-    events = _find_events(data, raw.first_samp, verbose=verbose, output=output,
-                          consecutive=consecutive, min_samples=min_samples,
-                          mask=mask)
+    steps = _find_raw_stim_steps(raw, pick, pad_stop=0,
+                                 merge=_min_samples_merge(min_samples))
+    events = _steps_to_events(steps, output, consecutive, mask)
 
     # add safety check for spurious events (for ex. from neuromag syst.) by
     # checking the number of low sample events
@@ -630,12 +815,8 @@ def merge_events(events, ids, new_id, replace_events=True):
         The new events
     """
     events_out = events.copy()
-    where = np.empty(events.shape[0], dtype=bool)
     for col in [1, 2]:
-        where.fill(False)
-        for i in ids:
-            where = (events[:, col] == i)
-            events_out[where, col] = new_id
+        events_out[np.in1d(events[:, col], ids), col] = new_id
     if not replace_events:
         events_out = np.concatenate((events_out, events), axis=0)
         events_out = events_out[np.argsort(events_out[:, 0])]
@@ -18,10 +18,6 @@ from .filter import resample, detrend
 from .fixes import in1d
 from .utils import (_check_pandas_installed, check_fname, logger, verbose,
                     object_hash, deprecated)
-from .viz import plot_evoked, plot_evoked_topomap, _mutable_defaults
-from .viz import plot_evoked_field
-from .viz import plot_evoked_image
-from .viz.evoked import _plot_evoked_white
 from .externals.six import string_types
 
 from .io.constants import FIFF
@@ -380,6 +376,7 @@ class Evoked(ProjMixin, ContainsMixin, PickDropChannelsMixin,
             the same length as the number of channel types. If instance of
             Axes, there must be only one channel type plotted.
         """
+        from .viz import plot_evoked
         return plot_evoked(self, picks=picks, exclude=exclude, unit=unit,
                            show=show, ylim=ylim, proj=proj, xlim=xlim,
                            hline=hline, units=units, scalings=scalings,
@@ -426,6 +423,7 @@ class Evoked(ProjMixin, ContainsMixin, PickDropChannelsMixin,
         cmap : matplotlib colormap
             Colormap.
         """
+        from .viz import plot_evoked_image
         return plot_evoked_image(self, picks=picks, exclude=exclude, unit=unit,
                                  show=show, clim=clim, proj=proj, xlim=xlim,
                                  units=units, scalings=scalings,
@@ -526,6 +524,7 @@ class Evoked(ProjMixin, ContainsMixin, PickDropChannelsMixin,
             starts 5 ms before and ends 5 ms after a given time point.
             Defaults to None, which means no averaging.
         """
+        from .viz import plot_evoked_topomap
         return plot_evoked_topomap(self, times=times, ch_type=ch_type,
                                    layout=layout, vmin=vmin,
                                    vmax=vmax, cmap=cmap, sensors=sensors,
@@ -561,6 +560,7 @@ class Evoked(ProjMixin, ContainsMixin, PickDropChannelsMixin,
         fig : instance of mlab.Figure
             The mayavi figure.
         """
+        from .viz import plot_evoked_field
         return plot_evoked_field(self, surf_maps, time=time,
                                  time_label=time_label, n_jobs=n_jobs)
 
@@ -597,6 +597,7 @@ class Evoked(ProjMixin, ContainsMixin, PickDropChannelsMixin,
             covariance estimation and spatial whitening of MEG and EEG signals.
             NeuroImage.
         """
+        from .viz.evoked import _plot_evoked_white
         return _plot_evoked_white(self, noise_cov=noise_cov, scalings=None,
                                   rank=None, show=show)
 
@@ -671,6 +672,7 @@ class Evoked(ProjMixin, ContainsMixin, PickDropChannelsMixin,
         n_channel_types = 0
         ch_types_used = []
 
+        from .viz import _mutable_defaults
         scalings = _mutable_defaults(('scalings', scalings))[0]
         for t in scalings.keys():
             if t in types:
@@ -764,7 +766,11 @@ class Evoked(ProjMixin, ContainsMixin, PickDropChannelsMixin,
         return out
 
     def __hash__(self):
-        return object_hash(dict(info=self.info, data=self.data))
+        return object_hash(self)
+
+    def _get_hash_obj(self):
+        """Get the content that identifies the data (see object_hash)"""
+        return dict(info=self.info, data=self.data)
 
     def get_peak(self, ch_type=None, tmin=None, tmax=None, mode='abs',
                  time_as_index=False):
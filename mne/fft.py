@@ -0,0 +1,253 @@
+"""FFTs on the CPU with numpy, scipy or pyFFTW
+"""
+
+# License: BSD (3-clause)
+
+import numpy as np
+
+from . import parallel
+from .utils import get_config, logger, verbose
+
+# The FFT backend, chosen by set_fft_backend or on the first FFT
+_backend = dict(name=None, module=None, threads_kwarg=None, n_threads=1)
+_known_backends = ('auto', 'numpy', 'scipy', 'pyfftw')
+
+
+def _get_scipy_fft():
+    """Get the scipy.fft module, None if scipy is older than 1.4"""
+    try:
+        import scipy.fft
+    except ImportError:
+        return None
+    return scipy.fft
+
+
+def _has_pyfftw():
+    """Check if pyFFTW is installed"""
+    try:
+        import pyfftw  # noqa
+    except ImportError:
+        return False
+    return True
+
+
+@verbose
+def set_fft_backend(backend=None, n_threads=None, verbose=None):
+    """Set the library used for the FFTs computed on the CPU
+
+    This is used by filtering, resampling, time-frequency transforms and
+    spectral estimation (FFTs on the GPU are set up with mne.cuda).
+
+    Parameters
+    ----------
+    backend : 'auto' | 'numpy' | 'scipy' | 'pyfftw' | None
+        The FFT library. 'scipy' (scipy >= 1.4, which has scipy.fft) and
+        'pyfftw' compute each FFT with several threads and reuse their
+        plans. 'auto' uses pyFFTW if it is installed, else scipy if it is
+        recent enough, else numpy. None uses the MNE_FFT_BACKEND config
+        (defaults to 'auto').
+    n_threads : int | None
+        The number of threads of each FFT. None uses the thread budget of
+        MNE (see mne.set_num_threads). Within the jobs or threads run in
+        parallel, each FFT uses at most the threads allotted to its job or
+        thread.
+    verbose : bool, str, int, or None
+        If not None, override default verbose level (see mne.verbose).
+
+    Returns
+    -------
+    backend : str
+        The backend used.
+    """
+    if backend is None:
+        backend = get_config('MNE_FFT_BACKEND', 'auto')
+    if backend not in _known_backends:
+        raise ValueError('backend must be one of %s, got %s'
+                         % (', '.join(_known_backends), backend))
+    if n_threads is None:
+        n_threads = parallel._get_num_threads()
+    if not isinstance(n_threads, int) or n_threads < 1:
+        raise ValueError('n_threads must be a positive integer, got %s'
+                         % (n_threads,))
+    if backend == 'auto':
+        if _has_pyfftw():
+            backend = 'pyfftw'
+        elif _get_scipy_fft() is not None:
+            backend = 'scipy'
+        else:
+            backend = 'numpy'
+    if backend == 'pyfftw':
+        if not _has_pyfftw():
+            raise RuntimeError('pyFFTW is not installed')
+        import pyfftw.interfaces.cache
+        from pyfftw.interfaces import numpy_fft
+        # keep the FFTW objects (plans and aligned arrays) between calls
+        pyfftw.interfaces.cache.enable()
+        pyfftw.interfaces.cache.set_keepalive_time(60.)
+        module, threads_kwarg = numpy_fft, 'threads'
+    elif backend == 'scipy':
+        module = _get_scipy_fft()
+        if module is None:
+            raise RuntimeError('scipy.fft is not available, scipy is too old')
+        # the plans are cached by scipy itself
+        threads_kwarg = 'workers'
+    else:
+        module, threads_kwarg = np.fft, None
+        n_threads = 1
+    _backend.update(name=backend, module=module, threads_kwarg=threads_kwarg,
+                    n_threads=n_threads)
+    logger.info('Using the %s FFT backend with %d thread%s'
+                % (backend, n_threads, 's' if n_threads > 1 else ''))
+    return backend
+
+
+def get_fft_backend():
+    """Get the library used for the FFTs computed on the CPU
+
+    Returns
+    -------
+    backend : str
+        The backend used, 'numpy', 'scipy' or 'pyfftw'.
+    """
+    if _backend['name'] is None:
+        set_fft_backend(verbose=False)
+    return _backend['name']
+
+
+def _fft_call(kind, x, n, axis):
+    """Compute an FFT with the backend
+
+    Like numpy, all the backends compute the FFTs in double precision.
+    """
+    if _backend['name'] is None:
+        set_fft_backend(verbose=False)
+    x = np.asarray(x)
+    x = x.astype(np.complex128 if np.iscomplexobj(x) else np.float64,
+                 copy=False)
+    kwargs = dict()
+    if _backend['threads_kwarg'] is not None:
+        n_threads = _backend['n_threads']
+        limit = parallel._get_thread_limit()
+        if limit is not None:  # share of a parallel job or thread
+            n_threads = min(n_threads, limit)
+        kwargs[_backend['threads_kwarg']] = n_threads
+    return getattr(_backend['module'], kind)(x, n, axis, **kwargs)
+
+
+def fft(x, n=None, axis=-1):
+    """Compute the discrete Fourier transform along an axis
+
+    Parameters
+    ----------
+    x : array
+        The data.
+    n : int | None
+        The length of the transform. x is zero-padded or cropped to n.
+        None uses the length of x along axis.
+    axis : int
+        The axis of the transform.
+
+    Returns
+    -------
+    x_fft : array of complex
+        The transformed data.
+    """
+    return _fft_call('fft', x, n, axis)
+
+
+def ifft(x, n=None, axis=-1):
+    """Compute the inverse discrete Fourier transform along an axis
+
+    Parameters
+    ----------
+    x : array
+        The data.
+    n : int | None
+        The length of the transform. x is zero-padded or cropped to n.
+        None uses the length of x along axis.
+    axis : int
+        The axis of the transform.
+
+    Returns
+    -------
+    x_ifft : array of complex
+        The transformed data.
+    """
+    return _fft_call('ifft', x, n, axis)
+
+
+def rfft(x, n=None, axis=-1):
+    """Compute the discrete Fourier transform of real data along an axis
+
+    Parameters
+    ----------
+    x : array
+        The real data.
+    n : int | None
+        The length of the transform. x is zero-padded or cropped to n.
+        None uses the length of x along axis.
+    axis : int
+        The axis of the transform.
+
+    Returns
+    -------
+    x_fft : array of complex
+        The positive frequency terms of the transform (n // 2 + 1 terms).
+    """
+    return _fft_call('rfft', x, n, axis)
+
+
+def irfft(x, n=None, axis=-1):
+    """Compute the inverse of rfft along an axis
+
+    Parameters
+    ----------
+    x : array of complex
+        The positive frequency terms.
+    n : int | None
+        The length of the output. None uses 2 * (m - 1), m being the
+        length of x along axis.
+    axis : int
+        The axis of the transform.
+
+    Returns
+    -------
+    x_irfft : array
+        The real data.
+    """
+    return _fft_call('irfft', x, n, axis)
+
+
+def next_fast_len(target):
+    """Get the smallest FFT length that is at least target and fast
+
+    The fast lengths are the products of powers of 2, 3 and 5, which are
+    computed efficiently by all the backends.
+
+    Parameters
+    ----------
+    target : int
+        The minimal length.
+
+    Returns
+    -------
+    n_fft : int
+        The FFT length.
+    """
+    target = int(target)
+    if target <= 6:
+        return max(target, 1)
+    best = 2 ** (target - 1).bit_length()
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            # the smallest power of 2 that brings p35 up to target
+            quotient = -(-target // p35)
+            n_fft = p35 * 2 ** (quotient - 1).bit_length()
+            if n_fft == target:
+                return n_fft
+            best = min(best, n_fft)
+            p35 *= 3
+        p5 *= 5
+    return best
@@ -2,15 +2,19 @@
 
 from .externals.six import string_types, integer_types
 import warnings
+import threading
+from fractions import Fraction
 import numpy as np
-from scipy.fftpack import fft, ifftshift, fftfreq
-from scipy.signal import freqz, iirdesign, iirfilter, filter_dict, get_window
+from scipy.fftpack import ifftshift, fftfreq
+from scipy.signal import (freqz, iirdesign, iirfilter, filter_dict, get_window,
+                          firwin, hilbert)
 from scipy import signal, stats
 from copy import deepcopy
 
 from .fixes import firwin2, filtfilt  # back port for old scipy
 from .time_frequency.multitaper import dpss_windows, _mt_spectra
-from .parallel import parallel_func, check_n_jobs
+from .parallel import parallel_func, check_n_jobs, _thread_map
+from .fft import fft, rfft, irfft, next_fast_len
 from .cuda import (setup_cuda_fft_multiply_repeated, fft_multiply_repeated,
                    setup_cuda_fft_resample, fft_resample, _smart_pad)
 from .utils import logger, verbose, sum_squared
@@ -40,8 +44,151 @@ def is_power2(num):
     return num != 0 and ((num & (num - 1)) == 0)
 
 
+# Size of the working arrays of a block of channels filtered at once. Small
+# enough for the FFTs of a block to stay in cache for typical FFT lengths.
+_block_bytes = 2 ** 22
+
+
+def _channel_blocks(picks, row_bytes, n_jobs):
+    """Split picks into blocks of channels to filter at once
+
+    Each block takes at most about _block_bytes, with row_bytes per
+    channel, and there are at least n_jobs blocks when possible.
+    """
+    picks = np.asarray(picks, dtype=int)
+    n_per_block = max(_block_bytes // max(int(row_bytes), 1), 1)
+    n_per_block = min(n_per_block, int(np.ceil(len(picks) / float(n_jobs))))
+    n_per_block = max(n_per_block, 1)
+    return [picks[start:start + n_per_block]
+            for start in range(0, len(picks), n_per_block)]
+
+
+class _FilterCache(object):
+    """Bounded LRU cache of FIR kernels and their spectra
+
+    Entries are evicted, least recently used first, when there are more
+    than ``max_entries`` of them or when they take more than ``max_bytes``.
+    """
+    def __init__(self, max_entries=32, max_bytes=2 ** 28):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()  # channels may be filtered in threads
+        self.clear()
+
+    def clear(self):
+        self._data = dict()
+        self._order = list()  # least recently used first
+        self._n_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, compute):
+        """Get the value of key, calling compute() to create it if needed"""
+        with self._lock:
+            return self._get(key, compute)
+
+    def _get(self, key, compute):
+        if key in self._data:
+            self.hits += 1
+            self._order.remove(key)
+            self._order.append(key)
+            return self._data[key][0]
+        self.misses += 1
+        value = compute()
+        n_bytes = sum(v.nbytes for v in value if isinstance(v, np.ndarray))
+        if n_bytes > self.max_bytes:
+            return value
+        for v in value:
+            if isinstance(v, np.ndarray):
+                v.flags.writeable = False  # shared between calls
+        self._data[key] = (value, n_bytes)
+        self._order.append(key)
+        self._n_bytes += n_bytes
+        while (len(self._order) > self.max_entries or
+               self._n_bytes > self.max_bytes):
+            self._n_bytes -= self._data.pop(self._order.pop(0))[1]
+        return value
+
+    def info(self):
+        return dict(hits=self.hits, misses=self.misses,
+                    n_entries=len(self._order), n_bytes=self._n_bytes,
+                    max_entries=self.max_entries, max_bytes=self.max_bytes)
+
+
+_filter_cache = _FilterCache()
+
+
+def get_filter_cache_info():
+    """Get the statistics of the cache of FIR filter kernels
+
+    The FIR filters designed by the FFT-based filtering functions
+    (e.g., :func:`band_pass_filter`), and their spectra, are kept in a
+    bounded least-recently-used cache, so that filtering many signals with
+    the same parameters only designs the filter once.
+
+    Returns
+    -------
+    info : dict
+        The number of cache ``hits`` and ``misses`` since the last call
+        to :func:`clear_filter_cache`, the number of cached entries
+        ``n_entries`` and their size ``n_bytes``, and the bounds
+        ``max_entries`` and ``max_bytes`` of the cache.
+    """
+    return _filter_cache.info()
+
+
+def clear_filter_cache():
+    """Empty the cache of FIR filter kernels and reset its counters"""
+    _filter_cache.clear()
+
+
+def _design_fir(N, freq, gain, window='hamming'):
+    """Design a FIR filter with firwin2, using the kernel cache
+
+    The frequencies are normalized by the Nyquist frequency, so the key
+    of the kernel accounts for the sampling rate and the band edges.
+
+    Returns the filter, the attenuation at its stop frequency and its key
+    in the cache.
+    """
+    freq = np.asarray(freq, dtype=np.float64)
+    gain = np.asarray(gain, dtype=np.float64)
+    key = ('fir', int(N), tuple(freq), tuple(gain), window)
+
+    def compute():
+        h = firwin2(N, freq, gain, window=window)
+        att_db, att_freq = _filter_attenuation(h, freq, gain)
+        return h, att_db, att_freq
+    h, att_db, att_freq = _filter_cache.get(key, compute)
+    return h, att_db, att_freq, key
+
+
+def _fir_spectrum(h, n_fft, zero_phase, key=None):
+    """Compute the spectrum of FIR filter h, using the kernel cache if key"""
+    def compute():
+        h_fft = fft(np.r_[h, np.zeros(n_fft - len(h), dtype=h.dtype)])
+        if zero_phase:
+            # We will apply the filter in forward and backward direction:
+            # Scale frequency response of the filter so that the shape of
+            # the amplitude response stays the same when it is applied twice
+
+            # be careful not to divide by too small numbers
+            idx = np.where(np.abs(h_fft) > 1e-6)
+            h_fft[idx] = h_fft[idx] / np.sqrt(np.abs(h_fft[idx]))
+        return (h_fft,)
+    if key is None:
+        return compute()[0]
+    return _filter_cache.get(('fft', key, int(n_fft), bool(zero_phase)),
+                             compute)[0]
+
+
+def _fir_abs_spectrum(h, key):
+    """Compute the amplitude spectrum of FIR filter h, using the cache"""
+    return _filter_cache.get(('fft_abs', key), lambda: (np.abs(fft(h)),))[0]
+
+
 def _overlap_add_filter(x, h, n_fft=None, zero_phase=True, picks=None,
-                        n_jobs=1):
+                        n_jobs=1, cache_key=None):
     """ Filter using overlap-add FFTs.
 
     Filters the signal x using a filter with the impulse response h.
@@ -67,6 +214,9 @@ def _overlap_add_filter(x, h, n_fft=None, zero_phase=True, picks=None,
     n_jobs : int | str
         Number of jobs to run in parallel. Can be 'cuda' if scikits.cuda
         is installed properly and CUDA is initialized.
+    cache_key : tuple | None
+        If not None, the key of h in the kernel cache, used to cache the
+        spectrum of h as well.
 
     Returns
     -------
@@ -76,12 +226,44 @@ def _overlap_add_filter(x, h, n_fft=None, zero_phase=True, picks=None,
     if picks is None:
         picks = np.arange(x.shape[0])
 
+    n_edge, n_fft, n_seg, n_segments = _overlap_add_setup(
+        x.shape[1], len(h), n_fft, zero_phase)
+
+    # Filter in frequency domain
+    h_fft = _fir_spectrum(h, n_fft, zero_phase, cache_key)
+
+    # Figure out if we should use CUDA
+    n_jobs, cuda_dict, h_fft = setup_cuda_fft_multiply_repeated(n_jobs, h_fft)
+
+    if cuda_dict['use_cuda']:
+        # Process each row separately on the GPU
+        for p in picks:
+            x[p] = _1d_overlap_filter(x[p], h_fft, n_edge, n_fft, zero_phase,
+                                      n_segments, n_seg, cuda_dict)
+    else:
+        # Process blocks of rows with real FFTs, in threads; the spectrum
+        # of the (real) filter is symmetric, so we only need half of it
+        h_rfft = h_fft[:n_fft // 2 + 1]
+        blocks = _channel_blocks(picks, 16 * n_fft, n_jobs)
+        _thread_map(_overlap_add_block,
+                    [(x, block, h_rfft, n_edge, n_fft, zero_phase,
+                      n_segments, n_seg) for block in blocks], n_jobs)
+
+    return x
+
+
+def _overlap_add_setup(n_times, n_h, n_fft=None, zero_phase=True):
+    """Get the edge, FFT and segment lengths of overlap-add filtering
+
+    Returns the number of samples n_edge used to extend the signal at each
+    end (plus one), the FFT length n_fft, the segment length n_seg and the
+    number of segments n_segments.
+    """
     # Extend the signal by mirroring the edges to reduce transient filter
     # response
-    n_h = len(h)
-    n_edge = min(n_h, x.shape[1])
+    n_edge = min(n_h, n_times)
 
-    n_x = x.shape[1] + 2 * n_edge - 2
+    n_x = n_times + 2 * n_edge - 2
 
     # Determine FFT length to use
     if n_fft is None:
@@ -104,50 +286,77 @@ def _overlap_add_filter(x, h, n_fft=None, zero_phase=True, picks=None,
             n_fft = N[np.argmin(cost)]
         else:
             # Use only a single block
-            n_fft = 2 ** int(np.ceil(np.log2(n_x + n_h - 1)))
+            n_fft = next_fast_len(n_x + n_h - 1)
 
     if n_fft < 2 * n_h - 1:
         raise ValueError('n_fft is too short, has to be at least '
                          '"2 * len(h) - 1"')
 
-    if not is_power2(n_fft):
-        warnings.warn("FFT length is not a power of 2. Can be slower.")
-
-    # Filter in frequency domain
-    h_fft = fft(np.r_[h, np.zeros(n_fft - n_h, dtype=h.dtype)])
-
-    if zero_phase:
-        # We will apply the filter in forward and backward direction: Scale
-        # frequency response of the filter so that the shape of the amplitude
-        # response stays the same when it is applied twice
-
-        # be careful not to divide by too small numbers
-        idx = np.where(np.abs(h_fft) > 1e-6)
-        h_fft[idx] = h_fft[idx] / np.sqrt(np.abs(h_fft[idx]))
+    if next_fast_len(n_fft) != n_fft:
+        warnings.warn("FFT length is not a product of powers of 2, 3 and "
+                      "5. Can be slower.")
 
     # Segment length for signal x
     n_seg = n_fft - n_h + 1
 
     # Number of segments (including fractional segments)
     n_segments = int(np.ceil(n_x / float(n_seg)))
+    return n_edge, n_fft, n_seg, n_segments
 
-    # Figure out if we should use CUDA
-    n_jobs, cuda_dict, h_fft = setup_cuda_fft_multiply_repeated(n_jobs, h_fft)
 
-    # Process each row separately
-    if n_jobs == 1:
-        for p in picks:
-            x[p] = _1d_overlap_filter(x[p], h_fft, n_edge, n_fft, zero_phase,
-                                      n_segments, n_seg, cuda_dict)
-    else:
-        parallel, p_fun, _ = parallel_func(_1d_overlap_filter, n_jobs)
-        data_new = parallel(p_fun(x[p], h_fft, n_edge, n_fft, zero_phase,
-                                  n_segments, n_seg, cuda_dict)
-                            for p in picks)
-        for pp, p in enumerate(picks):
-            x[p] = data_new[pp]
+def _overlap_add_block(x, block, h_rfft, n_edge, n_fft, zero_phase,
+                       n_segments, n_seg):
+    """Do overlap-add FFT FIR filtering of the rows block of x, in place"""
+    # pad to reduce ringing
+    x_ext = _smart_pad(x[block], n_edge - 1)
+    x[block] = _overlap_add_passes(x_ext, h_rfft, n_edge, n_fft, zero_phase,
+                                   n_segments, n_seg)
 
-    return x
+
+def _overlap_add_passes(x_ext, h_rfft, n_edge, n_fft, zero_phase,
+                        n_segments, n_seg, x_spectra=None):
+    """Filter the padded rows x_ext and remove the padding
+
+    x_spectra, if given, are the spectra of the segments of x_ext used by
+    the first pass.
+    """
+    x_filtered = _overlap_add_pass(x_ext, h_rfft, n_fft, n_segments, n_seg,
+                                   x_spectra)
+    if zero_phase:
+        # second pass: flip signal
+        x_filtered = _overlap_add_pass(x_filtered[:, ::-1], h_rfft, n_fft,
+                                       n_segments, n_seg)
+
+    # Remove mirrored edges that we added
+    x_filtered = x_filtered[:, n_edge - 1:x_filtered.shape[1] - n_edge + 1]
+
+    if zero_phase:
+        # flip signal back
+        x_filtered = x_filtered[:, ::-1]
+    return x_filtered
+
+
+def _overlap_add_spectra(x_ext, n_fft, n_segments, n_seg):
+    """Compute the real FFTs of the overlap-add segments of the rows x_ext"""
+    return [rfft(x_ext[:, seg_idx * n_seg:(seg_idx + 1) * n_seg], n_fft)
+            for seg_idx in range(n_segments)]
+
+
+def _overlap_add_pass(x_ext, h_rfft, n_fft, n_segments, n_seg,
+                      x_spectra=None):
+    """Do one pass of overlap-add FFT FIR filtering of the rows x_ext"""
+    n_x = x_ext.shape[1]
+    x_filtered = np.zeros_like(x_ext)
+    for seg_idx in range(n_segments):
+        start = seg_idx * n_seg
+        stop = min(start + n_fft, n_x)
+        if x_spectra is None:
+            seg_fft = rfft(x_ext[:, start:start + n_seg], n_fft)
+        else:
+            seg_fft = x_spectra[seg_idx]
+        prod = irfft(h_rfft * seg_fft, n_fft)
+        x_filtered[:, start:stop] += prod[:, :stop - start]
+    return x_filtered
 
 
 def _1d_overlap_filter(x, h_fft, n_edge, n_fft, zero_phase, n_segments, n_seg,
@@ -218,6 +427,23 @@ def _1d_fftmult_ext(x, B, extend_x, cuda_dict):
     return xf
 
 
+def _fftmult_block(x, block, B, extend_x):
+    """Do FFT FIR filtering of the rows block of x with real FFTs, in place
+
+    B is the first half of the (symmetric) spectrum of the filter.
+    """
+    x_block = x[block]
+    # extend, if necessary
+    if extend_x is True:
+        x_block = np.concatenate([x_block, x_block[:, -1:]], axis=1)
+    N = x_block.shape[1]
+    xf = irfft(B * rfft(x_block), N)
+    # put back to original size
+    if extend_x is True:
+        xf = xf[:, :-1]
+    x[block] = xf
+
+
 def _prep_for_filtering(x, copy, picks=None):
     """Set up array as 2D for filtering ease"""
     if x.dtype != np.float64:
@@ -299,29 +525,26 @@ def _filter(x, Fs, freq, gain, filter_length='10s', picks=None, n_jobs=1,
 
         N = x.shape[1] + (extend_x is True)
 
-        H = firwin2(N, freq, gain)[np.newaxis, :]
-
-        att_db, att_freq = _filter_attenuation(H, freq, gain)
+        H, att_db, att_freq, key = _design_fir(N, freq, gain)
         if att_db < min_att_db:
             att_freq *= Fs / 2
             warnings.warn('Attenuation at stop frequency %0.1fHz is only '
                           '%0.1fdB.' % (att_freq, att_db))
 
         # Make zero-phase filter function
-        B = np.abs(fft(H)).ravel()
+        B = _fir_abs_spectrum(H, key)
 
         # Figure out if we should use CUDA
         n_jobs, cuda_dict, B = setup_cuda_fft_multiply_repeated(n_jobs, B)
 
-        if n_jobs == 1:
+        if cuda_dict['use_cuda']:
             for p in picks:
                 x[p] = _1d_fftmult_ext(x[p], B, extend_x, cuda_dict)
         else:
-            parallel, p_fun, _ = parallel_func(_1d_fftmult_ext, n_jobs)
-            data_new = parallel(p_fun(x[p], B, extend_x, cuda_dict)
-                                for p in picks)
-            for pp, p in enumerate(picks):
-                x[p] = data_new[pp]
+            blocks = _channel_blocks(picks, 16 * N, n_jobs)
+            _thread_map(_fftmult_block,
+                        [(x, block, B[:N // 2 + 1], extend_x)
+                         for block in blocks], n_jobs)
     else:
         # Use overlap-add filter with a fixed length
         N = filter_length
@@ -331,9 +554,7 @@ def _filter(x, Fs, freq, gain, filter_length='10s', picks=None, n_jobs=1,
             # Gain at Nyquist freq: 1: make N EVEN, 0: make N ODD
             N += 1
 
-        H = firwin2(N, freq, gain)
-
-        att_db, att_freq = _filter_attenuation(H, freq, gain)
+        H, att_db, att_freq, key = _design_fir(N, freq, gain)
         att_db += 6  # the filter is applied twice (zero phase)
         if att_db < min_att_db:
             att_freq *= Fs / 2
@@ -342,7 +563,7 @@ def _filter(x, Fs, freq, gain, filter_length='10s', picks=None, n_jobs=1,
                           'attenuation.' % (att_freq, att_db))
 
         x = _overlap_add_filter(x, H, zero_phase=True, picks=picks,
-                                n_jobs=n_jobs)
+                                n_jobs=n_jobs, cache_key=key)
 
     x.shape = orig_shape
     return x
@@ -363,19 +584,18 @@ def _filtfilt(x, b, a, padlen, picks, n_jobs, copy):
     n_jobs = check_n_jobs(n_jobs)
     x, orig_shape, picks = _prep_for_filtering(x, copy, picks)
     _check_coefficients(b, a)
-    if n_jobs == 1:
-        for p in picks:
-            x[p] = filtfilt(b, a, x[p], padlen=padlen)
-    else:
-        parallel, p_fun, _ = parallel_func(filtfilt, n_jobs)
-        data_new = parallel(p_fun(b, a, x[p], padlen=padlen)
-                            for p in picks)
-        for pp, p in enumerate(picks):
-            x[p] = data_new[pp]
+    blocks = _channel_blocks(picks, 32 * x.shape[1], n_jobs)
+    _thread_map(_filtfilt_block, [(x, block, b, a, padlen)
+                                  for block in blocks], n_jobs)
     x.shape = orig_shape
     return x
 
 
+def _filtfilt_block(x, block, b, a, padlen):
+    """Apply filtfilt to the rows block of x, in place"""
+    x[block] = filtfilt(b, a, x[block], axis=-1, padlen=padlen)
+
+
 def _estimate_ringing_samples(b, a):
     """Helper function for determining IIR padding"""
     x = np.zeros(1000)
@@ -924,6 +1144,416 @@ def high_pass_filter(x, Fs, Fp, filter_length='10s', trans_bandwidth=0.5,
     return xf
 
 
+def _band_freq_gain(Fs, l_freq, h_freq, l_trans_bandwidth,
+                    h_trans_bandwidth):
+    """Get the frequencies and gains of a FIR low-, high- or band-pass"""
+    if l_freq is None and h_freq is None:
+        raise ValueError('l_freq and h_freq cannot both be None')
+    if h_freq is not None:
+        h_stop = h_freq + h_trans_bandwidth
+        if h_stop > Fs / 2.:
+            raise ValueError('Effective stop frequency (%s) is too high '
+                             '(maximum based on Nyquist is %s)'
+                             % (h_stop, Fs / 2.))
+    if l_freq is not None:
+        l_stop = l_freq - l_trans_bandwidth
+        if l_stop <= 0:
+            raise ValueError('Filter specification invalid: Lower stop '
+                             'frequency too low (%0.1fHz). Increase l_freq '
+                             'or reduce transition bandwidth '
+                             '(l_trans_bandwidth)' % l_stop)
+    if l_freq is None:
+        freq = [0, h_freq, h_stop, Fs / 2]
+        gain = [1, 1, 0, 0]
+    elif h_freq is None:
+        freq = [0, l_stop, l_freq, Fs / 2]
+        gain = [0, 0, 1, 1]
+    else:
+        if l_freq >= h_freq:
+            raise ValueError('l_freq (%s) must be less than h_freq (%s)'
+                             % (l_freq, h_freq))
+        freq = [0, l_stop, l_freq, h_freq, h_stop, Fs / 2]
+        gain = [0, 0, 1, 1, 0, 0]
+    return np.array(freq) / (Fs / 2.), np.array(gain, dtype=np.float64)
+
+
+def _bank_filter_length(n_times, filter_length, gain):
+    """Get the length of a FIR filter and whether to use overlap-add"""
+    if filter_length is None or n_times <= filter_length:
+        N, overlap_add = n_times, False
+    else:
+        N, overlap_add = filter_length, True
+    if (gain[-1] == 0.0 and N % 2 == 1) or (gain[-1] == 1.0 and N % 2 != 1):
+        # Gain at Nyquist freq: 1: make N EVEN, 0: make N ODD
+        N += 1
+    return N, overlap_add
+
+
+def _iter_filter_bank(x, kernels, filter_length, envelope):
+    """Filter the rows of x with each kernel in turn
+
+    The spectrum of x (or of its overlap-add segments) is computed once for
+    all the kernels of the same length, so only the product with the
+    spectrum of each kernel and the inverse FFTs are done for each band.
+    """
+    n_times = x.shape[1]
+    spectra = dict()
+    for freq, gain in kernels:
+        N, overlap_add = _bank_filter_length(n_times, filter_length, gain)
+        H, _, _, key = _design_fir(N, freq, gain)
+        if not overlap_add:
+            # direct FFT filtering, as in _filter
+            if N not in spectra:
+                x_ext = x
+                if N > n_times:
+                    x_ext = np.concatenate([x, x[:, -1:]], axis=1)
+                spectra[N] = rfft(x_ext)
+            B = _fir_abs_spectrum(H, key)[:N // 2 + 1]
+            xf = irfft(B * spectra[N], N)[:, :n_times]
+        else:
+            # overlap-add filtering, as in _overlap_add_filter
+            n_edge, n_fft, n_seg, n_segments = _overlap_add_setup(n_times, N)
+            if N not in spectra:
+                x_ext = _smart_pad(x, n_edge - 1)
+                spectra[N] = (x_ext, _overlap_add_spectra(x_ext, n_fft,
+                                                          n_segments, n_seg))
+            x_ext, x_spectra = spectra[N]
+            h_rfft = _fir_spectrum(H, n_fft, True, key)[:n_fft // 2 + 1]
+            xf = _overlap_add_passes(x_ext, h_rfft, n_edge, n_fft, True,
+                                     n_segments, n_seg, x_spectra)
+        if envelope:
+            xf = np.abs(hilbert(xf, axis=-1))
+        yield xf
+
+
+def _filter_bank_block(out, x, block, kernels, filter_length, envelope):
+    """Fill out[:, block] with the filter bank outputs of the rows block"""
+    for ii, xf in enumerate(_iter_filter_bank(x[block], kernels,
+                                              filter_length, envelope)):
+        out[ii, block] = xf
+
+
+def _filter_bank_generator(x, orig_shape, kernels, filter_length, envelope):
+    """Yield the filter bank outputs of x one band at a time"""
+    for xf in _iter_filter_bank(x, kernels, filter_length, envelope):
+        yield xf.reshape(orig_shape)
+
+
+@verbose
+def filter_bank(x, Fs, bands, filter_length='10s', l_trans_bandwidth=0.5,
+                h_trans_bandwidth=0.5, envelope=False, return_generator=False,
+                n_jobs=1, verbose=None):
+    """Filter the signal x with a bank of FIR filters.
+
+    Applies a zero-phase low-pass, high-pass or band-pass FIR filter for
+    each band to the signal x, operating on the last dimension. The
+    result is the same as calling :func:`band_pass_filter` (or
+    :func:`low_pass_filter` and :func:`high_pass_filter`) for each band,
+    but the spectrum of the signal is computed only once and shared by all
+    the bands.
+
+    Parameters
+    ----------
+    x : array
+        Signal to filter.
+    Fs : float
+        Sampling rate in Hz.
+    bands : list of tuple
+        The (l_freq, h_freq) cut-off frequencies in Hz of each band.
+        If l_freq is None the band is a low-pass at h_freq, if h_freq is
+        None the band is a high-pass at l_freq, otherwise l_freq must be
+        less than h_freq and the band is a band-pass.
+    filter_length : str (Default: '10s') | int | None
+        Length of the filter to use. If None or "len(x) < filter_length",
+        the filter length used is len(x). Otherwise, if int, overlap-add
+        filtering with a filter of the specified length in samples) is
+        used (faster for long signals). If str, a human-readable time in
+        units of "s" or "ms" (e.g., "10s" or "5500ms") will be converted
+        to the shortest power-of-two length at least that duration.
+    l_trans_bandwidth : float
+        Width of the transition band at the low cut-off frequency in Hz.
+    h_trans_bandwidth : float
+        Width of the transition band at the high cut-off frequency in Hz.
+    envelope : bool
+        If True, return the envelope of the output of each band, i.e.,
+        the absolute value of its analytic signal.
+    return_generator : bool
+        If True, return a generator that yields the output of each band in
+        turn instead of an array with all of them.
+    n_jobs : int
+        Number of jobs to run in parallel over blocks of channels. Not
+        used if return_generator is True.
+    verbose : bool, str, int, or None
+        If not None, override default verbose level (see mne.verbose).
+
+    Returns
+    -------
+    xf : array, shape (n_bands,) + x.shape | generator
+        x filtered by each band (or their envelopes).
+    """
+    if not isinstance(bands, (list, tuple)) or len(bands) == 0:
+        raise ValueError('bands must be a non-empty list of '
+                         '(l_freq, h_freq) tuples')
+    Fs = float(Fs)
+    # issue a warning if attenuation is less than this
+    min_att_db = 20
+    x = np.asarray(x, dtype=np.float64)
+    orig_shape = x.shape
+    x = x.reshape(-1, x.shape[-1])
+    filter_length = _get_filter_length(filter_length, Fs, len_x=x.shape[1])
+    n_jobs = check_n_jobs(n_jobs)
+    kernels = list()
+    for band in bands:
+        l_freq, h_freq = band
+        l_freq = None if l_freq is None else float(l_freq)
+        h_freq = None if h_freq is None else float(h_freq)
+        freq, gain = _band_freq_gain(Fs, l_freq, h_freq, l_trans_bandwidth,
+                                     h_trans_bandwidth)
+        kernels.append((freq, gain))
+        N, overlap_add = _bank_filter_length(x.shape[1], filter_length, gain)
+        _, att_db, att_freq, _ = _design_fir(N, freq, gain)
+        msg = 'Attenuation at stop frequency %0.1fHz is only %0.1fdB.'
+        if overlap_add:
+            att_db += 6  # the filter is applied twice (zero phase)
+            msg += ' Increase filter_length for higher attenuation.'
+        if att_db < min_att_db:
+            att_freq *= Fs / 2
+            warnings.warn(msg % (att_freq, att_db))
+    logger.info('Filtering with a bank of %d filters' % len(kernels))
+
+    if return_generator:
+        return _filter_bank_generator(x, orig_shape, kernels, filter_length,
+                                      envelope)
+    out = np.empty((len(kernels),) + x.shape)
+    # each block of channels takes its spectra, the padded signal and the
+    # output of a band during filtering
+    blocks = _channel_blocks(np.arange(len(x)), 48 * x.shape[1], n_jobs)
+    _thread_map(_filter_bank_block,
+                [(out, x, block, kernels, filter_length, envelope)
+                 for block in blocks], n_jobs)
+    out.shape = (len(kernels),) + orig_shape
+    return out
+
+
+class _StreamingFilter(object):
+    """Base class of the filters applied to consecutive buffers of data
+
+    Subclasses set the coefficients self._b and self._a of the filter,
+    and self.delay, its delay in samples.
+    """
+    def reset(self):
+        """Forget the state of the filter, to process a new stream"""
+        self._zi = None
+
+    @property
+    def latency(self):
+        """The delay added by the filter in seconds"""
+        return self.delay / self.sfreq
+
+    def process(self, data):
+        """Filter a buffer of data
+
+        Parameters
+        ----------
+        data : array, shape (n_channels, n_times) | shape (n_times,)
+            The next buffer of the stream.
+
+        Returns
+        -------
+        data_filt : array
+            The filtered buffer, of the same shape as data.
+        """
+        data = np.asarray(data, dtype=np.float64)
+        orig_shape = data.shape
+        x = np.atleast_2d(data)
+        x = x.reshape(-1, x.shape[-1])
+        if self._zi is None:
+            # start in the steady state of the first sample to avoid a
+            # transient at the beginning of the stream
+            self._zi = (signal.lfilter_zi(self._b, self._a)[np.newaxis] *
+                        x[:, :1])
+        elif self._zi.shape[0] != x.shape[0]:
+            raise ValueError('data must have %d channels, like the previous '
+                             'buffers, got %d (use reset() to start a new '
+                             'stream)' % (self._zi.shape[0], x.shape[0]))
+        x = self._filter(x)
+        return x.reshape(orig_shape)
+
+    def _filter(self, x):
+        """Filter the rows of x and update the state of the filter"""
+        x, self._zi = signal.lfilter(self._b, self._a, x, axis=-1,
+                                     zi=self._zi)
+        return x
+
+
+class StreamingFIR(_StreamingFilter):
+    """A causal FIR filter applied to consecutive buffers of data
+
+    The filter is designed like the FFT-based filters of mne.filter, but it
+    is applied only once and forward in time, so it can be used on data
+    that arrive in small buffers, e.g., from mne.realtime clients. The
+    state of the filter (the part of the output of the previous buffers
+    that overlaps the next ones) is kept across the calls to process. The
+    filter has a linear phase, and delays the signal by half its length.
+
+    Parameters
+    ----------
+    sfreq : float
+        Sampling rate in Hz.
+    l_freq : float | None
+        Low cut-off frequency in Hz. If None the data are only low-passed.
+    h_freq : float | None
+        High cut-off frequency in Hz. If None the data are only
+        high-passed.
+    filter_length : None | str | int
+        Length of the filter to use. If None (default), the length is
+        derived from the narrowest transition band, as 3.3 times the
+        sampling rate divided by its width, which attenuates the stop bands
+        by at least 20 dB with the Hamming window. If int, the length in
+        samples. If str, a human-readable time in units of "s" or "ms"
+        (e.g., "1s" or "500ms") will be converted to the shortest
+        power-of-two length at least that duration. The filter is made one
+        sample longer if needed to have an odd length. Longer filters give
+        sharper transitions at the cost of a longer delay.
+    l_trans_bandwidth : float
+        Width of the transition band at the low cut-off frequency in Hz.
+    h_trans_bandwidth : float
+        Width of the transition band at the high cut-off frequency in Hz.
+    verbose : bool, str, int, or None
+        If not None, override default verbose level (see mne.verbose).
+
+    Attributes
+    ----------
+    delay : int
+        The delay added by the filter in samples.
+    latency : float
+        The delay added by the filter in seconds.
+    """
+    @verbose
+    def __init__(self, sfreq, l_freq, h_freq, filter_length=None,
+                 l_trans_bandwidth=0.5, h_trans_bandwidth=0.5, verbose=None):
+        self.sfreq = float(sfreq)
+        l_freq = None if l_freq is None else float(l_freq)
+        h_freq = None if h_freq is None else float(h_freq)
+        freq, gain = _band_freq_gain(self.sfreq, l_freq, h_freq,
+                                     l_trans_bandwidth, h_trans_bandwidth)
+        if filter_length is None:
+            trans_bandwidths = [tb for f, tb in ((l_freq, l_trans_bandwidth),
+                                                 (h_freq, h_trans_bandwidth))
+                                if f is not None]
+            N = int(np.ceil(3.3 * self.sfreq / min(trans_bandwidths)))
+        else:
+            N = _get_filter_length(filter_length, self.sfreq)
+        N += (N % 2 == 0)  # odd length: the delay is a whole number
+        h, att_db, att_freq, self._key = _design_fir(N, freq, gain)
+        if att_db < 20:
+            att_freq *= self.sfreq / 2
+            warnings.warn('Attenuation at stop frequency %0.1fHz is only '
+                          '%0.1fdB. Increase filter_length for higher '
+                          'attenuation.' % (att_freq, att_db))
+        self._b, self._a = h, np.array([1.])
+        self.delay = (N - 1) // 2
+        logger.info('Streaming FIR filter of %d samples, latency %0.3f s'
+                    % (N, self.latency))
+        self.reset()
+
+    def _filter(self, x):
+        """Filter the rows of x and update the state of the filter"""
+        # the state of lfilter for a FIR filter is the overlap-add tail, so
+        # we can use it with either method
+        n_times, n_h = x.shape[1], len(self._b)
+        n_fft = next_fast_len(n_times + n_h - 1)
+        if n_times * n_h <= 4 * n_fft * np.log2(n_fft):
+            return super(StreamingFIR, self)._filter(x)
+        h_rfft = _fir_spectrum(self._b, n_fft, False,
+                               self._key)[:n_fft // 2 + 1]
+        y = irfft(h_rfft * rfft(x, n_fft), n_fft)[:, :n_times + n_h - 1]
+        y[:, :n_h - 1] += self._zi
+        self._zi = y[:, n_times:].copy()
+        return y[:, :n_times]
+
+
+class StreamingIIR(_StreamingFilter):
+    """A causal IIR filter applied to consecutive buffers of data
+
+    The filter is designed with construct_iir_filter and applied once,
+    forward in time (with scipy.signal.lfilter), so it can be used on data
+    that arrive in small buffers, e.g., from mne.realtime clients. The
+    state of the filter is kept across the calls to process.
+
+    Parameters
+    ----------
+    sfreq : float
+        Sampling rate in Hz.
+    l_freq : float | None
+        Low cut-off frequency in Hz. If None the data are only low-passed.
+    h_freq : float | None
+        High cut-off frequency in Hz. If None the data are only
+        high-passed.
+    iir_params : dict | None
+        Dictionary of parameters to use for IIR filtering.
+        See mne.filter.construct_iir_filter for details. If iir_params
+        is None, a 4th order Butterworth will be used.
+    l_trans_bandwidth : float
+        Width of the transition band at the low cut-off frequency in Hz.
+        Only used if iir_params specifies gpass and gstop.
+    h_trans_bandwidth : float
+        Width of the transition band at the high cut-off frequency in Hz.
+        Only used if iir_params specifies gpass and gstop.
+    verbose : bool, str, int, or None
+        If not None, override default verbose level (see mne.verbose).
+
+    Attributes
+    ----------
+    delay : float
+        The mean group delay of the filter in the pass-band, in samples.
+        The phase of IIR filters is not linear, so the delay varies with
+        frequency.
+    latency : float
+        The mean group delay of the filter in the pass-band, in seconds.
+    """
+    @verbose
+    def __init__(self, sfreq, l_freq, h_freq, iir_params=None,
+                 l_trans_bandwidth=0.5, h_trans_bandwidth=0.5, verbose=None):
+        self.sfreq = float(sfreq)
+        l_freq = None if l_freq is None else float(l_freq)
+        h_freq = None if h_freq is None else float(h_freq)
+        # check the frequencies
+        freq, gain = _band_freq_gain(self.sfreq, l_freq, h_freq,
+                                     l_trans_bandwidth, h_trans_bandwidth)
+        iir_params = _check_method('iir', iir_params, [])
+        if l_freq is None:
+            f_pass, f_stop, btype = h_freq, h_freq + h_trans_bandwidth, 'low'
+        elif h_freq is None:
+            f_pass, f_stop, btype = l_freq, l_freq - l_trans_bandwidth, 'high'
+        else:
+            f_pass = [l_freq, h_freq]
+            f_stop = [l_freq - l_trans_bandwidth, h_freq + h_trans_bandwidth]
+            btype = 'bandpass'
+        iir_params = construct_iir_filter(iir_params, f_pass, f_stop,
+                                          self.sfreq, btype)
+        self._b = np.asarray(iir_params['b'], dtype=np.float64)
+        self._a = np.asarray(iir_params['a'], dtype=np.float64)
+        _check_coefficients(self._b, self._a)
+        self.delay = _mean_group_delay(self._b, self._a, freq, gain)
+        logger.info('Streaming IIR filter of order %d, latency %0.3f s'
+                    % (max(len(self._b), len(self._a)) - 1, self.latency))
+        self.reset()
+
+
+def _mean_group_delay(b, a, freq, gain):
+    """Get the mean group delay of a filter in its pass-band, in samples
+
+    freq and gain are the pass-band specification, with frequencies
+    normalized by the Nyquist frequency.
+    """
+    w, h = freqz(b, a, worN=1024)
+    gd = -np.diff(np.unwrap(np.angle(h))) / np.diff(w)
+    w = (w[1:] + w[:-1]) / (2 * np.pi)  # normalized by the sampling rate
+    mask = np.interp(2 * w, freq, gain) == 1
+    return float(np.mean(gd[mask])) if mask.any() else float(np.mean(gd))
+
+
 @verbose
 def notch_filter(x, Fs, freqs, filter_length='10s', notch_widths=None,
                  trans_bandwidth=1, method='fft',
@@ -1191,7 +1821,7 @@ def _mt_spectrum_remove(x, sfreq, line_freqs, notch_widths,
 
 @verbose
 def resample(x, up, down, npad=100, axis=-1, window='boxcar', n_jobs=1,
-             verbose=None):
+             method='fft', verbose=None):
     """Resample the array x
 
     Operates along the last dimension of the array.
@@ -1206,13 +1836,20 @@ def resample(x, up, down, npad=100, axis=-1, window='boxcar', n_jobs=1,
         Factor to downsample by.
     npad : integer
         Number of samples to use at the beginning and end for padding.
+        Not used if method='polyphase'.
     axis : int
         Axis along which to resample (default is the last axis).
     window : string or tuple
-        See scipy.signal.resample for description.
+        See scipy.signal.resample for description. Not used if
+        method='polyphase'.
     n_jobs : int | str
         Number of jobs to run in parallel. Can be 'cuda' if scikits.cuda
-        is installed properly and CUDA is initialized.
+        is installed properly, CUDA is initialized, and method='fft'.
+    method : str
+        'fft' will resample the whole signal at once in the frequency
+        domain. 'polyphase' will use a polyphase FIR filter, processing the
+        signal in chunks. It requires up / down to be a ratio of small
+        integers, but its cost grows linearly with the signal length.
     verbose : bool, str, int, or None
         If not None, override default verbose level (see mne.verbose).
 
@@ -1229,10 +1866,13 @@ def resample(x, up, down, npad=100, axis=-1, window='boxcar', n_jobs=1,
     important consequences, and the default choices should work well
     for most natural signals.
 
-    Resampling arguments are broken into "up" and "down" components for future
-    compatibility in case we decide to use an upfirdn implementation. The
-    current implementation is functionally equivalent to passing
-    up=up/down and down=1.
+    Resampling arguments are broken into "up" and "down" components. With
+    method='fft', the implementation is functionally equivalent to passing
+    up=up/down and down=1. With method='polyphase', the ratio is reduced to
+    the smallest integers, the signal is upsampled by up, low-pass filtered
+    with a Kaiser-windowed FIR filter and downsampled by down, only
+    computing the output samples that are kept. The edges are padded by
+    reflection like for FIR filtering.
     """
     # check explicitly for backwards compatibility
     if not isinstance(axis, int):
@@ -1258,6 +1898,24 @@ def resample(x, up, down, npad=100, axis=-1, window='boxcar', n_jobs=1,
 
     # prep for resampling now
     x_flat = x.reshape((-1, x_len))
+    if method == 'polyphase':
+        up, down = _polyphase_ratio(up, down)
+        n_jobs = check_n_jobs(n_jobs)
+
+        def read(start, stop):
+            return x_flat[:, start:stop]
+
+        # integer data give floating-point output
+        dtype = np.result_type(x.dtype, np.float32)
+        y = _resample_polyphase(read, x_len, len(x_flat), up, down, dtype,
+                                n_jobs=n_jobs)
+        y.shape = orig_shape[:-1] + (y.shape[1],)
+        if axis != orig_last_axis:
+            y = y.swapaxes(axis, orig_last_axis)
+        return y
+    elif method != 'fft':
+        raise ValueError('method must be "fft" or "polyphase", got "%s"'
+                         % method)
     orig_len = x_len + 2 * npad  # length after padding
     new_len = int(round(ratio * orig_len))  # length after resampling
     to_remove = np.round(ratio * npad).astype(int)
@@ -1300,6 +1958,154 @@ def resample(x, up, down, npad=100, axis=-1, window='boxcar', n_jobs=1,
     return y
 
 
+def _polyphase_ratio(up, down):
+    """Helper to express the resampling ratio as a fraction of integers"""
+    ratio = float(up) / down
+    frac = Fraction.from_float(ratio).limit_denominator(1000)
+    if abs(float(frac) - ratio) > 1e-10 * ratio:
+        raise ValueError('Polyphase resampling requires the resampling ratio '
+                         '(%s) to be a fraction of integers smaller than '
+                         '1000, use method="fft" instead' % ratio)
+    return frac.numerator, frac.denominator
+
+
+def _polyphase_n_out(n_in, up, down):
+    """Helper to get the number of samples after polyphase resampling"""
+    return max(int(round(n_in * up / float(down))), 1)
+
+
+def _polyphase_filter(up, down):
+    """Helper to design the polyphase anti-aliasing filter
+
+    Returns the filter split in up phases, h_poly[p, j] = h[p + j * up],
+    and the delay of the filter (in upsampled samples).
+    """
+    max_rate = max(up, down)
+    if max_rate == 1:  # nothing to do
+        return np.ones((1, 1)), 0
+    half_len = 10 * max_rate
+    h = firwin(2 * half_len + 1, 1. / max_rate, window=('kaiser', 5.0))
+    h *= up
+    n_taps = int(np.ceil(len(h) / float(up)))
+    h = np.r_[h, np.zeros(n_taps * up - len(h))]
+    return h.reshape(n_taps, up).T.copy(), half_len
+
+
+def _polyphase_block(x, x_start, n_start, n_stop, up, down, h_poly, half_len):
+    """Helper to compute output samples n_start to n_stop
+
+    x contains the input samples starting at x_start. Output sample n is
+    obtained from the upsampled sample m = n * down + half_len, using the
+    phase m % up of the filter and the input samples before m // up. The
+    output samples sharing a phase are up samples apart and use input
+    samples down samples apart.
+    """
+    y = np.zeros((x.shape[0], n_stop - n_start),
+                 dtype=np.result_type(x.dtype, h_poly.dtype))
+    for offset in range(min(up, n_stop - n_start)):
+        m = (n_start + offset) * down + half_len
+        phase, base = m % up, m // up - x_start
+        n_out = len(range(offset, n_stop - n_start, up))
+        for j, h in enumerate(h_poly[phase]):
+            if h != 0:
+                start = base - j
+                stop = start + (n_out - 1) * down + 1
+                y[:, offset::up] += h * x[:, start:stop:down]
+    return y
+
+
+def _read_padded(read, n_in, start, stop):
+    """Helper to read samples start to stop, padding beyond the edges"""
+    idx = np.arange(start, stop)
+    left, right = idx < 0, idx >= n_in
+    ref = np.where(left, -idx, np.where(right, 2 * (n_in - 1) - idx, idx))
+    valid = (ref >= 0) & (ref < n_in)
+    ref = np.clip(ref, 0, n_in - 1)
+    ref_start = ref.min()
+    data = read(ref_start, ref.max() + 1)[:, ref - ref_start]
+    # odd reflection around the edge samples, like _smart_pad
+    if left.any():
+        data[:, left] = 2 * read(0, 1) - data[:, left]
+    if right.any():
+        data[:, right] = 2 * read(n_in - 1, n_in) - data[:, right]
+    data[:, ~valid] = 0.
+    return data
+
+
+def _resample_polyphase(read, n_in, n_ch, up, down, dtype, data_buffer=None,
+                        chunk=65536, n_jobs=1):
+    """Helper to resample data in chunks with a polyphase filter
+
+    Parameters
+    ----------
+    read : callable
+        Function such that read(start, stop) returns the input samples
+        start to stop of all channels.
+    n_in : int
+        Number of input samples.
+    n_ch : int
+        Number of channels.
+    up : int
+        Factor to upsample by.
+    down : int
+        Factor to downsample by.
+    dtype : dtype
+        Data type of the output.
+    data_buffer : array | str | None
+        Array to store the output in, the name of a file to memory-map it,
+        or None to allocate it in memory.
+    chunk : int
+        Number of input samples to process at once.
+    n_jobs : int
+        Number of jobs to run in parallel over blocks of channels.
+
+    Returns
+    -------
+    y : array, shape (n_ch, n_out)
+        The resampled data.
+    """
+    n_out = _polyphase_n_out(n_in, up, down)
+    h_poly, half_len = _polyphase_filter(up, down)
+    n_taps = h_poly.shape[1]
+    if isinstance(data_buffer, string_types):
+        y = np.memmap(data_buffer, mode='w+', dtype=dtype,
+                      shape=(n_ch, n_out))
+    elif data_buffer is None:
+        y = np.empty((n_ch, n_out), dtype=dtype)
+    else:
+        y = data_buffer
+    if n_jobs > 1:
+        parallel, p_fun, _ = parallel_func(_polyphase_block, n_jobs)
+        ch_blocks = np.array_split(np.arange(n_ch), min(n_jobs, n_ch))
+    block_out = max(int(chunk * up // down), 1)
+    # the input samples needed by the last output samples are carried
+    # over from one chunk to the next, so each one is only read once
+    buf, buf_start = np.zeros((n_ch, 0), dtype), 0
+    for n_start in range(0, n_out, block_out):
+        n_stop = min(n_start + block_out, n_out)
+        in_start = (n_start * down + half_len) // up - n_taps + 1
+        in_stop = ((n_stop - 1) * down + half_len) // up + 1
+        buf_stop = buf_start + buf.shape[1]
+        if buf.shape[1] == 0 or in_start >= buf_stop:
+            buf = _read_padded(read, n_in, in_start, in_stop)
+        else:
+            buf = buf[:, in_start - buf_start:]
+            if in_stop > buf_stop:
+                buf = np.concatenate(
+                    [buf, _read_padded(read, n_in, buf_stop, in_stop)], axis=1)
+        buf_start = in_start
+        if n_jobs == 1:
+            y[:, n_start:n_stop] = _polyphase_block(
+                buf, buf_start, n_start, n_stop, up, down, h_poly, half_len)
+        else:
+            y_blocks = parallel(p_fun(buf[ch], buf_start, n_start, n_stop,
+                                      up, down, h_poly, half_len)
+                                for ch in ch_blocks)
+            for ch, y_block in zip(ch_blocks, y_blocks):
+                y[ch, n_start:n_stop] = y_block
+    return y
+
+
 def detrend(x, order=1, axis=-1):
     """Detrend the array x.
 
@@ -32,15 +32,21 @@ from .write import (start_file, end_file, start_block, end_block,
                     write_id, write_string)
 
 from ..filter import (low_pass_filter, high_pass_filter, band_pass_filter,
-                      notch_filter, band_stop_filter, resample)
-from ..parallel import parallel_func
+                      notch_filter, band_stop_filter, resample, filter_bank,
+                      _get_filter_length, _polyphase_ratio, _polyphase_n_out,
+                      _resample_polyphase)
+from ..fixes import partial
+from ..parallel import parallel_func, check_n_jobs
 from ..utils import (_check_fname, _check_pandas_installed,
                      check_fname, _get_stim_channel, object_hash,
-                     logger, verbose)
-from ..viz import plot_raw, plot_raw_psds, _mutable_defaults
+                     _file_identity, logger, verbose)
 from ..externals.six import string_types
 from ..event import concatenate_events
 
+# The number of samples read at once when iterating over data that are not
+# preloaded (see _BaseRaw._iter_chunks)
+_chunk_size = 2 ** 16
+
 
 class _BaseRaw(ProjMixin, ContainsMixin, PickDropChannelsMixin,
                SetChannelsMixin, InterpolationMixin):
@@ -73,9 +79,31 @@ class _BaseRaw(ProjMixin, ContainsMixin, PickDropChannelsMixin,
             return exception_type, exception_val, trace
 
     def __hash__(self):
-        if not self.preload:
-            raise RuntimeError('Cannot hash raw unless preloaded')
-        return object_hash(dict(info=self.info, data=self._data))
+        return object_hash(self)
+
+    def _get_hash_obj(self):
+        """Get the content that identifies the data (see object_hash)
+
+        Data that are not preloaded are identified by their files (name,
+        size and modification time) and the directory of their data tags,
+        so that they are not read.
+        """
+        if self.preload:
+            return dict(info=self.info, data=self._data)
+        fnames = self._filenames
+        if len(fnames) == 0:  # readers using info['filename']
+            fnames = [self.info['filename']]
+        rawdirs = list()
+        for rawdir in getattr(self, 'rawdirs', []):
+            rawdirs.append([(-1 if r['ent'] is None else r['ent'].pos,
+                             r['first'], r['last'], r['nsamp'])
+                            for r in rawdir])
+        return dict(info=self.info, rawdirs=rawdirs,
+                    files=[_file_identity(fname) for fname in fnames],
+                    first_samps=self._first_samps,
+                    raw_lengths=self._raw_lengths,
+                    comp=getattr(self, 'comp', None),
+                    projector=getattr(self, '_projector', None))
 
     def _parse_get_set_params(self, item):
         # make sure item is a tuple
@@ -198,24 +226,81 @@ class _BaseRaw(ProjMixin, ContainsMixin, PickDropChannelsMixin,
         if not callable(fun):
             raise ValueError('fun needs to be a function')
 
-        data_in = self._data
-        if dtype is not None and dtype != self._data.dtype:
-            self._data = self._data.astype(dtype)
+        self._data = _apply_function(self._data, fun, picks, dtype, n_jobs,
+                                     *args, **kwargs)
 
-        if n_jobs == 1:
-            # modify data inplace to save memory
-            for idx in picks:
-                self._data[idx, :] = fun(data_in[idx, :], *args, **kwargs)
-        else:
-            # use parallel function
-            parallel, p_fun, _ = parallel_func(fun, n_jobs)
-            data_picks_new = parallel(p_fun(data_in[p], *args, **kwargs)
-                                      for p in picks)
-            for pp, p in enumerate(picks):
-                self._data[p, :] = data_picks_new[pp]
+    def _apply_chunked(self, fun, out, pad, chunk_duration):
+        """Apply a function to data that are not preloaded, chunk by chunk
+
+        The data are read in chunks of chunk_duration seconds, extended by
+        pad samples on each side, and the padding is discarded from the
+        output of fun before it is written to the memory-mapped file out.
+        If the padding spans the whole recording, the data are processed
+        at once. Afterward the data are preloaded.
+        """
+        if not isinstance(out, string_types):
+            raise ValueError('out must be a file name to store the processed '
+                             'data in, got %s' % (out,))
+        sfreq = self.info['sfreq']
+        n_times = self.n_times
+        chunk = max(int(round(chunk_duration * sfreq)), 1)
+        if pad >= n_times:
+            # each padded chunk would span the whole recording, which would
+            # then be read once per chunk, so process it at once instead
+            logger.info('The padding spans the whole recording, processing '
+                        'all samples at once')
+            chunk = n_times
+        n_chunks = int(ceil(n_times / float(chunk)))
+        logger.info('Processing %d samples in %d chunk%s of %d samples '
+                    '(padding %d samples)'
+                    % (n_times, n_chunks, 's' if n_chunks > 1 else '',
+                       min(chunk, n_times), pad))
+        data = None
+        for start in range(0, n_times, chunk):
+            stop = min(start + chunk, n_times)
+            pad_start = max(start - pad, 0)
+            pad_stop = min(stop + pad, n_times)
+            x = self._read_segment(start=pad_start, stop=pad_stop,
+                                   projector=self._projector)[0]
+            x = fun(x)
+            data = _allocate_data(data, out, (self.info['nchan'], n_times),
+                                  x.dtype)
+            data[:, start:stop] = x[:, start - pad_start:stop - pad_start]
+        if hasattr(data, 'flush'):
+            data.flush()
+        self._data = data
+        self._times = np.arange(n_times, dtype=np.float64) / sfreq
+        self.preload = True
+        # the data are no longer read from the original files
+        self.close()
+
+    def _iter_chunks(self, picks, start=0, stop=None, chunk_size=None):
+        """Iterate over the data of some channels, chunk by chunk
+
+        Data that are not preloaded are read in chunks of chunk_size
+        samples (default _chunk_size), keeping only the picked channels of
+        each buffer read, so that the whole recording is never in memory.
+        Preloaded data are returned as a single chunk.
+
+        Yields the first sample of each chunk (relative to start) and the
+        data of the chunk.
+        """
+        stop = self.n_times if stop is None else min(int(stop), self.n_times)
+        if self.preload:
+            yield 0, self._data[picks, start:stop]
+            return
+        if chunk_size is None:
+            chunk_size = _chunk_size
+        for chunk_start in range(start, stop, chunk_size):
+            chunk_stop = min(chunk_start + chunk_size, stop)
+            data = self._read_segment(start=chunk_start, stop=chunk_stop,
+                                      sel=picks, projector=self._projector,
+                                      verbose=False)[0]
+            yield chunk_start - start, data
 
     @verbose
-    def apply_hilbert(self, picks, envelope=False, n_jobs=1, verbose=None):
+    def apply_hilbert(self, picks, envelope=False, n_jobs=1, out=None,
+                      chunk_duration=60., verbose=None):
         """ Compute analytic signal or envelope for a subset of channels.
 
         If envelope=False, the analytic signal for the channels defined in
@@ -247,6 +332,16 @@ class _BaseRaw(ProjMixin, ContainsMixin, PickDropChannelsMixin,
             Compute the envelope signal of each channel.
         n_jobs: int
             Number of jobs to run in parallel.
+        out : str | None
+            Name of a file used to memory-map the result if the data are not
+            preloaded. The data are then processed in chunks and preloaded
+            afterward, as with preload=str in the constructor. Ignored if the
+            data are preloaded.
+        chunk_duration : float
+            Duration in seconds of the chunks used to process data that are
+            not preloaded. Each chunk is padded on both sides by its own
+            duration, so the result is only approximately equal to the one
+            obtained on preloaded data.
         verbose : bool, str, int, or None
             If not None, override default verbose level (see mne.verbose).
             Defaults to self.verbose.
@@ -266,21 +361,33 @@ class _BaseRaw(ProjMixin, ContainsMixin, PickDropChannelsMixin,
         inverse, and computing the envelope in source space.
         """
         if envelope:
-            self.apply_function(_envelope, picks, None, n_jobs)
+            fun, dtype = _envelope, None
+        else:
+            fun, dtype = hilbert, np.complex64
+        if self.preload:
+            self.apply_function(fun, picks, dtype, n_jobs)
         else:
-            self.apply_function(hilbert, picks, np.complex64, n_jobs)
+            _check_chunked(out)
+            # the Hilbert transform is not compactly supported, so pad each
+            # chunk by its own length to keep edge effects small
+            pad = max(int(round(chunk_duration * self.info['sfreq'])), 1)
+            fun = partial(_apply_function, fun=fun, picks=picks, dtype=dtype,
+                          n_jobs=n_jobs)
+            self._apply_chunked(fun, out, pad, chunk_duration)
 
     @verbose
     def filter(self, l_freq, h_freq, picks=None, filter_length='10s',
                l_trans_bandwidth=0.5, h_trans_bandwidth=0.5, n_jobs=1,
-               method='fft', iir_params=None, verbose=None):
+               method='fft', iir_params=None, out=None, chunk_duration=60.,
+               verbose=None):
         """Filter a subset of channels.
 
         Applies a zero-phase low-pass, high-pass, band-pass, or band-stop
         filter to the channels selected by "picks". The data of the Raw
         object is modified inplace.
 
-        The Raw object has to be constructed using preload=True (or string).
+        The Raw object has to be constructed using preload=True (or string),
+        unless out is given to filter the data in chunks (method="fft" only).
 
         l_freq and h_freq are the frequencies below which and above which,
         respectively, to filter out of the data. Thus the uses are:
@@ -331,6 +438,15 @@ class _BaseRaw(ProjMixin, ContainsMixin, PickDropChannelsMixin,
             Dictionary of parameters to use for IIR filtering.
             See mne.filter.construct_iir_filter for details. If iir_params
             is None and method="iir", 4th order Butterworth will be used.
+        out : str | None
+            Name of a file used to memory-map the filtered data if the data
+            are not preloaded. The data are then filtered in chunks and
+            preloaded afterward, as with preload=str in the constructor.
+            Ignored if the data are preloaded.
+        chunk_duration : float
+            Duration in seconds of the chunks used to filter data that are
+            not preloaded. Each chunk is padded on both sides by the filter
+            length to avoid edge effects.
         verbose : bool, str, int, or None
             If not None, override default verbose level (see mne.verbose).
             Defaults to self.verbose.
@@ -348,8 +464,7 @@ class _BaseRaw(ProjMixin, ContainsMixin, PickDropChannelsMixin,
             h_freq = float(h_freq)
 
         if not self.preload:
-            raise RuntimeError('Raw data needs to be preloaded to filter. Use '
-                               'preload=True (or string) in the constructor.')
+            _check_chunked(out, method)
         if picks is None:
             if 'ICA ' in ','.join(self.ch_names):
                 pick_parameters = dict(misc=True, ref_meg=False)
@@ -372,51 +487,108 @@ class _BaseRaw(ProjMixin, ContainsMixin, PickDropChannelsMixin,
                 self.info['highpass'] = l_freq
         if l_freq is None and h_freq is not None:
             logger.info('Low-pass filtering at %0.2g Hz' % h_freq)
-            low_pass_filter(self._data, fs, h_freq,
-                            filter_length=filter_length,
-                            trans_bandwidth=h_trans_bandwidth, method=method,
-                            iir_params=iir_params, picks=picks, n_jobs=n_jobs,
-                            copy=False)
         if l_freq is not None and h_freq is None:
             logger.info('High-pass filtering at %0.2g Hz' % l_freq)
-            high_pass_filter(self._data, fs, l_freq,
-                             filter_length=filter_length,
-                             trans_bandwidth=l_trans_bandwidth, method=method,
-                             iir_params=iir_params, picks=picks, n_jobs=n_jobs,
-                             copy=False)
         if l_freq is not None and h_freq is not None:
             if l_freq < h_freq:
                 logger.info('Band-pass filtering from %0.2g - %0.2g Hz'
                             % (l_freq, h_freq))
-                self._data = band_pass_filter(
-                    self._data, fs, l_freq, h_freq,
-                    filter_length=filter_length,
-                    l_trans_bandwidth=l_trans_bandwidth,
-                    h_trans_bandwidth=h_trans_bandwidth,
-                    method=method, iir_params=iir_params, picks=picks,
-                    n_jobs=n_jobs, copy=False)
             else:
                 logger.info('Band-stop filtering from %0.2g - %0.2g Hz'
                             % (h_freq, l_freq))
-                self._data = band_stop_filter(
-                    self._data, fs, h_freq, l_freq,
-                    filter_length=filter_length,
-                    l_trans_bandwidth=h_trans_bandwidth,
-                    h_trans_bandwidth=l_trans_bandwidth, method=method,
-                    iir_params=iir_params, picks=picks, n_jobs=n_jobs,
-                    copy=False)
+        if self.preload:
+            self._data = _filter_data(
+                self._data, fs, l_freq, h_freq, picks, filter_length,
+                l_trans_bandwidth, h_trans_bandwidth, n_jobs, method,
+                iir_params)
+        else:
+            filter_length, pad = _fir_stream_pad(filter_length, fs,
+                                                 self.n_times)
+            fun = partial(_filter_data, sfreq=fs, l_freq=l_freq,
+                          h_freq=h_freq, picks=picks,
+                          filter_length=filter_length,
+                          l_trans_bandwidth=l_trans_bandwidth,
+                          h_trans_bandwidth=h_trans_bandwidth,
+                          n_jobs=n_jobs, method=method, iir_params=iir_params)
+            self._apply_chunked(fun, out, pad, chunk_duration)
+
+    @verbose
+    def filter_bank(self, bands, picks=None, start=0, stop=None,
+                    filter_length='10s', l_trans_bandwidth=0.5,
+                    h_trans_bandwidth=0.5, envelope=False,
+                    return_generator=False, n_jobs=1, verbose=None):
+        """Filter a subset of channels with a bank of FIR filters.
+
+        Applies a zero-phase FIR filter for each (l_freq, h_freq) band to
+        the channels selected by "picks" and returns the results. The data
+        of the Raw object are not modified. The spectrum of the data is
+        computed once and shared by all the bands, which is faster than
+        calling "filter" for each band, e.g., to extract band power
+        features. The data do not need to be preloaded, but the samples
+        from start to stop of the picked channels are read into memory at
+        once.
+
+        Parameters
+        ----------
+        bands : list of tuple
+            The (l_freq, h_freq) cut-off frequencies in Hz of each band.
+            If l_freq is None the band is a low-pass at h_freq, if h_freq is
+            None the band is a high-pass at l_freq, otherwise it is a
+            band-pass.
+        picks : array-like of int | None
+            Indices of channels to filter. If None only the data (MEG/EEG)
+            channels will be filtered.
+        start : int
+            Index of the first sample to filter.
+        stop : int | None
+            Index after the last sample to filter. If None, filter up to the
+            end of the data.
+        filter_length : str (Default: '10s') | int | None
+            Length of the filter to use. See mne.filter.filter_bank.
+        l_trans_bandwidth : float
+            Width of the transition band at the low cut-off frequency in Hz.
+        h_trans_bandwidth : float
+            Width of the transition band at the high cut-off frequency in Hz.
+        envelope : bool
+            If True, return the envelope of the output of each band.
+        return_generator : bool
+            If True, return a generator that yields the output of each band
+            in turn instead of an array with all of them.
+        n_jobs : int
+            Number of jobs to run in parallel.
+        verbose : bool, str, int, or None
+            If not None, override default verbose level (see mne.verbose).
+            Defaults to self.verbose.
+
+        Returns
+        -------
+        data : array, shape (n_bands, n_channels, n_times) | generator
+            The filtered data (or their envelopes) of each band.
+        """
+        if picks is None:
+            picks = pick_types(self.info, meg=True, eeg=True, ref_meg=False,
+                               exclude=[])
+        data = self[picks, start:stop][0]
+        return filter_bank(data, self.info['sfreq'], bands,
+                           filter_length=filter_length,
+                           l_trans_bandwidth=l_trans_bandwidth,
+                           h_trans_bandwidth=h_trans_bandwidth,
+                           envelope=envelope,
+                           return_generator=return_generator, n_jobs=n_jobs)
 
     @verbose
     def notch_filter(self, freqs, picks=None, filter_length='10s',
                      notch_widths=None, trans_bandwidth=1.0, n_jobs=1,
                      method='fft', iir_params=None,
-                     mt_bandwidth=None, p_value=0.05, verbose=None):
+                     mt_bandwidth=None, p_value=0.05, out=None,
+                     chunk_duration=60., verbose=None):
         """Notch filter a subset of channels.
 
         Applies a zero-phase notch filter to the channels selected by
         "picks". The data of the Raw object is modified inplace.
 
-        The Raw object has to be constructed using preload=True (or string).
+        The Raw object has to be constructed using preload=True (or string),
+        unless out is given to filter the data in chunks (method="fft" only).
 
         Note: If n_jobs > 1, more memory is required as "len(picks) * n_times"
               additional time points need to be temporaily stored in memory.
@@ -463,6 +635,15 @@ class _BaseRaw(ProjMixin, ContainsMixin, PickDropChannelsMixin,
             sinusoidal components to remove when method='spectrum_fit' and
             freqs=None. Note that this will be Bonferroni corrected for the
             number of frequencies, so large p-values may be justified.
+        out : str | None
+            Name of a file used to memory-map the filtered data if the data
+            are not preloaded. The data are then filtered in chunks and
+            preloaded afterward, as with preload=str in the constructor.
+            Ignored if the data are preloaded.
+        chunk_duration : float
+            Duration in seconds of the chunks used to filter data that are
+            not preloaded. Each chunk is padded on both sides by the filter
+            length to avoid edge effects.
         verbose : bool, str, int, or None
             If not None, override default verbose level (see mne.verbose).
             Defaults to self.verbose.
@@ -485,26 +666,38 @@ class _BaseRaw(ProjMixin, ContainsMixin, PickDropChannelsMixin,
                 raise RuntimeError('Could not find any valid channels for '
                                    'your Raw object. Please contact the '
                                    'MNE-Python developers.')
-        if not self.preload:
-            raise RuntimeError('Raw data needs to be preloaded to filter. Use '
-                               'preload=True (or string) in the constructor.')
-
-        self._data = notch_filter(self._data, fs, freqs,
-                                  filter_length=filter_length,
-                                  notch_widths=notch_widths,
-                                  trans_bandwidth=trans_bandwidth,
-                                  method=method, iir_params=iir_params,
-                                  mt_bandwidth=mt_bandwidth, p_value=p_value,
-                                  picks=picks, n_jobs=n_jobs, copy=False)
+        if self.preload:
+            self._data = notch_filter(self._data, fs, freqs,
+                                      filter_length=filter_length,
+                                      notch_widths=notch_widths,
+                                      trans_bandwidth=trans_bandwidth,
+                                      method=method, iir_params=iir_params,
+                                      mt_bandwidth=mt_bandwidth,
+                                      p_value=p_value, picks=picks,
+                                      n_jobs=n_jobs, copy=False)
+        else:
+            _check_chunked(out, method)
+            filter_length, pad = _fir_stream_pad(filter_length, fs,
+                                                 self.n_times)
+            fun = partial(notch_filter, Fs=fs, freqs=freqs,
+                          filter_length=filter_length,
+                          notch_widths=notch_widths,
+                          trans_bandwidth=trans_bandwidth, method=method,
+                          iir_params=iir_params, picks=picks, n_jobs=n_jobs,
+                          copy=False)
+            self._apply_chunked(fun, out, pad, chunk_duration)
 
     @verbose
     def resample(self, sfreq, npad=100, window='boxcar',
-                 stim_picks=None, n_jobs=1, verbose=None):
+                 stim_picks=None, n_jobs=1, method='fft', out=None,
+                 chunk_duration=60., verbose=None):
         """Resample data channels.
 
         Resamples all channels. The data of the Raw object is modified inplace.
 
-        The Raw object has to be constructed using preload=True (or string).
+        The Raw object has to be constructed using preload=True (or string),
+        unless method="polyphase" is used. The data are then resampled in
+        chunks while they are read, and preloaded afterward.
 
         WARNING: The intended purpose of this function is primarily to speed
         up computations (e.g., projection calculation) when precise timing
@@ -529,7 +722,18 @@ class _BaseRaw(ProjMixin, ContainsMixin, PickDropChannelsMixin,
             mne.pick_types(raw.info, meg=False, stim=True, exclude=[]).
         n_jobs : int | str
             Number of jobs to run in parallel. Can be 'cuda' if scikits.cuda
-            is installed properly and CUDA is initialized.
+            is installed properly, CUDA is initialized, and method='fft'.
+        method : str
+            'fft' will resample each file at once in the frequency domain,
+            'polyphase' will use a polyphase FIR filter on chunks of data.
+            See mne.filter.resample for details.
+        out : str | None
+            Name of a file used to memory-map the resampled data if the data
+            are not preloaded. If None, they are stored in memory. Ignored if
+            the data are preloaded.
+        chunk_duration : float
+            Duration in seconds of the chunks read to resample data that are
+            not preloaded.
         verbose : bool, str, int, or None
             If not None, override default verbose level (see mne.verbose).
             Defaults to self.verbose.
@@ -539,8 +743,9 @@ class _BaseRaw(ProjMixin, ContainsMixin, PickDropChannelsMixin,
         For some data, it may be more accurate to use npad=0 to reduce
         artifacts. This is dataset dependent -- check your data!
         """
-        if not self.preload:
-            raise RuntimeError('Can only resample preloaded data')
+        if not self.preload and method != 'polyphase':
+            raise RuntimeError('Can only resample preloaded data, unless '
+                               'method="polyphase" is used')
         sfreq = float(sfreq)
         o_sfreq = float(self.info['sfreq'])
 
@@ -552,11 +757,25 @@ class _BaseRaw(ProjMixin, ContainsMixin, PickDropChannelsMixin,
                                     stim=True, exclude=[])
         stim_picks = np.asanyarray(stim_picks)
         ratio = sfreq / o_sfreq
+        if not self.preload:
+            up, down = _polyphase_ratio(sfreq, o_sfreq)
+            n_outs = [_polyphase_n_out(n, up, down)
+                      for n in self._raw_lengths]
+            out_offsets = np.concatenate(([0], np.cumsum(n_outs)))
+            data = _allocate_data(None, out,
+                                  (self.info['nchan'], out_offsets[-1]),
+                                  np.float64)
+            chunk = max(int(round(chunk_duration * o_sfreq)), 1)
         for ri in range(len(self._raw_lengths)):
-            data_chunk = self._data[:, offsets[ri]:offsets[ri + 1]]
-            new_data.append(resample(data_chunk, sfreq, o_sfreq, npad,
-                                     n_jobs=n_jobs))
-            new_ntimes = new_data[ri].shape[1]
+            n_times = self._raw_lengths[ri]
+            if self.preload:
+                data_chunk = self._data[:, offsets[ri]:offsets[ri + 1]]
+                new_data.append(resample(data_chunk, sfreq, o_sfreq, npad,
+                                         n_jobs=n_jobs, method=method))
+                new_ntimes = new_data[ri].shape[1]
+            else:
+                new_ntimes = n_outs[ri]
+                new_data.append(data[:, out_offsets[ri]:out_offsets[ri + 1]])
 
             # Now deal with the stim channels. In empirical testing, it was
             # faster to resample all channels (above) and then replace the
@@ -568,16 +787,34 @@ class _BaseRaw(ProjMixin, ContainsMixin, PickDropChannelsMixin,
             # one sample more than expected) due to padding
             stim_inds = np.minimum(np.floor(np.arange(new_ntimes)
                                             / ratio).astype(int),
-                                   data_chunk.shape[1] - 1)
-            for sp in stim_picks:
-                new_data[ri][sp] = data_chunk[[sp]][:, stim_inds]
-
+                                   n_times - 1)
+            if self.preload:
+                for sp in stim_picks:
+                    new_data[ri][sp] = data_chunk[[sp]][:, stim_inds]
+            else:
+                stim_data = np.zeros((len(stim_picks), new_ntimes))
+                read = _StimReader(self, offsets[ri], stim_picks, stim_inds,
+                                   stim_data)
+                _resample_polyphase(read, n_times, self.info['nchan'], up,
+                                    down, np.float64, new_data[ri], chunk,
+                                    check_n_jobs(n_jobs))
+                new_data[ri][stim_picks] = stim_data
+
+        # adjust affected variables (only now, as they are used for reading)
+        for ri in range(len(self._raw_lengths)):
+            new_ntimes = new_data[ri].shape[1]
             self._first_samps[ri] = int(self._first_samps[ri] * ratio)
             self._last_samps[ri] = self._first_samps[ri] + new_ntimes - 1
             self._raw_lengths[ri] = new_ntimes
-
-        # adjust affected variables
-        self._data = np.concatenate(new_data, axis=1)
+        if self.preload:
+            self._data = np.concatenate(new_data, axis=1)
+        else:
+            if hasattr(data, 'flush'):
+                data.flush()
+            self._data = data
+            self.preload = True
+            # the data are no longer read from the original files
+            self.close()
         self.first_samp = self._first_samps[0]
         self.last_samp = self.first_samp + self._data.shape[1] - 1
         self.info['sfreq'] = sfreq
@@ -867,6 +1104,7 @@ class _BaseRaw(ProjMixin, ContainsMixin, PickDropChannelsMixin,
         of a channel's time series. The changes will be reflected immediately
         in the raw object's ``raw.info['bads']`` entry.
         """
+        from ..viz import plot_raw
         return plot_raw(self, events, duration, start, n_channels, bgcolor,
                         color, bad_color, event_color, scalings, remove_dc,
                         order, show_options, title, show, block, highpass,
@@ -912,6 +1150,7 @@ class _BaseRaw(ProjMixin, ContainsMixin, PickDropChannelsMixin,
         verbose : bool, str, int, or None
             If not None, override default verbose level (see mne.verbose).
         """
+        from ..viz import plot_raw_psds
         return plot_raw_psds(self, tmin, tmax, fmin, fmax, proj, n_fft, picks,
                              ax, color, area_mode, area_alpha, n_jobs)
 
@@ -1163,6 +1402,9 @@ class _BaseRaw(ProjMixin, ContainsMixin, PickDropChannelsMixin,
             self.rawdirs += r.rawdirs
             self._filenames += r._filenames
         self.last_samp = self.first_samp + sum(self._raw_lengths) - 1
+        if getattr(self, '_fid_pool', None) is not None:
+            # keep a handle open for each of the files
+            self._fid_pool.max_fids = len(self._filenames)
 
         # this has to be done after first and last sample are set appropriately
         if self.preload:
@@ -1171,9 +1413,11 @@ class _BaseRaw(ProjMixin, ContainsMixin, PickDropChannelsMixin,
     def close(self):
         """Clean up the object.
 
-        Does nothing for now.
+        Closes the file handles kept open to read data that are not
+        preloaded. They will be reopened if data are accessed again.
         """
-        pass
+        if getattr(self, '_fid_pool', None) is not None:
+            self._fid_pool.close()
 
     def copy(self):
         """ Return copy of Raw instance
@@ -1230,6 +1474,7 @@ class _BaseRaw(ProjMixin, ContainsMixin, PickDropChannelsMixin,
         n_channel_types = 0
         ch_types_used = []
 
+        from ..viz import _mutable_defaults
         scalings = _mutable_defaults(('scalings', scalings))[0]
         for t in scalings.keys():
             if t in types:
@@ -1646,6 +1891,115 @@ def _envelope(x):
     return np.abs(hilbert(x))
 
 
+def _apply_function(data, fun, picks, dtype, n_jobs, *args, **kwargs):
+    """Helper to apply a function to the rows of data given by picks"""
+    data_in = data
+    if dtype is not None and dtype != data.dtype:
+        data = data.astype(dtype)
+
+    if n_jobs == 1:
+        # modify data inplace to save memory
+        for idx in picks:
+            data[idx, :] = fun(data_in[idx, :], *args, **kwargs)
+    else:
+        # use parallel function
+        parallel, p_fun, _ = parallel_func(fun, n_jobs)
+        data_picks_new = parallel(p_fun(data_in[p], *args, **kwargs)
+                                  for p in picks)
+        for pp, p in enumerate(picks):
+            data[p, :] = data_picks_new[pp]
+    return data
+
+
+def _filter_data(data, sfreq, l_freq, h_freq, picks, filter_length,
+                 l_trans_bandwidth, h_trans_bandwidth, n_jobs, method,
+                 iir_params):
+    """Helper to low-, high-, band-pass or band-stop filter data inplace"""
+    if l_freq is None and h_freq is not None:
+        data = low_pass_filter(data, sfreq, h_freq,
+                               filter_length=filter_length,
+                               trans_bandwidth=h_trans_bandwidth,
+                               method=method, iir_params=iir_params,
+                               picks=picks, n_jobs=n_jobs, copy=False)
+    if l_freq is not None and h_freq is None:
+        data = high_pass_filter(data, sfreq, l_freq,
+                                filter_length=filter_length,
+                                trans_bandwidth=l_trans_bandwidth,
+                                method=method, iir_params=iir_params,
+                                picks=picks, n_jobs=n_jobs, copy=False)
+    if l_freq is not None and h_freq is not None:
+        if l_freq < h_freq:
+            data = band_pass_filter(
+                data, sfreq, l_freq, h_freq,
+                filter_length=filter_length,
+                l_trans_bandwidth=l_trans_bandwidth,
+                h_trans_bandwidth=h_trans_bandwidth,
+                method=method, iir_params=iir_params, picks=picks,
+                n_jobs=n_jobs, copy=False)
+        else:
+            data = band_stop_filter(
+                data, sfreq, h_freq, l_freq,
+                filter_length=filter_length,
+                l_trans_bandwidth=h_trans_bandwidth,
+                h_trans_bandwidth=l_trans_bandwidth, method=method,
+                iir_params=iir_params, picks=picks, n_jobs=n_jobs,
+                copy=False)
+    return data
+
+
+class _StimReader(object):
+    """Helper to read data to resample, keeping the stim channel samples
+
+    Stim channels are subsampled instead of being resampled, so the samples
+    stim_inds of the stim channels are stored in stim_data as they are read.
+    """
+    def __init__(self, raw, offset, stim_picks, stim_inds, stim_data):
+        self.raw = raw
+        self.offset = offset
+        self.stim_picks = stim_picks
+        self.stim_inds = stim_inds
+        self.stim_data = stim_data
+
+    def __call__(self, start, stop):
+        data = self.raw._read_segment(start=self.offset + start,
+                                      stop=self.offset + stop,
+                                      projector=self.raw._projector)[0]
+        if len(self.stim_picks) > 0:
+            mask = (self.stim_inds >= start) & (self.stim_inds < stop)
+            self.stim_data[:, mask] = \
+                data[self.stim_picks][:, self.stim_inds[mask] - start]
+        return data
+
+
+def _check_chunked(out, method='fft'):
+    """Helper to check that data that are not preloaded can be processed"""
+    if out is None:
+        raise RuntimeError('Raw data needs to be preloaded. Use preload=True '
+                           '(or string) in the constructor, or pass a file '
+                           'name as out to process the data in chunks.')
+    if method.lower() != 'fft':
+        raise ValueError('Only method="fft" can be used to filter data that '
+                         'are not preloaded, got "%s"' % method)
+
+
+def _fir_stream_pad(filter_length, sfreq, n_times):
+    """Helper to get the FIR length used for streaming and the padding
+
+    The zero-phase FIR filter is applied forward and backward, so each
+    output sample mostly depends on the input samples closer than the filter
+    length. Chunks padded by that many samples thus give the same result as
+    filtering the whole recording at once, up to the differences due to the
+    placement of the overlap-add blocks.
+    """
+    n_times = int(n_times)
+    filter_length = _get_filter_length(filter_length, sfreq, len_x=n_times)
+    if filter_length is None or filter_length >= n_times:
+        # the whole signal is filtered in the frequency domain at once
+        return None, n_times
+    # the filter can be made one sample longer to set the gain at Nyquist
+    return filter_length, filter_length + 1
+
+
 def _check_raw_compatibility(raw):
     """Check to make sure all instances of Raw
     in the input list raw have compatible parameters"""
@@ -9,20 +9,21 @@ import copy
 import warnings
 import os
 import os.path as op
+import hashlib
 
 import numpy as np
 
 from ..constants import FIFF
-from ..open import fiff_open, _fiff_get_fid
+from ..open import _fiff_open, _FidPool
 from ..meas_info import read_meas_info
 from ..tree import dir_tree_find
-from ..tag import read_tag
+from ..tag import read_tag, Tag
 from ..proj import (proj_equal, make_eeg_average_ref_proj,
                     _needs_eeg_average_ref_proj)
 from ..compensator import get_current_comp, set_current_comp, make_compensator
 from ..base import _BaseRaw
 
-from ...utils import check_fname, logger, verbose
+from ...utils import check_fname, logger, verbose, get_config
 from ...externals.six import string_types
 
 
@@ -61,6 +62,12 @@ class RawFIFF(_BaseRaw):
     add_eeg_ref : bool
         If True, add average EEG reference projector (if it's not already
         present).
+    mmap : bool
+        If True, the data buffers are accessed through memory-mapped views
+        of the files instead of being read tag by tag, which makes random
+        access to long recordings much faster. Calibration, compensation
+        and projection are only applied to the requested samples. Not
+        supported for compressed (.gz) files.
     verbose : bool, str, int, or None
         If not None, override default verbose level (see mne.verbose).
 
@@ -76,11 +83,20 @@ class RawFIFF(_BaseRaw):
         Indicates whether raw data are in memory.
     verbose : bool, str, int, or None
         See above.
+
+    Notes
+    -----
+    If the config variable ``MNE_USE_FIFF_INDEX`` is ``'true'``, the tag
+    directory and the list of data buffers of each file are stored in an
+    index file (next to the raw file, or in ``MNE_CACHE_DIR`` if it is set)
+    the first time the file is opened, so that subsequent openings do not
+    need to scan the file. The index is rebuilt if the file size or
+    modification time changes.
     """
     @verbose
     def __init__(self, fnames, allow_maxshield=False, preload=False,
                  proj=False, compensation=None, add_eeg_ref=True,
-                 verbose=None):
+                 mmap=False, verbose=None):
 
         if not isinstance(fnames, list):
             fnames = [fnames]
@@ -129,6 +145,15 @@ class RawFIFF(_BaseRaw):
         self.orig_format = raws[0].orig_format
         self.proj = False
 
+        if mmap and any(op.splitext(f)[1].lower() == '.gz'
+                        for f in self._filenames):
+            raise ValueError('mmap cannot be used with compressed (.gz) '
+                             'files')
+        self._mmap = bool(mmap)
+        self._mmap_runs = dict()
+        # keep file handles open across reads of non-preloaded data
+        self._fid_pool = _FidPool(max_fids=len(self._filenames))
+
         if add_eeg_ref and _needs_eeg_average_ref_proj(self.info):
             eeg_ref = make_eeg_average_ref_proj(self.info, activate=False)
             self.add_proj(eeg_ref)
@@ -188,7 +213,15 @@ class RawFIFF(_BaseRaw):
         #   Read in the whole file if preload is on and .fif.gz (saves time)
         ext = os.path.splitext(fname)[1].lower()
         whole_file = preload if '.gz' in ext else False
-        ff, tree, _ = fiff_open(fname, preload=whole_file)
+
+        #   Use the cached tag directory and data buffer list if possible
+        use_index = get_config('MNE_USE_FIFF_INDEX', 'false').lower() == 'true'
+        index = index_fname = None
+        if use_index:
+            index_fname = _raw_index_fname(fname)
+            index = _read_raw_index(fname, index_fname)
+        directory = None if index is None else index['directory']
+        ff, tree, directory = _fiff_open(fname, whole_file, directory)
         with ff as fid:
             #   Read the measurement info
             info, meas = read_meas_info(fid, tree)
@@ -217,94 +250,20 @@ class RawFIFF(_BaseRaw):
             info['filename'] = fname
 
             #   Process the directory
-            directory = raw_node['directory']
-            nent = raw_node['nent']
             nchan = int(info['nchan'])
-            first = 0
-            first_samp = 0
-            first_skip = 0
-
-            #   Get first sample tag if it is there
-            if directory[first].kind == FIFF.FIFF_FIRST_SAMPLE:
-                tag = read_tag(fid, directory[first].pos)
-                first_samp = int(tag.data)
-                first += 1
-
-            #   Omit initial skip
-            if directory[first].kind == FIFF.FIFF_DATA_SKIP:
-                # This first skip can be applied only after we know the bufsize
-                tag = read_tag(fid, directory[first].pos)
-                first_skip = int(tag.data)
-                first += 1
+            if index is None:
+                rawdir, first_samp, last_samp, orig_format = \
+                    _make_rawdir(fid, raw_node, nchan)
+            else:
+                rawdir, first_samp, last_samp, orig_format = \
+                    [index[key] for key in ('rawdir', 'first_samp',
+                                            'last_samp', 'orig_format')]
+                logger.info('    Using raw data index %s' % index_fname)
 
             raw = _RawShell()
             raw.filename = fname
             raw.first_samp = first_samp
 
-            #   Go through the remaining tags in the directory
-            rawdir = list()
-            nskip = 0
-            orig_format = None
-            for k in range(first, nent):
-                ent = directory[k]
-                if ent.kind == FIFF.FIFF_DATA_SKIP:
-                    tag = read_tag(fid, ent.pos)
-                    nskip = int(tag.data)
-                elif ent.kind == FIFF.FIFF_DATA_BUFFER:
-                    #   Figure out the number of samples in this buffer
-                    if ent.type == FIFF.FIFFT_DAU_PACK16:
-                        nsamp = ent.size // (2 * nchan)
-                    elif ent.type == FIFF.FIFFT_SHORT:
-                        nsamp = ent.size // (2 * nchan)
-                    elif ent.type == FIFF.FIFFT_FLOAT:
-                        nsamp = ent.size // (4 * nchan)
-                    elif ent.type == FIFF.FIFFT_DOUBLE:
-                        nsamp = ent.size // (8 * nchan)
-                    elif ent.type == FIFF.FIFFT_INT:
-                        nsamp = ent.size // (4 * nchan)
-                    elif ent.type == FIFF.FIFFT_COMPLEX_FLOAT:
-                        nsamp = ent.size // (8 * nchan)
-                    elif ent.type == FIFF.FIFFT_COMPLEX_DOUBLE:
-                        nsamp = ent.size // (16 * nchan)
-                    else:
-                        raise ValueError('Cannot handle data buffers of type '
-                                         '%d' % ent.type)
-                    if orig_format is None:
-                        if ent.type == FIFF.FIFFT_DAU_PACK16:
-                            orig_format = 'short'
-                        elif ent.type == FIFF.FIFFT_SHORT:
-                            orig_format = 'short'
-                        elif ent.type == FIFF.FIFFT_FLOAT:
-                            orig_format = 'single'
-                        elif ent.type == FIFF.FIFFT_DOUBLE:
-                            orig_format = 'double'
-                        elif ent.type == FIFF.FIFFT_INT:
-                            orig_format = 'int'
-                        elif ent.type == FIFF.FIFFT_COMPLEX_FLOAT:
-                            orig_format = 'single'
-                        elif ent.type == FIFF.FIFFT_COMPLEX_DOUBLE:
-                            orig_format = 'double'
-
-                    #  Do we have an initial skip pending?
-                    if first_skip > 0:
-                        first_samp += nsamp * first_skip
-                        raw.first_samp = first_samp
-                        first_skip = 0
-
-                    #  Do we have a skip pending?
-                    if nskip > 0:
-                        rawdir.append(dict(ent=None, first=first_samp,
-                                           last=first_samp + nskip * nsamp - 1,
-                                           nsamp=nskip * nsamp))
-                        first_samp += nskip * nsamp
-                        nskip = 0
-
-                    #  Add a data buffer
-                    rawdir.append(dict(ent=ent, first=first_samp,
-                                       last=first_samp + nsamp - 1,
-                                       nsamp=nsamp))
-                    first_samp += nsamp
-
             # Try to get the next filename tag for split files
             nodes_list = dir_tree_find(tree, FIFF.FIFFB_REF)
             next_fname = None
@@ -343,7 +302,11 @@ class RawFIFF(_BaseRaw):
                 if next_fname is not None:
                     break
 
-        raw.last_samp = first_samp - 1
+        if use_index and index is None:
+            _write_raw_index(fname, index_fname, directory, rawdir,
+                             first_samp, last_samp, orig_format)
+
+        raw.last_samp = last_samp
         raw.orig_format = orig_format
 
         #   Add the calibration factors
@@ -442,7 +405,7 @@ class RawFIFF(_BaseRaw):
         else:
             data = None  # we will allocate it later, once we know the type
 
-        mult = list()
+        mult, cols = list(), list()
         for ri in range(len(self._raw_lengths)):
             mult.append(np.diag(self.cals.ravel()))
             if self.comp is not None:
@@ -450,6 +413,10 @@ class RawFIFF(_BaseRaw):
             if projector is not None:
                 mult[ri] = np.dot(projector, mult[ri])
             mult[ri] = mult[ri][idx]
+            # only the channels that contribute to the selection are decoded
+            # (e.g., just the stim channel when reading it for events)
+            cols.append(np.where(np.any(mult[ri] != 0, axis=0))[0])
+            mult[ri] = mult[ri][:, cols[ri]]
 
         # deal with having multiple files accessed by the raw object
         cumul_lens = np.concatenate(([0], np.array(self._raw_lengths,
@@ -462,10 +429,6 @@ class RawFIFF(_BaseRaw):
         first_file_used = False
         s_off = 0
         dest = 0
-        if isinstance(idx, slice):
-            cals = self.cals.ravel()[idx][:, np.newaxis]
-        else:
-            cals = self.cals.ravel()[:, np.newaxis]
 
         for fi in np.nonzero(files_used)[0]:
             start_loc = self._first_samps[fi]
@@ -482,86 +445,107 @@ class RawFIFF(_BaseRaw):
             if stop_loc < start_loc:
                 raise ValueError('Bad array indexing, could be a bug')
             len_loc = stop_loc - start_loc + 1
-            fid = _fiff_get_fid(self._filenames[fi])
-
-            for this in self.rawdirs[fi]:
-
-                #  Do we need this buffer
-                if this['last'] >= start_loc:
-                    #  The picking logic is a bit complicated
-                    if stop_loc > this['last'] and start_loc < this['first']:
-                        #    We need the whole buffer
-                        first_pick = 0
-                        last_pick = this['nsamp']
-                        logger.debug('W')
-
-                    elif start_loc >= this['first']:
-                        first_pick = start_loc - this['first']
-                        if stop_loc <= this['last']:
-                            #   Something from the middle
-                            last_pick = this['nsamp'] + stop_loc - this['last']
-                            logger.debug('M')
+            if self._mmap:
+                # serve the request from memory-mapped views of the file,
+                # only reading (and calibrating) the samples requested
+                use_mult = self.comp is not None or projector is not None
+                fid = self._fid_pool.get(self._filenames[fi])
+                try:
+                    for run in self._get_mmap_runs(fi):
+                        if run['last'] < start_loc:
+                            continue
+                        if run['first'] > stop_loc:
+                            break
+                        run_first, run_last = run['first'], run['last']
+                        first_pick = max(start_loc, run_first) - run_first
+                        last_pick = min(stop_loc, run_last) + 1 - run_first
+                        picksamp = last_pick - first_pick
+                        this_dest = dest + run_first + first_pick - start_loc
+                        one = _read_mmap_run(fid, run, nchan,
+                                             first_pick, last_pick,
+                                             cols[fi] if use_mult else idx)
+                        if use_mult:
+                            one = np.dot(mult[fi], one)
                         else:
-                            #   From the middle to the end
+                            one *= self.cals.ravel()[idx][:, np.newaxis]
+                        data = _allocate_data(data, data_buffer, data_shape,
+                                              one.dtype)
+                        data[:, this_dest:this_dest + picksamp] = one
+                finally:
+                    self._fid_pool.release(self._filenames[fi], fid)
+                # skipped samples (if any) are left as zeros
+                data = _allocate_data(data, data_buffer, data_shape,
+                                      np.float)
+                dest += len_loc
+                s_off += len_loc
+                continue
+
+            fid = self._fid_pool.get(self._filenames[fi])
+            try:
+                for this in self.rawdirs[fi]:
+
+                    #  Do we need this buffer
+                    if this['last'] >= start_loc:
+                        #  The picking logic is a bit complicated
+                        if (stop_loc > this['last'] and
+                                start_loc < this['first']):
+                            #    We need the whole buffer
+                            first_pick = 0
                             last_pick = this['nsamp']
-                            logger.debug('E')
-                    else:
-                        #    From the beginning to the middle
-                        first_pick = 0
-                        last_pick = stop_loc - this['first'] + 1
-                        logger.debug('B')
-
-                    #   Now we are ready to pick
-                    picksamp = last_pick - first_pick
-                    if picksamp > 0:
-                        # only read data if it exists
-                        if this['ent'] is not None:
-                            one = read_tag(fid, this['ent'].pos,
-                                           shape=(this['nsamp'], nchan),
-                                           rlims=(first_pick, last_pick)).data
-                            if np.isrealobj(one):
-                                dtype = np.float
+                            logger.debug('W')
+
+                        elif start_loc >= this['first']:
+                            first_pick = start_loc - this['first']
+                            if stop_loc <= this['last']:
+                                #   Something from the middle
+                                last_pick = (this['nsamp'] + stop_loc -
+                                             this['last'])
+                                logger.debug('M')
                             else:
-                                dtype = np.complex128
-                            one.shape = (picksamp, nchan)
-                            one = one.T.astype(dtype)
-                            # use proj + cal factors in mult
-                            if mult is not None:
-                                one[idx] = np.dot(mult[fi], one)
-                            else:  # apply just the calibration factors
-                                # this logic is designed to limit memory copies
-                                if isinstance(idx, slice):
-                                    # This is a view operation, so it's fast
-                                    one[idx] *= cals
+                                #   From the middle to the end
+                                last_pick = this['nsamp']
+                                logger.debug('E')
+                        else:
+                            #    From the beginning to the middle
+                            first_pick = 0
+                            last_pick = stop_loc - this['first'] + 1
+                            logger.debug('B')
+
+                        #   Now we are ready to pick
+                        picksamp = last_pick - first_pick
+                        if picksamp > 0:
+                            # only read data if it exists
+                            if this['ent'] is not None:
+                                one = read_tag(fid, this['ent'].pos,
+                                               shape=(this['nsamp'], nchan),
+                                               rlims=(first_pick,
+                                                      last_pick)).data
+                                if np.isrealobj(one):
+                                    dtype = np.float
                                 else:
-                                    # Extra operations are actually faster here
-                                    # than creating a new array
-                                    # (fancy indexing)
-                                    one *= cals
-
-                            # if not already done, allocate array with
-                            # right type
-                            data = _allocate_data(data, data_buffer,
-                                                  data_shape, dtype)
-                            if isinstance(idx, slice):
-                                # faster to slice in data than doing
-                                # one = one[idx] sooner
-                                data[:, dest:(dest + picksamp)] = one[idx]
-                            else:
-                                # faster than doing one = one[idx]
-                                data_view = data[:, dest:(dest + picksamp)]
-                                for ii, ix in enumerate(idx):
-                                    data_view[ii] = one[ix]
-                        dest += picksamp
-
-                #   Done?
-                if this['last'] >= stop_loc:
-                    # if not already done, allocate array with float dtype
-                    data = _allocate_data(data, data_buffer, data_shape,
-                                          np.float)
-                    break
-
-            fid.close()  # clean it up
+                                    dtype = np.complex128
+                                one.shape = (picksamp, nchan)
+                                if len(cols[fi]) < nchan:
+                                    one = one[:, cols[fi]]
+                                # use proj + cal factors in mult
+                                one = np.dot(mult[fi], one.T.astype(dtype))
+
+                                # if not already done, allocate array with
+                                # right type
+                                data = _allocate_data(data, data_buffer,
+                                                      data_shape, dtype)
+                                data[:, dest:(dest + picksamp)] = one
+                            dest += picksamp
+
+                    #   Done?
+                    if this['last'] >= stop_loc:
+                        # if not already done, allocate array with float dtype
+                        data = _allocate_data(data, data_buffer, data_shape,
+                                              np.float)
+                        break
+
+            finally:
+                self._fid_pool.release(self._filenames[fi], fid)
             s_off += len_loc
             # double-check our math
             if not s_off == dest:
@@ -572,6 +556,247 @@ class RawFIFF(_BaseRaw):
 
         return data, times
 
+    def _get_mmap_runs(self, fi):
+        """Get (and cache) the contiguous data buffer runs of a file"""
+        fname = self._filenames[fi]
+        if fname not in self._mmap_runs:
+            self._mmap_runs[fname] = _rawdir_mmap_runs(self.rawdirs[fi],
+                                                       self.info['nchan'])
+        return self._mmap_runs[fname]
+
+
+_mmap_dtypes = {FIFF.FIFFT_DAU_PACK16: '>i2',
+                FIFF.FIFFT_SHORT: '>i2',
+                FIFF.FIFFT_FLOAT: '>f4',
+                FIFF.FIFFT_DOUBLE: '>f8',
+                FIFF.FIFFT_INT: '>i4',
+                FIFF.FIFFT_COMPLEX_FLOAT: '>c8',
+                FIFF.FIFFT_COMPLEX_DOUBLE: '>c16'}
+
+
+def _rawdir_mmap_runs(rawdir, nchan):
+    """Group a raw directory into runs of equally-sized adjacent buffers
+
+    Each run can be described by a single memory-mapped record array, so
+    that any window of samples within it can be accessed by striding.
+    """
+    runs = list()
+    for this in rawdir:
+        ent = this['ent']
+        if ent is None:
+            continue  # skips do not have any data on disk
+        if len(runs) > 0:
+            run = runs[-1]
+            if (run['type'] == ent.type and run['size'] == ent.size and
+                    run['last'] + 1 == this['first'] and
+                    run['pos'] + run['n_buf'] * (16 + ent.size) == ent.pos):
+                run['n_buf'] += 1
+                run['last'] = this['last']
+                continue
+        runs.append(dict(pos=ent.pos, type=ent.type, size=ent.size,
+                         nsamp=this['nsamp'], n_buf=1, first=this['first'],
+                         last=this['last']))
+    return runs
+
+
+def _read_mmap_run(fid, run, nchan, first_pick, last_pick, sel=None):
+    """Read samples first_pick:last_pick of a run as (n_chan, n_samp)"""
+    dt = np.dtype(_mmap_dtypes[run['type']])
+    nsamp = run['nsamp']
+    # each record is a tag header followed by the (nsamp, nchan) buffer
+    fields = [('header', 'V16'), ('data', dt, (nsamp, nchan))]
+    pad = run['size'] - nsamp * nchan * dt.itemsize
+    if pad > 0:
+        fields.append(('pad', 'V%d' % pad))
+    record = np.dtype(fields)
+    # only map the buffers that are needed
+    b0 = first_pick // nsamp
+    b1 = (last_pick - 1) // nsamp + 1
+    mm = np.memmap(fid, dtype=record, mode='r',
+                   offset=run['pos'] + b0 * record.itemsize,
+                   shape=(b1 - b0,))
+    block = mm['data']
+    if sel is not None:
+        block = block[:, :, sel]
+    block = block.reshape(-1, block.shape[-1])
+    block = block[first_pick - b0 * nsamp:last_pick - b0 * nsamp]
+    dtype = np.complex128 if dt.kind == 'c' else np.float
+    return block.T.astype(dtype)
+
+
+def _make_rawdir(fid, raw_node, nchan):
+    """Make the list of data buffers by going through a raw data directory
+
+    Returns the directory, the first and last samples, and the original
+    data format.
+    """
+    directory = raw_node['directory']
+    nent = raw_node['nent']
+    first = 0
+    first_samp = 0
+    first_skip = 0
+
+    #   Get first sample tag if it is there
+    if directory[first].kind == FIFF.FIFF_FIRST_SAMPLE:
+        tag = read_tag(fid, directory[first].pos)
+        first_samp = int(tag.data)
+        first += 1
+
+    #   Omit initial skip
+    if directory[first].kind == FIFF.FIFF_DATA_SKIP:
+        # This first skip can be applied only after we know the bufsize
+        tag = read_tag(fid, directory[first].pos)
+        first_skip = int(tag.data)
+        first += 1
+
+    raw_first_samp = first_samp
+
+    #   Go through the remaining tags in the directory
+    rawdir = list()
+    nskip = 0
+    orig_format = None
+    for k in range(first, nent):
+        ent = directory[k]
+        if ent.kind == FIFF.FIFF_DATA_SKIP:
+            tag = read_tag(fid, ent.pos)
+            nskip = int(tag.data)
+        elif ent.kind == FIFF.FIFF_DATA_BUFFER:
+            #   Figure out the number of samples in this buffer
+            if ent.type == FIFF.FIFFT_DAU_PACK16:
+                nsamp = ent.size // (2 * nchan)
+            elif ent.type == FIFF.FIFFT_SHORT:
+                nsamp = ent.size // (2 * nchan)
+            elif ent.type == FIFF.FIFFT_FLOAT:
+                nsamp = ent.size // (4 * nchan)
+            elif ent.type == FIFF.FIFFT_DOUBLE:
+                nsamp = ent.size // (8 * nchan)
+            elif ent.type == FIFF.FIFFT_INT:
+                nsamp = ent.size // (4 * nchan)
+            elif ent.type == FIFF.FIFFT_COMPLEX_FLOAT:
+                nsamp = ent.size // (8 * nchan)
+            elif ent.type == FIFF.FIFFT_COMPLEX_DOUBLE:
+                nsamp = ent.size // (16 * nchan)
+            else:
+                raise ValueError('Cannot handle data buffers of type '
+                                 '%d' % ent.type)
+            if orig_format is None:
+                if ent.type == FIFF.FIFFT_DAU_PACK16:
+                    orig_format = 'short'
+                elif ent.type == FIFF.FIFFT_SHORT:
+                    orig_format = 'short'
+                elif ent.type == FIFF.FIFFT_FLOAT:
+                    orig_format = 'single'
+                elif ent.type == FIFF.FIFFT_DOUBLE:
+                    orig_format = 'double'
+                elif ent.type == FIFF.FIFFT_INT:
+                    orig_format = 'int'
+                elif ent.type == FIFF.FIFFT_COMPLEX_FLOAT:
+                    orig_format = 'single'
+                elif ent.type == FIFF.FIFFT_COMPLEX_DOUBLE:
+                    orig_format = 'double'
+
+            #  Do we have an initial skip pending?
+            if first_skip > 0:
+                first_samp += nsamp * first_skip
+                raw_first_samp = first_samp
+                first_skip = 0
+
+            #  Do we have a skip pending?
+            if nskip > 0:
+                rawdir.append(dict(ent=None, first=first_samp,
+                                   last=first_samp + nskip * nsamp - 1,
+                                   nsamp=nskip * nsamp))
+                first_samp += nskip * nsamp
+                nskip = 0
+
+            #  Add a data buffer
+            rawdir.append(dict(ent=ent, first=first_samp,
+                               last=first_samp + nsamp - 1,
+                               nsamp=nsamp))
+            first_samp += nsamp
+    return rawdir, raw_first_samp, first_samp - 1, orig_format
+
+
+# Bump this whenever the content of the raw data index changes
+_RAW_INDEX_VERSION = 1
+
+_index_dir_dtype = np.dtype([('kind', np.int64), ('type', np.int64),
+                             ('size', np.int64), ('next', np.int64),
+                             ('pos', np.int64)])
+_index_rawdir_dtype = np.dtype([('ent', np.int64), ('first', np.int64),
+                                ('last', np.int64), ('nsamp', np.int64)])
+
+
+def _raw_index_fname(fname):
+    """Get the name of the index file of a raw file
+
+    The index is stored next to the raw file, or in MNE_CACHE_DIR if set.
+    """
+    cache_dir = get_config('MNE_CACHE_DIR', None)
+    if cache_dir is None:
+        return fname + '.idx.npz'
+    name = hashlib.md5(fname.encode('utf-8')).hexdigest()
+    return op.join(cache_dir, 'mne-raw-index-%s.npz' % name)
+
+
+def _read_raw_index(fname, index_fname):
+    """Read the index of a raw file, None if missing or out of date"""
+    if not op.isfile(index_fname):
+        return None
+    stat = os.stat(fname)
+    try:
+        npz = np.load(index_fname)
+        index = dict((key, npz[key]) for key in npz.files)
+        npz.close()
+        if (int(index['version']) != _RAW_INDEX_VERSION or
+                int(index['size']) != stat.st_size or
+                float(index['mtime']) != stat.st_mtime):
+            logger.info('    Raw data index %s is out of date'
+                        % index_fname)
+            return None
+    except (IOError, ValueError, KeyError):
+        logger.info('    Could not read raw data index %s' % index_fname)
+        return None
+    directory = [Tag(*ent) for ent in index['directory'].tolist()]
+    rawdir = [dict(ent=directory[ent] if ent >= 0 else None, first=first,
+                   last=last, nsamp=nsamp)
+              for ent, first, last, nsamp in index['rawdir'].tolist()]
+    orig_format = str(index['orig_format'])
+    return dict(directory=directory, rawdir=rawdir,
+                first_samp=int(index['first_samp']),
+                last_samp=int(index['last_samp']),
+                orig_format=orig_format if orig_format else None)
+
+
+def _write_raw_index(fname, index_fname, directory, rawdir, first_samp,
+                     last_samp, orig_format):
+    """Write the index of a raw file (silently skipped if not possible)"""
+    stat = os.stat(fname)
+    dir_idx = dict((id(ent), k) for k, ent in enumerate(directory))
+    index = dict(
+        version=_RAW_INDEX_VERSION, size=stat.st_size, mtime=stat.st_mtime,
+        directory=np.array([(ent.kind, ent.type, ent.size, ent.next, ent.pos)
+                            for ent in directory], _index_dir_dtype),
+        rawdir=np.array([(-1 if r['ent'] is None else dir_idx[id(r['ent'])],
+                          r['first'], r['last'], r['nsamp'])
+                         for r in rawdir], _index_rawdir_dtype),
+        first_samp=first_samp, last_samp=last_samp,
+        orig_format=orig_format if orig_format is not None else '')
+    # write to a temporary file first so that concurrent readers never see
+    # a partially written index
+    tmp_fname = '%s.%d.tmp.npz' % (index_fname[:-4], os.getpid())
+    try:
+        np.savez(tmp_fname, **index)
+        if op.isfile(index_fname):
+            os.remove(index_fname)
+        os.rename(tmp_fname, index_fname)
+        logger.info('    Wrote raw data index %s' % index_fname)
+    except (IOError, OSError) as exp:
+        logger.info('    Could not write raw data index %s (%s)'
+                    % (index_fname, exp))
+        if op.isfile(tmp_fname):
+            os.remove(tmp_fname)
+
 
 def _allocate_data(data, data_buffer, data_shape, dtype):
     if data is None:
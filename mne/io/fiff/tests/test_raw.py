@@ -11,6 +11,8 @@ import glob
 from copy import deepcopy
 import warnings
 import itertools as itt
+import shutil
+import threading
 
 import numpy as np
 from numpy.testing import (assert_array_almost_equal, assert_array_equal,
@@ -25,8 +27,9 @@ from mne import (concatenate_events, find_events, equalize_channels,
                  compute_proj_raw, pick_types, pick_channels)
 from mne.utils import (_TempDir, requires_nitime, requires_pandas,
                        requires_mne, run_subprocess, run_tests_if_main,
-                       slow_test)
+                       slow_test, _make_test_raw)
 from mne.externals.six.moves import zip, cPickle as pickle
+from mne.filter import band_pass_filter
 from mne.io.proc_history import _get_sss_rank
 from mne.io.pick import _picks_by_type
 
@@ -51,8 +54,13 @@ hp_fif_fname = op.join(base_dir, 'test_chpi_raw_sss.fif')
 def test_hash_raw():
     """Test hashing raw objects
     """
+    # data that are not preloaded are hashed by file and tag directory
     raw = Raw(fif_fname)
-    assert_raises(RuntimeError, raw.__hash__)
+    raw_2 = Raw(fif_fname)
+    assert_equal(hash(raw), hash(raw_2))
+    assert_not_equal(hash(raw), hash(Raw(fif_fname, preload=True)))
+    raw_2.info['bads'] = [raw_2.ch_names[0]]
+    assert_not_equal(hash(raw), hash(raw_2))
     raw = Raw(fif_fname, preload=True).crop(0, 0.5)
     raw_2 = Raw(fif_fname, preload=True).crop(0, 0.5)
     assert_equal(hash(raw), hash(raw_2))
@@ -556,6 +564,141 @@ def test_getitem():
         assert_array_equal(times, times1)
 
 
+def test_mmap():
+    """Test memory-mapped access to raw data buffers
+    """
+    tempdir = _TempDir()
+    for comp in [None, 1]:
+        raw = Raw(ctf_comp_fname, compensation=comp)
+        raw_mm = Raw(ctf_comp_fname, compensation=comp, mmap=True)
+        for picks in [slice(None), [1, 5, 7], [3]]:
+            for start, stop in [(0, None), (3, 50), (raw.n_times - 2, None)]:
+                data, times = raw[picks, start:stop]
+                data_mm, times_mm = raw_mm[picks, start:stop]
+                assert_allclose(data, data_mm, rtol=1e-12, atol=1e-30)
+                assert_array_equal(times, times_mm)
+    raw = Raw(ctf_comp_fname, preload=True)
+    raw_mm = Raw(ctf_comp_fname, preload=True, mmap=True)
+    assert_array_equal(raw._data, raw_mm._data)
+
+    # split files with many small buffers in each
+    raw.append([raw.copy() for _ in range(11)])
+    split_fname = op.join(tempdir, 'split_raw.fif')
+    for format in ['short', 'single', 'double']:
+        raw.save(split_fname, buffer_size_sec=0.1, split_size='2MB',
+                 format=format, overwrite=True)
+        raw_1 = Raw(split_fname)
+        raw_2 = Raw(split_fname, mmap=True)
+        assert_true(len(raw_2._filenames) > 1)
+        for start, stop in [(0, None), (100, 1500), (999, 1001)]:
+            assert_array_equal(raw_1[:, start:stop][0],
+                               raw_2[:, start:stop][0])
+    gz_fname = op.join(tempdir, 'test_raw.fif.gz')
+    raw.save(gz_fname)
+    assert_raises(ValueError, Raw, gz_fname, mmap=True)
+
+
+def test_fid_pool():
+    """Test reuse of open file handles by non-preloaded Raw
+    """
+    tempdir = _TempDir()
+    copy_fname = op.join(tempdir, 'test_ctf_comp_raw.fif')
+    shutil.copyfile(ctf_comp_fname, copy_fname)
+    for mmap in (False, True):
+        raw = Raw(ctf_comp_fname, mmap=mmap)
+        assert_equal(len(raw._fid_pool), 0)
+        data = raw[:, 10:20][0]
+        assert_equal(len(raw._fid_pool), 1)
+        fid = raw._fid_pool._idle[0][1]
+        assert_array_equal(raw[:, 10:20][0], data)
+        assert_true(raw._fid_pool._idle[0][1] is fid)  # not reopened
+        # copies and pickles do not share (or carry) open handles
+        raw_2 = raw.copy()
+        assert_equal(len(raw_2._fid_pool), 0)
+        assert_array_equal(raw_2[:, 10:20][0], data)
+        raw_2 = pickle.loads(pickle.dumps(raw))
+        assert_equal(len(raw_2._fid_pool), 0)
+        assert_array_equal(raw_2[:, 10:20][0], data)
+        # concurrent reads lend out separate handles
+        out = list()
+        threads = [threading.Thread(target=lambda: out.append(raw[:, :][0]))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for this_data in out:
+            assert_array_equal(this_data, raw[:, :][0])
+        assert_true(len(raw._fid_pool) <= 1)
+        raw.close()
+        assert_equal(len(raw._fid_pool), 0)
+        assert_true(fid.closed)
+        assert_array_equal(raw[:, 10:20][0], data)  # reopened
+        with raw:
+            pass
+        assert_equal(len(raw._fid_pool), 0)
+        # a handle is kept open for each of the appended files
+        raw.append(Raw(copy_fname, mmap=mmap))
+        assert_equal(raw._fid_pool.max_fids, 2)
+        raw[:, :]
+        assert_equal(len(raw._fid_pool), 2)
+
+
+def test_raw_index():
+    """Test caching of the raw data directory in an index file
+    """
+    tempdir = _TempDir()
+    cache_dir = op.join(tempdir, 'cache')
+    os.mkdir(cache_dir)
+    raw = Raw(ctf_comp_fname, preload=True)
+    raw.append(raw.copy())
+    fname = op.join(tempdir, 'test_raw.fif')
+    raw.save(fname, buffer_size_sec=0.1)
+    raw = Raw(fname)
+    old_env = dict((key, os.environ.get(key)) for key in
+                   ('MNE_USE_FIFF_INDEX', 'MNE_CACHE_DIR'))
+    try:
+        os.environ['MNE_USE_FIFF_INDEX'] = 'true'
+        for this_cache_dir in (None, cache_dir):
+            if this_cache_dir is None:
+                os.environ.pop('MNE_CACHE_DIR', None)
+                index_fname = fname + '.idx.npz'
+            else:
+                os.environ['MNE_CACHE_DIR'] = this_cache_dir
+                index_fnames = glob.glob(op.join(this_cache_dir, '*.npz'))
+                assert_equal(len(index_fnames), 0)
+            raw_1 = Raw(fname)  # writes the index
+            if this_cache_dir is not None:
+                index_fnames = glob.glob(op.join(this_cache_dir, '*.npz'))
+                assert_equal(len(index_fnames), 1)
+                index_fname = index_fnames[0]
+            assert_true(op.isfile(index_fname))
+            raw_2 = Raw(fname)  # uses the index
+            for r in (raw_1, raw_2):
+                assert_equal(r.first_samp, raw.first_samp)
+                assert_equal(r.last_samp, raw.last_samp)
+                assert_equal(r.orig_format, raw.orig_format)
+                assert_equal(len(r.rawdirs[0]), len(raw.rawdirs[0]))
+                assert_equal([d['ent'].pos for d in r.rawdirs[0]],
+                             [d['ent'].pos for d in raw.rawdirs[0]])
+                assert_array_equal(r[:, :][0], raw[:, :][0])
+            # the index is rebuilt when the file changes
+            with open(index_fname, 'rb') as fid:
+                orig_index = fid.read()
+            mtime = os.stat(fname).st_mtime + 10
+            os.utime(fname, (mtime, mtime))
+            raw_2 = Raw(fname)
+            with open(index_fname, 'rb') as fid:
+                assert_true(fid.read() != orig_index)
+            assert_array_equal(raw_2[:, :][0], raw[:, :][0])
+    finally:
+        for key, value in old_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
 @testing.requires_testing_data
 def test_proj():
     """Test SSP proj operations
@@ -718,6 +861,92 @@ def test_filter():
     assert_array_almost_equal(data, data_notch, sig_dec_notch_fit)
 
 
+def test_filter_chunked():
+    """Test filtering data that are not preloaded in chunks
+    """
+    tempdir = _TempDir()
+    data = np.random.RandomState(0).randn(3, 20000) * 1e-5
+    data[2] = np.repeat(np.arange(20), 1000)
+    raw = _make_test_raw(tempdir, ['eeg', 'eeg', 'stim'], 1000., data,
+                         add_eeg_ref=False)
+    fname = raw.info['filename']
+    out = op.join(tempdir, 'filtered.dat')
+
+    assert_raises(RuntimeError, raw.filter, 1., 40.)
+    assert_raises(ValueError, raw.filter, 1., 40., out=out, method='iir')
+    assert_raises(RuntimeError, raw.notch_filter, 50.)
+    assert_raises(ValueError, raw.notch_filter, 50., out=out,
+                  method='spectrum_fit')
+    assert_raises(RuntimeError, raw.apply_hilbert, [0])
+    assert_true(not raw.preload)
+
+    with warnings.catch_warnings(record=True):  # attenuation
+        for l_freq, h_freq, filter_length in ((1., 40., 2048),
+                                              (None, 40., 1024),
+                                              (1., None, '1s'),
+                                              (45., 40., 2048),
+                                              (1., 40., '100s')):
+            raw = Raw(fname, preload=True, add_eeg_ref=False)
+            raw.filter(l_freq, h_freq, filter_length=filter_length)
+            raw_chunked = Raw(fname, add_eeg_ref=False)
+            raw_chunked.filter(l_freq, h_freq, filter_length=filter_length,
+                               out=out, chunk_duration=3.)
+            assert_true(raw_chunked.preload)
+            assert_true(isinstance(raw_chunked._data, np.memmap))
+            assert_allclose(raw_chunked._data, raw._data, rtol=0,
+                            atol=1e-6 * np.abs(raw._data).max())
+            assert_array_equal(raw_chunked._data[2], data[2])
+            assert_array_equal(raw_chunked._times, raw._times)
+            assert_equal(raw_chunked.info['lowpass'], raw.info['lowpass'])
+            assert_equal(raw_chunked.info['highpass'], raw.info['highpass'])
+            del raw_chunked
+            assert_true(not op.isfile(out))
+
+    raw = Raw(fname, preload=True, add_eeg_ref=False)
+    raw.notch_filter([50., 100.], filter_length=2048)
+    raw_chunked = Raw(fname, add_eeg_ref=False)
+    raw_chunked.notch_filter([50., 100.], filter_length=2048, out=out,
+                             chunk_duration=2.5)
+    assert_allclose(raw_chunked._data, raw._data, rtol=0,
+                    atol=1e-6 * np.abs(raw._data).max())
+    del raw_chunked
+
+    # the Hilbert transform is only approximated away from the chunk edges
+    for envelope in (False, True):
+        raw = Raw(fname, preload=True, add_eeg_ref=False)
+        raw.apply_hilbert([0, 1], envelope=envelope)
+        raw_chunked = Raw(fname, add_eeg_ref=False)
+        raw_chunked.apply_hilbert([0, 1], envelope=envelope, out=out,
+                                  chunk_duration=5.)
+        assert_equal(raw_chunked._data.dtype, raw._data.dtype)
+        err = np.abs(raw_chunked._data - raw._data)[:2, 100:-100]
+        assert_true(err.mean() < 1e-2 * np.abs(raw._data[:2]).mean())
+        del raw_chunked
+
+
+def test_filter_bank():
+    """Test filtering raw data with a bank of filters
+    """
+    tempdir = _TempDir()
+    raw = _make_test_raw(tempdir, ['eeg', 'eeg', 'stim'], 1000.,
+                         n_times=5000, add_eeg_ref=False)
+    fname = raw.info['filename']
+    bands = [(4., 8.), (8., 12.)]
+
+    bank = raw.filter_bank(bands, start=1000, stop=4000)
+    assert_true(not raw.preload)
+    assert_equal(bank.shape, (2, 2, 3000))
+    data = raw[:2, 1000:4000][0]
+    for band, bank_data in zip(bands, bank):
+        assert_array_almost_equal(bank_data,
+                                  band_pass_filter(data, 1000., *band), 12)
+    raw = Raw(fname, preload=True, add_eeg_ref=False)
+    data = raw._data.copy()
+    env = raw.filter_bank(bands, picks=[1], envelope=True)
+    assert_equal(env.shape, (2, 1, 5000))
+    assert_array_equal(raw._data, data)
+
+
 @testing.requires_testing_data
 def test_crop():
     """Test cropping raw files
@@ -816,6 +1045,44 @@ def test_resample():
     assert_equal(raw1.info['sfreq'], raw3.info['sfreq'])
 
 
+def test_resample_chunked():
+    """Test polyphase resampling of data that are not preloaded
+    """
+    tempdir = _TempDir()
+    data = np.random.RandomState(0).randn(3, 20000) * 1e-5
+    data[2] = 0.
+    data[2, 1234:1300] = 5.
+    data[2, 15000:15050] = 3.
+    fnames = [_make_test_raw(tempdir, ['eeg', 'eeg', 'stim'], 5000., data,
+                             fname='test%d_raw.fif' % ii).info['filename']
+              for ii in range(2)]
+
+    raw = concatenate_raws([Raw(fname, preload=True, add_eeg_ref=False)
+                            for fname in fnames])
+    raw_fft = raw.copy()
+    raw.resample(500., method='polyphase')
+    raw_fft.resample(500.)
+    assert_array_equal(raw._raw_lengths, raw_fft._raw_lengths)
+    assert_equal(raw.last_samp, raw_fft.last_samp)
+    assert_array_equal(find_events(raw), find_events(raw_fft))
+
+    for out in (None, op.join(tempdir, 'resampled.dat')):
+        raw_chunked = concatenate_raws([Raw(fname, add_eeg_ref=False)
+                                        for fname in fnames])
+        assert_raises(RuntimeError, raw_chunked.resample, 500.)
+        raw_chunked.resample(500., method='polyphase', out=out,
+                             chunk_duration=0.7)
+        assert_true(raw_chunked.preload)
+        assert_equal(isinstance(raw_chunked._data, np.memmap),
+                     out is not None)
+        assert_array_equal(raw_chunked._data, raw._data)
+        assert_array_equal(raw_chunked._raw_lengths, raw._raw_lengths)
+        assert_array_equal(raw_chunked._first_samps, raw._first_samps)
+        assert_equal(raw_chunked.info['sfreq'], 500.)
+        assert_array_equal(find_events(raw_chunked), find_events(raw))
+        del raw_chunked
+
+
 @testing.requires_testing_data
 def test_hilbert():
     """Test computation of analytic signal using hilbert
@@ -7,6 +7,7 @@ from ..externals.six import string_types
 import numpy as np
 import os.path as op
 from io import BytesIO
+import threading
 
 from .tag import read_tag_info, read_tag, read_big, Tag
 from .tree import make_dir_tree
@@ -31,6 +32,62 @@ def _fiff_get_fid(fname):
     return fid
 
 
+class _FidPool(object):
+    """Bounded pool of open file handles for repeated data reads
+
+    Handles are lent out exclusively (so that two threads never seek the
+    same handle) and are kept open once returned, so that repeated reads
+    from the same files do not reopen them every time. At most ``max_fids``
+    idle handles are kept, the least recently used ones being closed first.
+    The pool is never copied or pickled, copies start empty.
+
+    Parameters
+    ----------
+    max_fids : int
+        Maximum number of idle handles to keep open.
+    """
+    def __init__(self, max_fids=8):
+        self.max_fids = max_fids
+        self._lock = threading.Lock()
+        self._idle = list()  # (fname, fid), most recently used last
+
+    def get(self, fname):
+        """Get an open handle for fname (must be released after use)"""
+        with self._lock:
+            for ii in range(len(self._idle) - 1, -1, -1):
+                if self._idle[ii][0] == fname:
+                    return self._idle.pop(ii)[1]
+        return _fiff_get_fid(fname)
+
+    def release(self, fname, fid):
+        """Return a handle obtained with get to the pool"""
+        with self._lock:
+            self._idle.append((fname, fid))
+            closing = self._idle[:max(len(self._idle) - self.max_fids, 0)]
+            self._idle = self._idle[len(closing):]
+        for _, this_fid in closing:
+            this_fid.close()
+
+    def close(self):
+        """Close all idle handles"""
+        with self._lock:
+            closing, self._idle = self._idle, list()
+        for _, fid in closing:
+            fid.close()
+
+    def __len__(self):
+        return len(self._idle)
+
+    def __deepcopy__(self, memo):
+        return _FidPool(self.max_fids)
+
+    def __getstate__(self):
+        return dict(max_fids=self.max_fids)
+
+    def __setstate__(self, state):
+        self.__init__(state['max_fids'])
+
+
 @verbose
 def fiff_open(fname, preload=False, verbose=None):
     """Open a FIF file.
@@ -56,6 +113,15 @@ def fiff_open(fname, preload=False, verbose=None):
     directory : list
         A list of tags.
     """
+    return _fiff_open(fname, preload)
+
+
+def _fiff_open(fname, preload=False, directory=None):
+    """Open a FIF file, optionally using a known tag directory
+
+    If ``directory`` is given (e.g., from a cached index), the checks of the
+    file header and the scan of the tag headers are skipped.
+    """
     fid = _fiff_get_fid(fname)
     # do preloading of entire file
     if preload:
@@ -65,6 +131,21 @@ def fiff_open(fname, preload=False, verbose=None):
         fid = BytesIO(read_big(fid_old))
         fid_old.close()
 
+    if directory is None:
+        directory = _read_directory(fid, fname)
+
+    tree, _ = make_dir_tree(fid, directory)
+
+    logger.debug('[done]')
+
+    #   Back to the beginning
+    fid.seek(0)
+
+    return fid, tree, directory
+
+
+def _read_directory(fid, fname):
+    """Read the tag directory of an open FIF file"""
     tag = read_tag_info(fid)
 
     #   Check that this looks like a fif file
@@ -100,15 +181,7 @@ def fiff_open(fname, preload=False, verbose=None):
             else:
                 tag.pos = pos
                 directory.append(tag)
-
-    tree, _ = make_dir_tree(fid, directory)
-
-    logger.debug('[done]')
-
-    #   Back to the beginning
-    fid.seek(0)
-
-    return fid, tree, directory
+    return directory
 
 
 def show_fiff(fname, indent='    ', read_limit=np.inf, max_str=30,
@@ -32,6 +32,7 @@ from ..source_space import (_read_source_spaces_from_tree,
 from ..transforms import invert_transform, transform_surface_to
 from ..source_estimate import _make_stc
 from ..utils import check_fname, logger, verbose
+from ..cache import _memoize_mne
 from functools import reduce
 
 
@@ -1146,6 +1147,7 @@ def _prepare_forward(forward, info, noise_cov, pca=False, rank=None,
 
 
 @verbose
+@_memoize_mne
 def make_inverse_operator(info, forward, noise_cov, loose=0.2, depth=0.8,
                           fixed=False, limit_depth_chs=True, rank=None,
                           verbose=None):
@@ -19,6 +19,7 @@ from .inverse import (combine_xyz, prepare_inverse_operator, _assemble_kernel,
                       _pick_channels_inverse_operator, _check_method,
                       _check_ori, _subject_from_inverse)
 from ..parallel import parallel_func
+from ..fft import fft
 from ..utils import logger, verbose
 from ..externals import six
 
@@ -457,7 +458,7 @@ def compute_source_psd(raw, inverse_operator, lambda2=1. / 9., method="dSPM",
 
         data *= window[None, :]
 
-        data_fft = fftpack.fft(data)[:, freqs_mask]
+        data_fft = fft(data)[:, freqs_mask]
         sol = np.dot(K, data_fft)
 
         if is_free_ori and pick_ori is None:
@@ -9,9 +9,10 @@ from .externals.six import string_types
 import inspect
 import logging
 import os
+import threading
 
 from . import get_config
-from .utils import logger, verbose
+from .utils import logger, verbose, sizeof_fmt, _size_to_bytes
 
 if 'MNE_FORCE_SERIAL' in os.environ:
     _force_serial = True
@@ -19,12 +20,70 @@ else:
     _force_serial = None
 
 
+# The persistent joblib.Parallel instance set up by pool, if any
+_pool = None
+
+
+def _get_joblib():
+    """Import joblib.Parallel and joblib.delayed, None if not installed"""
+    try:
+        from joblib import Parallel, delayed
+    except ImportError:
+        try:
+            from sklearn.externals.joblib import Parallel, delayed
+        except ImportError:
+            return None, None
+    return Parallel, delayed
+
+
+def _parallel_kwargs(Parallel, max_nbytes, persistent=False):
+    """Get the keyword arguments of joblib.Parallel
+
+    A persistent pool memmaps large arrays even if "MNE_CACHE_DIR" is not
+    set, in which case joblib uses /dev/shm (if available) or the
+    temporary directory.
+    """
+    # check if joblib is recent enough to support memmaping
+    aspec = inspect.getargspec(Parallel.__init__)
+    joblib_mmap = ('temp_folder' in aspec.args and 'max_nbytes' in aspec.args)
+
+    cache_dir = get_config('MNE_CACHE_DIR', None)
+    if isinstance(max_nbytes, string_types) and max_nbytes == 'auto':
+        max_nbytes = get_config('MNE_MEMMAP_MIN_SIZE', None)
+        if max_nbytes is None and persistent:
+            max_nbytes = '1M'
+
+    if max_nbytes is not None and not persistent:
+        if not joblib_mmap and cache_dir is not None:
+            logger.warning('"MNE_CACHE_DIR" is set but a newer version of '
+                           'joblib is needed to use the memmapping pool.')
+        if joblib_mmap and cache_dir is None:
+            logger.info('joblib supports memapping pool but "MNE_CACHE_DIR" '
+                        'is not set in MNE-Python config. To enable it, use, '
+                        'e.g., mne.set_cache_dir(\'/tmp/shm\'). This will '
+                        'store temporary files under /dev/shm and can result '
+                        'in large memory savings.')
+
+    # create keyword arguments for Parallel
+    kwargs = {'verbose': 5 if logger.level <= logging.INFO else 0}
+
+    if joblib_mmap:
+        if cache_dir is None and not persistent:
+            max_nbytes = None  # disable memmaping
+        kwargs['temp_folder'] = cache_dir
+        kwargs['max_nbytes'] = max_nbytes
+    return kwargs
+
+
 @verbose
 def parallel_func(func, n_jobs, verbose=None, max_nbytes='auto'):
     """Return parallel instance with delayed function
 
     Util function to use joblib only if available
 
+    If a pool is active (see mne.parallel.pool), its workers are used for
+    all n_jobs != 1, and max_nbytes is ignored.
+
     Parameters
     ----------
     func: callable
@@ -57,73 +116,273 @@ def parallel_func(func, n_jobs, verbose=None, max_nbytes='auto'):
         parallel = list
         return parallel, my_func, n_jobs
 
+    Parallel, delayed = _get_joblib()
+    if Parallel is None:
+        logger.warning('joblib not installed. Cannot run in parallel.')
+        n_jobs = 1
+        my_func = func
+        parallel = list
+        return parallel, my_func, n_jobs
+
+    if _pool is not None:
+        parallel = _pool
+        n_jobs = _pool.n_jobs
+    else:
+        kwargs = _parallel_kwargs(Parallel, max_nbytes)
+        n_jobs = check_n_jobs(n_jobs)
+        parallel = Parallel(n_jobs, **kwargs)
+    if n_jobs > 1:
+        n_threads = max(_get_num_threads() // n_jobs, 1)
+        logger.info('Running %d jobs with %d BLAS thread%s each'
+                    % (n_jobs, n_threads, 's' if n_threads > 1 else ''))
+        func = _ThreadLimited(func, n_threads)
+    my_func = delayed(func)
+    return parallel, my_func, n_jobs
+
+
+# The limit set on the BLAS threads of this (worker) process, if any
+_blas_limit = None
+
+
+def _limit_threads(n_threads):
+    """Limit the number of threads of BLAS and OpenMP in this process
+
+    Uses threadpoolctl, or the mkl module, if available. Otherwise only
+    the environment variables are set, which are read by the libraries
+    loaded afterward.
+    """
+    global _blas_limit
+    if n_threads == _blas_limit:
+        return
+    for key in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+        os.environ[key] = str(n_threads)
     try:
-        from joblib import Parallel, delayed
+        from threadpoolctl import threadpool_limits
     except ImportError:
         try:
-            from sklearn.externals.joblib import Parallel, delayed
+            import mkl
         except ImportError:
-            logger.warning('joblib not installed. Cannot run in parallel.')
-            n_jobs = 1
-            my_func = func
-            parallel = list
-            return parallel, my_func, n_jobs
+            pass
+        else:
+            mkl.set_num_threads(n_threads)
+    else:
+        threadpool_limits(n_threads)
+    _blas_limit = n_threads
 
-    # check if joblib is recent enough to support memmaping
-    aspec = inspect.getargspec(Parallel.__init__)
-    joblib_mmap = ('temp_folder' in aspec.args and 'max_nbytes' in aspec.args)
 
-    cache_dir = get_config('MNE_CACHE_DIR', None)
-    if isinstance(max_nbytes, string_types) and max_nbytes == 'auto':
-        max_nbytes = get_config('MNE_MEMMAP_MIN_SIZE', None)
+class _ThreadLimited(object):
+    """Call func after limiting the BLAS threads of the worker process"""
+    def __init__(self, func, n_threads):
+        self.func = func
+        self.n_threads = n_threads
 
-    if max_nbytes is not None:
-        if not joblib_mmap and cache_dir is not None:
-            logger.warning('"MNE_CACHE_DIR" is set but a newer version of '
-                           'joblib is needed to use the memmapping pool.')
-        if joblib_mmap and cache_dir is None:
-            logger.info('joblib supports memapping pool but "MNE_CACHE_DIR" '
-                        'is not set in MNE-Python config. To enable it, use, '
-                        'e.g., mne.set_cache_dir(\'/tmp/shm\'). This will '
-                        'store temporary files under /dev/shm and can result '
-                        'in large memory savings.')
+    def __call__(self, *args, **kwargs):
+        _limit_threads(self.n_threads)
+        return self.func(*args, **kwargs)
 
-    # create keyword arguments for Parallel
-    kwargs = {'verbose': 5 if logger.level <= logging.INFO else 0}
 
-    if joblib_mmap:
-        if cache_dir is None:
-            max_nbytes = None  # disable memmaping
-        kwargs['temp_folder'] = cache_dir
-        kwargs['max_nbytes'] = max_nbytes
+def _cpu_count():
+    """Get the number of CPUs, 1 if unknown"""
+    try:
+        import multiprocessing
+        return multiprocessing.cpu_count()
+    except (ImportError, NotImplementedError):
+        return 1
 
-    n_jobs = check_n_jobs(n_jobs)
-    parallel = Parallel(n_jobs, **kwargs)
-    my_func = delayed(func)
-    return parallel, my_func, n_jobs
 
+def _get_num_threads():
+    """Get the number of threads MNE may use (see mne.set_num_threads)"""
+    n_threads = get_config('MNE_NUM_THREADS', None)
+    if n_threads is None:
+        return _cpu_count()
+    return int(n_threads)
 
-def check_n_jobs(n_jobs, allow_cuda=False):
-    """Check n_jobs in particular for negative values
+
+class pool(object):
+    """Keep a pool of worker processes for parallel_func
+
+    Within the with block, the functions of MNE that run in parallel with
+    n_jobs != 1 use the same worker processes instead of starting new ones
+    at each call, which is faster when many short computations are run in
+    parallel. Large arrays passed to the workers are memmapped (in /dev/shm
+    if available, or in the directory set with mne.set_cache_dir) and
+    only passed to the workers by file name. Arrays already memmapped, such
+    as Raw data preloaded with a file name, are passed without a copy.
 
     Parameters
     ----------
     n_jobs : int
-        The number of jobs.
+        Number of worker processes.
+    max_nbytes : int, str, or None
+        Threshold on the minimum size of arrays passed to the workers that
+        triggers automated memory mapping, e.g., '1M' for 1 megabyte.
+        Use None to disable memmaping of large arrays. Use 'auto' to use
+        the value set using mne.set_memmap_min_size, or '1M' if it is not
+        set.
+
+    Examples
+    --------
+    >>> with mne.parallel.pool(4):  # doctest: +SKIP
+    ...     for raw in raws:
+    ...         raw.filter(1., 40., n_jobs=4)
+    """
+    def __init__(self, n_jobs, max_nbytes='auto'):
+        self.n_jobs = check_n_jobs(n_jobs)
+        self.max_nbytes = max_nbytes
+        self._parallel = None
+
+    def __enter__(self):
+        global _pool
+        if _pool is not None:
+            raise RuntimeError('A pool is already active, pools cannot be '
+                               'nested')
+        Parallel, _ = _get_joblib()
+        if self.n_jobs == 1 or Parallel is None:
+            if Parallel is None:
+                logger.warning('joblib not installed. Cannot run in '
+                               'parallel.')
+            return self
+        if not hasattr(Parallel, '__enter__'):
+            logger.warning('A newer version of joblib is needed to keep a '
+                           'pool of workers.')
+            return self
+        kwargs = _parallel_kwargs(Parallel, self.max_nbytes, persistent=True)
+        self._parallel = Parallel(self.n_jobs, **kwargs)
+        self._parallel.__enter__()
+        _pool = self._parallel
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global _pool
+        if self._parallel is not None:
+            _pool = None
+            parallel, self._parallel = self._parallel, None
+            parallel.__exit__(exc_type, exc_value, traceback)
+
+
+def _thread_map(func, args_list, n_jobs):
+    """Call func(*args) for each args of args_list using n_jobs threads
+
+    Threads share the memory of the calling process, so this is used for
+    functions that spend most of their time in numpy or scipy routines
+    working on (parts of) the same arrays.
+    """
+    args_list = list(args_list)
+    n_jobs = min(n_jobs, len(args_list))
+    if n_jobs <= 1:
+        return [func(*args) for args in args_list]
+    from multiprocessing.pool import ThreadPool
+    # each thread gets its share of the threads of the FFTs
+    budget = _blas_limit if _blas_limit is not None else _get_num_threads()
+    n_threads = max(budget // n_jobs, 1)
+    pool = ThreadPool(n_jobs)
+    try:
+        return pool.map(_call_star,
+                        [(func, args, n_threads) for args in args_list])
+    finally:
+        pool.close()
+        pool.join()
+
+
+# The thread limit of the threads started by _thread_map
+_thread_local = threading.local()
+
+
+def _call_star(func_args):
+    """Helper to call func(*args) from a pool with a thread limit"""
+    func, args, n_threads = func_args
+    _thread_local.n_threads = n_threads
+    try:
+        return func(*args)
+    finally:
+        _thread_local.n_threads = None
+
+
+def _get_thread_limit():
+    """Get the number of threads the current thread may use, None if unset
+
+    This is the share of a thread started by _thread_map, or else of a
+    parallel job.
+    """
+    n_threads = getattr(_thread_local, 'n_threads', None)
+    return _blas_limit if n_threads is None else n_threads
+
+
+def _get_memory_limit():
+    """Get the memory MNE may use in bytes (see mne.set_memory_limit)
+
+    If it is not set, this is the available memory if psutil is installed,
+    None otherwise.
+    """
+    memory_limit = get_config('MNE_MEMORY_LIMIT', None)
+    if memory_limit is not None:
+        return _size_to_bytes(memory_limit)
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.virtual_memory().available
+
+
+def _auto_chunk_size(item_bytes, n_jobs, fixed_bytes=0, default=None):
+    """Get how many items each of n_jobs jobs can process at once
+
+    Each item takes item_bytes, and each job also needs fixed_bytes
+    whatever the number of items. Returns default if the memory limit is
+    not known.
+    """
+    memory_limit = _get_memory_limit()
+    if memory_limit is None:
+        return default
+    n_items = (memory_limit // n_jobs - fixed_bytes) // max(int(item_bytes), 1)
+    return max(int(n_items), 1)
+
+
+def _auto_n_jobs(job_bytes):
+    """Get the number of jobs that fit in the threads and memory limits"""
+    n_jobs = _get_num_threads()
+    memory_limit = _get_memory_limit()
+    if job_bytes is not None and memory_limit is not None:
+        n_jobs = max(min(n_jobs, int(memory_limit // max(job_bytes, 1))), 1)
+        logger.info('Using %d job%s of %s each (n_jobs="auto")'
+                    % (n_jobs, 's' if n_jobs > 1 else '',
+                       sizeof_fmt(job_bytes)))
+    else:
+        logger.info('Using %d job%s (n_jobs="auto")'
+                    % (n_jobs, 's' if n_jobs > 1 else ''))
+    return n_jobs
+
+
+def check_n_jobs(n_jobs, allow_cuda=False, job_bytes=None):
+    """Check n_jobs in particular for negative values
+
+    Parameters
+    ----------
+    n_jobs : int | str
+        The number of jobs. Can be 'auto' to use as many jobs as fit in the
+        number of threads (see mne.set_num_threads) and in the memory
+        limit (see mne.set_memory_limit).
     allow_cuda : bool
         Allow n_jobs to be 'cuda'. Default: False.
+    job_bytes : int | None
+        The memory needed by each job in bytes, used if n_jobs is 'auto'.
+        If None, only the number of threads is used.
 
     Returns
     -------
     n_jobs : int
         The checked number of jobs. Always positive (or 'cuda' if
-        applicable.)
+        applicable.) If a number of threads is set with
+        mne.set_num_threads, at most that number. Negative values count
+        back from that number (or the number of CPUs).
     """
+    if isinstance(n_jobs, string_types) and n_jobs == 'auto':
+        n_jobs = _auto_n_jobs(job_bytes)
     if not isinstance(n_jobs, int):
         if not allow_cuda:
-            raise ValueError('n_jobs must be an integer')
+            raise ValueError('n_jobs must be an integer, or "auto"')
         elif not isinstance(n_jobs, string_types) or n_jobs != 'cuda':
-            raise ValueError('n_jobs must be an integer, or "cuda"')
+            raise ValueError('n_jobs must be an integer, "auto" or "cuda"')
         # else, we have n_jobs='cuda' and this is okay, so do nothing
     elif _force_serial:
         n_jobs = 1
@@ -133,6 +392,8 @@ def check_n_jobs(n_jobs, allow_cuda=False):
         try:
             import multiprocessing
             n_cores = multiprocessing.cpu_count()
+            if get_config('MNE_NUM_THREADS', None) is not None:
+                n_cores = _get_num_threads()
             n_jobs = min(n_cores + n_jobs + 1, n_cores)
             if n_jobs <= 0:
                 raise ValueError('If n_jobs has a negative value it must not '
@@ -144,5 +405,12 @@ def check_n_jobs(n_jobs, allow_cuda=False):
                 logger.warning('multiprocessing not installed. Cannot run in '
                                'parallel.')
                 n_jobs = 1
+    elif n_jobs > 1 and get_config('MNE_NUM_THREADS', None) is not None:
+        n_threads = _get_num_threads()
+        if n_jobs > n_threads:
+            logger.info('... n_jobs=%d is more than the %d threads set with '
+                        'mne.set_num_threads, using %d jobs.'
+                        % (n_jobs, n_threads, n_threads))
+            n_jobs = n_threads
 
     return n_jobs
@@ -290,11 +290,17 @@ def _make_ecg(inst, start, stop, verbose=None):
                          'grad': 'Gradiometers'}[ch]))
     picks = pick_types(inst.info, meg=ch, eeg=False, ref_meg=False)
     if isinstance(inst, _BaseRaw):
-        ecg, times = inst[picks, start:stop]
+        # average chunk by chunk so that only the mean is kept in memory
+        start = 0 if start is None else start
+        stop = inst.n_times if stop is None else min(stop, inst.n_times)
+        ecg = np.empty(stop - start)
+        for chunk_start, data in inst._iter_chunks(picks, start, stop):
+            ecg[chunk_start:chunk_start + data.shape[1]] = data.mean(0)
+        times = np.arange(start, stop) / inst.info['sfreq']
     elif isinstance(inst, _BaseEpochs):
-        ecg = np.hstack(inst.crop(start, stop, copy=True).get_data())
+        ecg = np.hstack(inst.crop(start, stop, copy=True).get_data()).mean(0)
         times = inst.times
     elif isinstance(inst, Evoked):
-        ecg = inst.data
+        ecg = inst.data.mean(0)
         times = inst.times
-    return ecg.mean(0), times
+    return ecg, times
@@ -23,8 +23,8 @@ from .surface import (read_surface, _get_ico_surface, read_morph_map,
 from .utils import (get_subjects_dir, _check_subject,
                     _check_pandas_index_arguments, _check_pandas_installed,
                     logger, verbose)
-from .viz import plot_source_estimates
 from .fixes import in1d, sparse_block_diag
+from .cache import _memoize_mne
 from .externals.six.moves import zip
 
 
@@ -1411,6 +1411,7 @@ class SourceEstimate(_BaseSourceEstimate):
         brain : Brain
             A instance of surfer.viz.Brain from PySurfer.
         """
+        from .viz import plot_source_estimates
         brain = plot_source_estimates(self, subject, surface=surface,
                                       hemi=hemi, colormap=colormap,
                                       time_label=time_label,
@@ -1853,6 +1854,7 @@ class MixedSourceEstimate(_BaseSourceEstimate):
         stc = SourceEstimate(data, vertices, self.tmin, self.tstep,
                              self.subject, self.verbose)
 
+        from .viz import plot_source_estimates
         return plot_source_estimates(stc, subject, surface=surface, hemi=hemi,
                                      colormap=colormap, time_label=time_label,
                                      smoothing_steps=smoothing_steps,
@@ -2230,6 +2232,16 @@ def compute_morph_matrix(subject_from, subject_to, vertices_from, vertices_to,
     """
     logger.info('Computing morph matrix...')
     subjects_dir = get_subjects_dir(subjects_dir)
+    morpher = _compute_morph_matrix(subject_from, subject_to, vertices_from,
+                                    vertices_to, smooth, subjects_dir)
+    logger.info('[done]')
+    return morpher
+
+
+@_memoize_mne
+def _compute_morph_matrix(subject_from, subject_to, vertices_from,
+                          vertices_to, smooth, subjects_dir):
+    """Helper to compute the morph matrix (see compute_morph_matrix)"""
     tris = _get_subject_sphere_tris(subject_from, subjects_dir)
     maps = read_morph_map(subject_from, subject_to, subjects_dir)
 
@@ -2253,7 +2265,6 @@ def compute_morph_matrix(subject_from, subject_to, vertices_from, vertices_to,
         morpher = morpher[0]
     else:
         morpher = sparse_block_diag(morpher, format='csr')
-    logger.info('[done]')
     return morpher
 
 
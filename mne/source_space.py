@@ -30,6 +30,7 @@ from .utils import (get_subjects_dir, run_subprocess, has_freesurfer,
                     check_scipy_version)
 from .fixes import in1d, partial, gzip_open
 from .parallel import parallel_func, check_n_jobs
+from .cache import _memoize_mne
 from .transforms import (invert_transform, apply_trans, _print_coord_trans,
                          combine_transforms, _get_mri_head_t_from_trans_file,
                          read_trans, _coord_frame_name)
@@ -2157,34 +2158,15 @@ def add_source_space_distances(src, dist_limit=np.inf, n_jobs=1, verbose=None):
             raise RuntimeError('Cannot use "limit < np.inf" unless scipy '
                                '> 0.13 is installed')
 
-    parallel, p_fun, _ = parallel_func(_do_src_distances, n_jobs)
     min_dists = list()
     min_idxs = list()
     logger.info('Calculating source space distances (limit=%s mm)...'
                 % (1000 * dist_limit))
     for s in src:
-        connectivity = mesh_dist(s['tris'], s['rr'])
-        d = parallel(p_fun(connectivity, s['vertno'], r, dist_limit)
-                     for r in np.array_split(np.arange(len(s['vertno'])),
-                                             n_jobs))
-        # deal with indexing so we can add patch info
-        min_idx = np.array([dd[1] for dd in d])
-        min_dist = np.array([dd[2] for dd in d])
-        midx = np.argmin(min_dist, axis=0)
-        range_idx = np.arange(len(s['rr']))
-        min_dist = min_dist[midx, range_idx]
-        min_idx = min_idx[midx, range_idx]
+        d, min_dist, min_idx = _src_distances(s['tris'], s['rr'], s['vertno'],
+                                              dist_limit, n_jobs)
         min_dists.append(min_dist)
         min_idxs.append(min_idx)
-        # now actually deal with distances, convert to sparse representation
-        d = np.concatenate([dd[0] for dd in d], axis=0)
-        i, j = np.meshgrid(s['vertno'], s['vertno'])
-        d = d.ravel()
-        i = i.ravel()
-        j = j.ravel()
-        idx = d > 0
-        d = sparse.csr_matrix((d[idx], (i[idx], j[idx])),
-                              shape=(s['np'], s['np']), dtype=np.float32)
         s['dist'] = d
         s['dist_limit'] = np.array([dist_limit], np.float32)
 
@@ -2200,6 +2182,32 @@ def add_source_space_distances(src, dist_limit=np.inf, n_jobs=1, verbose=None):
     return src
 
 
+@_memoize_mne
+def _src_distances(tris, rr, vertno, dist_limit, n_jobs):
+    """Compute the distances of a source space and the nearest vertices"""
+    parallel, p_fun, _ = parallel_func(_do_src_distances, n_jobs)
+    connectivity = mesh_dist(tris, rr)
+    d = parallel(p_fun(connectivity, vertno, r, dist_limit)
+                 for r in np.array_split(np.arange(len(vertno)), n_jobs))
+    # deal with indexing so we can add patch info
+    min_idx = np.array([dd[1] for dd in d])
+    min_dist = np.array([dd[2] for dd in d])
+    midx = np.argmin(min_dist, axis=0)
+    range_idx = np.arange(len(rr))
+    min_dist = min_dist[midx, range_idx]
+    min_idx = min_idx[midx, range_idx]
+    # now actually deal with distances, convert to sparse representation
+    d = np.concatenate([dd[0] for dd in d], axis=0)
+    i, j = np.meshgrid(vertno, vertno)
+    d = d.ravel()
+    i = i.ravel()
+    j = j.ravel()
+    idx = d > 0
+    d = sparse.csr_matrix((d[idx], (i[idx], j[idx])),
+                          shape=(len(rr), len(rr)), dtype=np.float32)
+    return d, min_dist, min_idx
+
+
 def _do_src_distances(con, vertno, run_inds, limit):
     """Helper to compute source space distances in chunks"""
     if limit < np.inf:
@@ -15,10 +15,11 @@ import warnings
 import logging
 
 from .parametric import f_oneway
-from ..parallel import parallel_func, check_n_jobs
+from ..parallel import parallel_func, check_n_jobs, _auto_chunk_size
 from ..utils import split_list, logger, verbose, ProgressBar
 from ..fixes import in1d, unravel_index
 from ..source_estimate import SourceEstimate
+from ..externals.six import string_types
 
 
 def _get_clusters_spatial(s, neighbors):
@@ -673,7 +674,6 @@ def _permutation_cluster_test(X, threshold, n_permutations, tail, stat_fun,
                               connectivity, verbose, n_jobs, seed, max_step,
                               exclude, step_down_p, t_power, out_type,
                               check_disjoint, buffer_size):
-    n_jobs = check_n_jobs(n_jobs)
     """ Aux Function
 
     Note. X is required to be a list. Depending on the length of X
@@ -697,6 +697,20 @@ def _permutation_cluster_test(X, threshold, n_permutations, tail, stat_fun,
     X = [np.reshape(x, (x.shape[0], -1)) for x in X]
     n_tests = X[0].shape[1]
 
+    # each job gets its own copy of the data (unless it is memmapped) and
+    # shuffles either all of it or buffer_size variables at a time
+    X_bytes = sum(x.nbytes for x in X)
+    job_bytes = X_bytes if buffer_size is not None else 2 * X_bytes
+    n_jobs = check_n_jobs(n_jobs, job_bytes=job_bytes)
+    if isinstance(buffer_size, string_types):
+        if buffer_size != 'auto':
+            raise ValueError('buffer_size must be an int, None or "auto", '
+                             'got %s' % buffer_size)
+        # a shuffled variable and its statistic
+        var_bytes = 2 * X_bytes // n_tests
+        buffer_size = _auto_chunk_size(var_bytes, n_jobs, X_bytes, 1000)
+        logger.info('Using buffer_size=%d' % buffer_size)
+
     if connectivity is not None:
         connectivity = _setup_connectivity(connectivity, n_tests, n_times)
 
@@ -938,8 +952,11 @@ def permutation_cluster_test(X, threshold=None, n_permutations=1024,
         Default is None, i.e, a regular lattice connectivity.
     verbose : bool, str, int, or None
         If not None, override default verbose level (see mne.verbose).
-    n_jobs : int
+    n_jobs : int | str
         Number of permutations to run in parallel (requires joblib package).
+        Can be 'auto' to use as many jobs as fit in the number of threads
+        and the memory limit (see mne.set_num_threads and
+        mne.set_memory_limit).
     seed : int or None
         Seed the random number generator for results reproducibility.
     max_step : int
@@ -973,13 +990,14 @@ def permutation_cluster_test(X, threshold=None, n_permutations=1024,
         determine of it can be separated into disjoint sets. In some cases
         (usually with connectivity as a list and many "time" points), this
         can lead to faster clustering, but results should be identical.
-    buffer_size: int or None
+    buffer_size: int or None or 'auto'
         The statistics will be computed for blocks of variables of size
         "buffer_size" at a time. This is option significantly reduces the
         memory requirements when n_jobs > 1 and memory sharing between
         processes is enabled (see set_cache_dir()), as X will be shared
         between processes and each process only needs to allocate space
-        for a small block of variables.
+        for a small block of variables. If 'auto', the largest blocks that
+        fit in the memory limit (see mne.set_memory_limit) are used.
 
     Returns
     -------
@@ -1069,8 +1087,11 @@ def permutation_cluster_1samp_test(X, threshold=None, n_permutations=1024,
         extent to save on memory and computation time.
     verbose : bool, str, int, or None
         If not None, override default verbose level (see mne.verbose).
-    n_jobs : int
+    n_jobs : int | str
         Number of permutations to run in parallel (requires joblib package).
+        Can be 'auto' to use as many jobs as fit in the number of threads
+        and the memory limit (see mne.set_num_threads and
+        mne.set_memory_limit).
     seed : int or None
         Seed the random number generator for results reproducibility.
         Note that if n_permutations >= 2^(n_samples) [or (2^(n_samples-1)) for
@@ -1107,13 +1128,14 @@ def permutation_cluster_1samp_test(X, threshold=None, n_permutations=1024,
         determine of it can be separated into disjoint sets. In some cases
         (usually with connectivity as a list and many "time" points), this
         can lead to faster clustering, but results should be identical.
-    buffer_size: int or None
+    buffer_size: int or None or 'auto'
         The statistics will be computed for blocks of variables of size
         "buffer_size" at a time. This is option significantly reduces the
         memory requirements when n_jobs > 1 and memory sharing between
         processes is enabled (see set_cache_dir()), as X will be shared
         between processes and each process only needs to allocate space
-        for a small block of variables.
+        for a small block of variables. If 'auto', the largest blocks that
+        fit in the memory limit (see mne.set_memory_limit) are used.
 
     Returns
     -------
@@ -1201,8 +1223,11 @@ def spatio_temporal_cluster_1samp_test(X, threshold=None,
         extent to save on memory and computation time.
     verbose : bool, str, int, or None
         If not None, override default verbose level (see mne.verbose).
-    n_jobs : int
+    n_jobs : int | str
         Number of permutations to run in parallel (requires joblib package).
+        Can be 'auto' to use as many jobs as fit in the number of threads
+        and the memory limit (see mne.set_num_threads and
+        mne.set_memory_limit).
     seed : int or None
         Seed the random number generator for results reproducibility.
         Note that if n_permutations >= 2^(n_samples) [or (2^(n_samples-1)) for
@@ -1237,13 +1262,14 @@ def spatio_temporal_cluster_1samp_test(X, threshold=None,
         determine of it can be separated into disjoint sets. In some cases
         (usually with connectivity as a list and many "time" points), this
         can lead to faster clustering, but results should be identical.
-    buffer_size: int or None
+    buffer_size: int or None or 'auto'
         The statistics will be computed for blocks of variables of size
         "buffer_size" at a time. This is option significantly reduces the
         memory requirements when n_jobs > 1 and memory sharing between
         processes is enabled (see set_cache_dir()), as X will be shared
         between processes and each process only needs to allocate space
-        for a small block of variables.
+        for a small block of variables. If 'auto', the largest blocks that
+        fit in the memory limit (see mne.set_memory_limit) are used.
 
     Returns
     -------
@@ -1327,8 +1353,11 @@ def spatio_temporal_cluster_test(X, threshold=1.67, n_permutations=1024,
         Default is None, i.e, a regular lattice connectivity.
     verbose : bool, str, int, or None
         If not None, override default verbose level (see mne.verbose).
-    n_jobs : int
+    n_jobs : int | str
         Number of permutations to run in parallel (requires joblib package).
+        Can be 'auto' to use as many jobs as fit in the number of threads
+        and the memory limit (see mne.set_num_threads and
+        mne.set_memory_limit).
     seed : int or None
         Seed the random number generator for results reproducibility.
     max_step : int
@@ -1360,13 +1389,14 @@ def spatio_temporal_cluster_test(X, threshold=1.67, n_permutations=1024,
         determine of it can be separated into disjoint sets. In some cases
         (usually with connectivity as a list and many "time" points), this
         can lead to faster clustering, but results should be identical.
-    buffer_size: int or None
+    buffer_size: int or None or 'auto'
         The statistics will be computed for blocks of variables of size
         "buffer_size" at a time. This is option significantly reduces the
         memory requirements when n_jobs > 1 and memory sharing between
         processes is enabled (see set_cache_dir()), as X will be shared
         between processes and each process only needs to allocate space
-        for a small block of variables.
+        for a small block of variables. If 'auto', the largest blocks that
+        fit in the memory limit (see mne.set_memory_limit) are used.
 
     Returns
     -------
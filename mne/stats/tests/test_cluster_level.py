@@ -1,3 +1,4 @@
+import os
 import numpy as np
 from numpy.testing import (assert_equal, assert_array_equal,
                            assert_array_almost_equal)
@@ -100,6 +101,19 @@ def test_cluster_permutation_test():
                                      n_jobs=2, buffer_size=buffer_size)
         assert_array_equal(cluster_p_values, cluster_p_values_buff)
 
+        # jobs and buffer size that fit in a small memory limit
+        os.environ['MNE_MEMORY_LIMIT'] = '8K'
+        try:
+            T_obs, clusters, cluster_p_values_auto, hist =\
+                permutation_cluster_test([condition1, condition2],
+                                         n_permutations=100, tail=0, seed=1,
+                                         n_jobs='auto', buffer_size='auto')
+        finally:
+            del os.environ['MNE_MEMORY_LIMIT']
+        assert_array_equal(cluster_p_values, cluster_p_values_auto)
+        assert_raises(ValueError, permutation_cluster_test,
+                      [condition1, condition2], buffer_size='foo')
+
 
 @slow_test
 def test_cluster_permutation_t_test():
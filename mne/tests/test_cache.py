@@ -0,0 +1,145 @@
+import os
+import os.path as op
+import warnings
+
+import numpy as np
+from numpy.testing import assert_array_equal
+from nose.tools import assert_equal, assert_true
+from scipy import sparse
+
+from mne import read_cov, read_forward_solution
+from mne.datasets import testing
+from mne.cache import memoize, clear_cache, _get_memoize_dir, _get_key
+from mne.utils import _TempDir, requires_h5py, run_tests_if_main
+
+warnings.simplefilter('always')
+
+cov_fname = op.join(op.dirname(__file__), '..', 'io', 'tests', 'data',
+                    'test-cov.fif')
+fwd_fname = op.join(testing.data_path(download=False), 'MEG', 'sample',
+                    'sample_audvis_trunc-meg-eeg-oct-4-fwd.fif')
+calls = list()
+
+
+def _set_env(key, value):
+    """Helper to set an environment variable, return the old value"""
+    old = os.environ.get(key)
+    if value is None:
+        os.environ.pop(key, None)
+    else:
+        os.environ[key] = value
+    return old
+
+
+@memoize(ignore=('verbose',))
+def _sum(x, y=0., verbose=None):
+    calls.append(x)
+    return sparse.csr_matrix(x + y)
+
+
+@memoize
+def _read_cov(fname):
+    calls.append(fname)
+    return read_cov(fname)
+
+
+@memoize
+def _read_fwd(fname):
+    calls.append(fname)
+    return read_forward_solution(fname)
+
+
+@requires_h5py
+def test_memoize():
+    """Test memoizing results on disk
+    """
+    tempdir = _TempDir()
+    old_dir = _set_env('MNE_CACHE_DIR', tempdir)
+    old_size = _set_env('MNE_MEMOIZE_MAX_SIZE', None)
+    try:
+        memoize_dir = _get_memoize_dir()
+        assert_equal(memoize_dir, op.join(tempdir, 'memoize'))
+        x = np.eye(3)
+        del calls[:]
+        assert_equal(_sum(x).nnz, 3)
+        assert_equal(len(calls), 1)
+        out = _sum(x, verbose=True)  # verbose is ignored
+        assert_equal(len(calls), 1)
+        assert_true(isinstance(out, sparse.csr_matrix))
+        assert_array_equal(out.toarray(), x)
+        _sum(x, y=0.)  # same call arguments
+        assert_equal(len(calls), 1)
+        _sum(x, 1.)
+        assert_equal(len(calls), 2)
+        # arguments that cannot be hashed are not memoized
+        _sum(x, y=1j)
+        _sum(x, y=1j)
+        assert_equal(len(calls), 4)
+        # results are stored as FIFF when possible
+        cov = _read_cov(cov_fname)
+        cov_2 = _read_cov(cov_fname)
+        assert_equal(calls[-1], cov_fname)
+        assert_equal(len(calls), 5)
+        assert_array_equal(cov.data, cov_2.data)
+        fnames = sorted(os.listdir(memoize_dir))
+        assert_equal(len(fnames), 3)
+        assert_true(fnames[0].startswith('_read_cov-'))
+        assert_true(fnames[0].endswith('-cov.fif'))
+        # unreadable results are computed again
+        with open(op.join(memoize_dir, fnames[0]), 'wb') as fid:
+            fid.write(b'partial')
+        cov_2 = _read_cov(cov_fname)
+        assert_equal(len(calls), 6)
+        assert_array_equal(cov.data, cov_2.data)
+        assert_equal(sorted(os.listdir(memoize_dir)), fnames)
+        # the least recently used results are removed
+        os.environ['MNE_MEMOIZE_MAX_SIZE'] = '1K'
+        _sum(2 * x)
+        assert_equal(os.listdir(memoize_dir), [])  # each file is > 1K
+        assert_true(clear_cache() == 0)
+        os.environ.pop('MNE_MEMOIZE_MAX_SIZE')
+        _sum(x)
+        assert_equal(len(calls), 8)
+        assert_true(clear_cache() > 0)
+        assert_equal(os.listdir(memoize_dir), [])
+    finally:
+        _set_env('MNE_CACHE_DIR', old_dir)
+        _set_env('MNE_MEMOIZE_MAX_SIZE', old_size)
+
+
+@testing.requires_testing_data
+def test_memoize_forward():
+    """Test memoizing forward solutions
+    """
+    tempdir = _TempDir()
+    old_dir = _set_env('MNE_CACHE_DIR', tempdir)
+    try:
+        del calls[:]
+        fwd = _read_fwd(fwd_fname)
+        fwd_2 = _read_fwd(fwd_fname)
+        assert_equal(len(calls), 1)
+        assert_array_equal(fwd['sol']['data'], fwd_2['sol']['data'])
+        fnames = os.listdir(_get_memoize_dir())
+        assert_equal(len(fnames), 1)
+        assert_true(fnames[0].endswith('-fwd.fif'))
+        clear_cache()
+    finally:
+        _set_env('MNE_CACHE_DIR', old_dir)
+
+
+def test_memoize_key():
+    """Test that editing a memoized function changes its key
+    """
+    def _add(x):
+        return x
+
+    key = _get_key(_add, (1,), dict(), ())
+    assert_equal(key, _get_key(_add, (), dict(x=1), ()))
+
+    def _add(x):  # noqa, redefined
+        return x + 1
+
+    assert_true(key != _get_key(_add, (1,), dict(), ()))
+
+
+run_tests_if_main()
@@ -438,6 +438,7 @@ def test_compute_covariance_auto_reg():
 
     logliks = [c['loglik'] for c in covs]
     assert_true(np.diff(logliks).max() <= 0)  # descending order
+    assert_true(all('estimator' in c for c in covs))
 
     with warnings.catch_warnings(record=True) as w:
         cov3 = compute_covariance(epochs, method=['empirical',
@@ -17,15 +17,17 @@ import warnings
 
 from mne import (io, Epochs, read_events, pick_events, read_epochs,
                  equalize_channels, pick_types, pick_channels, read_evokeds,
-                 write_evokeds)
+                 write_evokeds, compute_covariance)
 from mne.epochs import (bootstrap, equalize_epoch_counts, combine_event_ids,
                         add_channels_epochs, EpochsArray)
 from mne.utils import (_TempDir, requires_pandas, requires_nitime,
-                       clean_warning_registry, run_tests_if_main)
+                       clean_warning_registry, run_tests_if_main,
+                       _make_test_raw)
 
 from mne.io.meas_info import create_info
 from mne.io.proj import _has_eeg_average_ref_proj
 from mne.event import merge_events
+from mne.filter import band_pass_filter, low_pass_filter
 from mne.io.constants import FIFF
 from mne.externals.six.moves import zip
 from mne.externals.six.moves import cPickle as pickle
@@ -374,6 +376,39 @@ def test_evoked_standard_error():
             assert_equal(ave.first, ave2.first)
 
 
+def test_average_by_event_type():
+    """Test single-pass averaging of all the event types
+    """
+    tempdir = _TempDir()
+    raw = _make_test_raw(tempdir, ['eeg'] * 3 + ['stim'], 100., n_times=3000)
+    events = np.array([[s, 0, [1, 2, 2, 3][ii % 4]]
+                       for ii, s in enumerate(range(10, 2950, 30))])
+    event_ids = dict(b=2, a=1, c=3)
+    for preload in (True, False):
+        epochs = Epochs(raw, events, event_ids, -0.1, 0.2, preload=preload)
+        evokeds = epochs.average(by_event_type=True)
+        stderrs = epochs.standard_error(by_event_type=True)
+        evokeds_2, stderrs_2, covs = epochs.compute_condition_stats(
+            return_cov=True)
+        for ii, name in enumerate(['a', 'b', 'c']):
+            evoked = epochs[name].average()
+            stderr = epochs[name].standard_error()
+            cov = compute_covariance(epochs[name])
+            for ave in (evokeds[ii], evokeds_2[ii]):
+                assert_equal(ave.comment, name)
+                assert_equal(ave.kind, 'average')
+                assert_equal(ave.nave, evoked.nave)
+                assert_allclose(ave.data, evoked.data, rtol=1e-10)
+            for ave in (stderrs[ii], stderrs_2[ii]):
+                assert_equal(ave.kind, 'standard_error')
+                assert_equal(ave.nave, stderr.nave)
+                assert_allclose(ave.data, stderr.data, rtol=1e-10)
+            assert_equal(covs[ii].ch_names, cov.ch_names)
+            assert_equal(covs[ii].nfree, cov.nfree)
+            assert_allclose(covs[ii].data, cov.data, rtol=1e-10)
+    assert_equal(len(epochs.compute_condition_stats()), 2)
+
+
 def test_reject_epochs():
     """Test of epochs rejection
     """
@@ -416,6 +451,56 @@ def test_reject_epochs():
     assert_true(epochs.times[epochs._reject_time][-1] <= 0.1)
 
 
+def test_reject_matrix():
+    """Test tuning the rejection thresholds without reading data again
+    """
+    tempdir = _TempDir()
+    data = np.random.RandomState(0).randn(3, 1000) * 1e-6
+    data[0, 105] = 1e-4  # epoch 1
+    data[1, 305] = 1e-4  # epoch 3, bad channel
+    data[2, 505] = 1e-3  # epoch 5
+    data[0, 700:800] = 0.  # epoch 7
+    raw = _make_test_raw(tempdir, ['eeg', 'eeg', 'eog'], 100., data,
+                         bads=['EEG 002'], add_eeg_ref=False)
+    events = np.array([[s, 0, 1] for s in list(range(0, 1000, 100)) + [980]])
+    kwargs = dict(event_id=1, tmin=0., tmax=0.5, baseline=None,
+                  reject=dict(eeg=5e-5, eog=5e-5), flat=dict(eeg=1e-7),
+                  add_eeg_ref=False)
+    for preload in (True, False):
+        epochs = Epochs(raw, events, preload=preload, **kwargs)
+        bad = epochs.get_reject_matrix()
+        assert_equal(bad.shape, (11, 3))
+        assert_array_equal(np.where(bad)[0], [1, 5, 7])
+        assert_array_equal(np.where(bad)[1], [0, 2, 0])
+        assert_array_equal(epochs.selection, [0, 2, 3, 4, 6, 8, 9])
+        assert_equal(epochs.drop_log[1], ['EEG 001'])
+        assert_equal(epochs.drop_log[5], ['EOG 001'])
+        assert_equal(epochs.drop_log[7], ['EEG 001'])
+        assert_equal(epochs.drop_log[10], ['TOO_SHORT'])
+        # other thresholds
+        bad = epochs.get_reject_matrix(reject=dict(eog=5e-4))
+        assert_array_equal(np.where(bad)[0], [5])
+        if preload:  # after dropping channels
+            epochs.drop_channels(['EEG 001'])
+            bad = epochs.get_reject_matrix(flat=dict(eeg=1e-7))
+            assert_equal(bad.shape, (11, 2))
+            assert_true(not bad.any())
+
+    # the matrix can be computed for epochs read from disk
+    epochs = Epochs(raw, events, preload=True, event_id=1, tmin=0.,
+                    tmax=0.5, baseline=None, add_eeg_ref=False)
+    epochs.save(op.join(tempdir, 'test-epo.fif'))
+    epochs = read_epochs(op.join(tempdir, 'test-epo.fif'))
+    bad = epochs.get_reject_matrix(reject=dict(eeg=5e-5, eog=5e-5))
+    assert_array_equal(np.where(bad.any(axis=1))[0], [1, 5])
+
+    # EpochsArray
+    epochs = EpochsArray(raw[:, :900][0].reshape(3, 9, 100).swapaxes(0, 1),
+                         raw.info, events[:9], reject=kwargs['reject'])
+    assert_array_equal(epochs.get_reject_matrix().any(axis=1),
+                       [False, True] + [False] * 3 + [True] + [False] * 3)
+
+
 def test_preload_epochs():
     """Test preload of epochs
     """
@@ -434,6 +519,122 @@ def test_preload_epochs():
                               epochs.average().data, 18)
 
 
+def test_epochs_from_disk_segments():
+    """Test reading close epochs from disk as single segments
+    """
+    tempdir = _TempDir()
+    sfreq = 100.
+    data = np.random.RandomState(0).randn(4, 3000) * 1e-5
+    data[0, 1500:1510] = 1e-3  # one bad epoch
+    raw = _make_test_raw(tempdir, ['eeg'] * 4, sfreq, data, lowpass=20.,
+                         add_eeg_ref=True)
+    # unsorted, overlapping, far apart and truncated epochs
+    samps = [2990, 1495, 5, 50, 20, 1450, 2600, 10, 1500, 2000, 2040]
+    events = np.array([[s, 0, 1] for s in samps])
+    kwargs = dict(event_id=1, tmin=-0.1, tmax=0.3, baseline=(None, 0),
+                  detrend=1, reject=dict(eeg=5e-4))
+    for proj in (True, False, 'delayed'):
+        kwargs['decim'] = 1 if proj == 'delayed' else 2
+        epochs = Epochs(raw, events, proj=proj, **kwargs)
+        data_iter = np.array([e for e in epochs])
+        data_disk = epochs.get_data()
+        epochs_preload = Epochs(raw, events, proj=proj, preload=True,
+                                **kwargs)
+        assert_array_equal(epochs_preload.get_data(), data_disk)
+        assert_array_equal(data_iter, data_disk)
+        assert_equal(epochs_preload.drop_log, epochs.drop_log)
+        assert_array_equal(epochs_preload.selection, epochs.selection)
+        # the bad, too early and truncated epochs are dropped
+        assert_array_equal(epochs.selection, [3, 4, 5, 6, 7, 9, 10])
+        # compare to reading each epoch alone
+        epochs = Epochs(raw, events, proj=proj, **kwargs)
+        for ii, sel in enumerate(epochs_preload.selection):
+            epoch = epochs._get_epoch_from_disk(sel, proj=epochs.proj)[0]
+            if proj == 'delayed':
+                epoch = epochs_preload._preprocess(
+                    epochs._get_epoch_from_disk(sel, proj=True)[1])
+            assert_allclose(epoch, data_disk[ii], rtol=1e-10, atol=1e-20)
+
+
+def test_epochs_memmap():
+    """Test memory-mapped epochs data
+    """
+    tempdir = _TempDir()
+    data = np.random.RandomState(0).randn(3, 3000) * 1e-5
+    data[1, 1000:1005] = 1e-3
+    raw = _make_test_raw(tempdir, ['eeg'] * 3, 100., data)
+    events = np.array([[s, 0, 1] for s in range(10, 2950, 50)])
+    kwargs = dict(event_id=1, tmin=-0.1, tmax=0.4, reject=dict(eeg=5e-4))
+    epochs = Epochs(raw, events, preload=True, **kwargs)
+    data_fname = op.join(tempdir, 'epochs.dat')
+    epochs_mm = Epochs(raw, events, preload=data_fname, **kwargs)
+    assert_true(epochs_mm.preload is True)
+    assert_true(isinstance(epochs_mm.get_data(), np.memmap))
+    assert_array_equal(epochs.get_data(), epochs_mm.get_data())
+    assert_equal(epochs.drop_log, epochs_mm.drop_log)
+    assert_array_equal(epochs.average().data, epochs_mm.average().data)
+    # slicing and cropping give views
+    assert_true(np.may_share_memory(epochs_mm[2:5]._data, epochs_mm._data))
+    # deleting a slice or a copy keeps the file of the parent
+    epochs_sl = epochs_mm[:5]
+    del epochs_sl
+    epochs_cp = epochs_mm.copy()
+    del epochs_cp
+    assert_true(op.isfile(data_fname))
+    assert_array_equal(epochs.get_data(), epochs_mm.get_data())
+    epochs.crop(0., 0.2)
+    epochs_mm.crop(0., 0.2)
+    assert_equal(epochs_mm._data.filename, op.abspath(data_fname))
+    assert_array_equal(epochs.get_data(), epochs_mm.get_data())
+    del epochs_mm
+    assert_true(not op.isfile(data_fname))
+
+    epochs_fname = op.join(tempdir, 'test-epo.fif')
+    epochs.save(epochs_fname)
+    epochs_read = read_epochs(epochs_fname)
+    for mmap in (True, data_fname):
+        epochs_mm = read_epochs(epochs_fname, mmap=mmap)
+        assert_true(isinstance(epochs_mm.get_data(), np.memmap))
+        assert_array_equal(epochs_read.get_data(), epochs_mm.get_data())
+        assert_array_equal(epochs_read.events, epochs_mm.events)
+        data_fname_read = epochs_mm._data.filename
+        assert_true(op.isfile(data_fname_read))
+        del epochs_mm
+        assert_true(not op.isfile(data_fname_read))
+    assert_raises(ValueError, read_epochs, epochs_fname + '.gz', mmap=True)
+
+
+def test_read_epochs_lazy():
+    """Test reading epochs from a file on demand
+    """
+    tempdir = _TempDir()
+    raw = _make_test_raw(tempdir, ['eeg'] * 3, 100., n_times=3000)
+    events = np.array([[s, 0, 1 + ii % 2]
+                       for ii, s in enumerate(range(10, 2950, 50))])
+    epochs = Epochs(raw, events, dict(a=1, b=2), -0.1, 0.4, preload=True)
+    epochs.drop_epochs([3])
+    for ext in ('-epo.fif', '-epo.fif.gz'):
+        epochs_fname = op.join(tempdir, 'test' + ext)
+        epochs.save(epochs_fname)
+        epochs_read = read_epochs(epochs_fname)
+        epochs_lazy = read_epochs(epochs_fname, preload=False)
+        assert_true(not epochs_lazy.preload)
+        assert_true(epochs_lazy._data is None)
+        assert_equal(len(epochs_lazy), len(epochs_read))
+        assert_equal(epochs_lazy.drop_log, epochs_read.drop_log)
+        assert_array_equal(epochs_lazy.get_data(), epochs_read.get_data())
+        for key in ('a', [7, 2, 30], slice(10, 20)):
+            assert_array_equal(epochs_lazy[key].get_data(),
+                               epochs_read[key].get_data())
+        assert_array_equal(np.array([e for e in epochs_lazy['b']]),
+                           epochs_read['b'].get_data())
+        assert_array_equal(epochs_lazy.average().data,
+                           epochs_read.average().data)
+        epochs_lazy.drop_epochs([0, 5])
+        epochs_read.drop_epochs([0, 5])
+        assert_array_equal(epochs_lazy.get_data(), epochs_read.get_data())
+
+
 def test_indexing_slicing():
     """Test of indexing and slicing operations
     """
@@ -580,6 +781,39 @@ def test_resample():
     epochs.resample(sfreq_normal * 2, n_jobs=2, npad=0)
     assert_true(np.allclose(data_up, epochs._data, rtol=1e-8, atol=1e-16))
 
+    # polyphase resampling keeps the same sample times
+    epochs = Epochs(raw, events[:10], event_id, tmin, tmax, picks=picks,
+                    baseline=(None, 0), preload=True,
+                    reject=reject, flat=flat)
+    epochs.resample(sfreq_normal * 2, method='polyphase')
+    assert_equal(epochs._data.shape, data_up.shape)
+    assert_array_almost_equal(epochs.times, times_up, 10)
+
+
+def test_filter_bank():
+    """Test filtering epochs with a bank of filters
+    """
+    raw, events, picks = _get_data()
+    bands = [(4., 8.), (None, 30.)]
+    epochs = Epochs(raw, events[:4], event_id, tmin, tmax, picks=picks,
+                    baseline=(None, 0), preload=False)
+    data = epochs.get_data()
+    eeg_picks = pick_types(epochs.info, meg=False, eeg=True)
+    bank = epochs.filter_bank(bands, picks=eeg_picks)
+    assert_equal(bank.shape, (2, len(data), len(eeg_picks), data.shape[2]))
+    sfreq = epochs.info['sfreq']
+    assert_array_almost_equal(
+        bank[0], band_pass_filter(data[:, eeg_picks], sfreq, 4., 8.), 12)
+    assert_array_almost_equal(
+        bank[1], low_pass_filter(data[:, eeg_picks], sfreq, 30.), 12)
+    bank_gen = epochs.filter_bank(bands, picks=eeg_picks,
+                                  return_generator=True)
+    assert_array_almost_equal(np.array(list(bank_gen)), bank, 12)
+    bank = epochs.filter_bank(bands)
+    n_data = len(pick_types(epochs.info, meg=True, eeg=True, ref_meg=False,
+                            exclude=[]))
+    assert_equal(bank.shape[2], n_data)
+
 
 def test_detrend():
     """Test detrending of epochs
@@ -3,12 +3,12 @@ import os
 
 from nose.tools import assert_true, assert_raises
 import numpy as np
-from numpy.testing import (assert_array_almost_equal, assert_array_equal,
-                           assert_raises)
+from numpy.testing import assert_array_almost_equal, assert_array_equal
 import warnings
 
 from mne import (read_events, write_events, make_fixed_length_events,
-                 find_events, find_stim_steps, io, pick_channels)
+                 find_events, find_stim_steps, io, pick_channels, pick_events,
+                 Events)
 from mne.utils import _TempDir
 from mne.event import define_target_events, merge_events
 
@@ -276,6 +276,29 @@ def test_find_events():
             os.environ['MNE_STIM_CHANNEL%s' % s] = o
 
 
+def test_find_events_chunked():
+    """Test finding events in raw data that are not preloaded
+    """
+    raw = io.Raw(raw_fname, preload=True)
+    raw_chunked = io.Raw(raw_fname, preload=False)
+    old_chunk_size = io.base._chunk_size
+    try:
+        for chunk_size in (37, 1000):  # events straddle the boundaries
+            io.base._chunk_size = chunk_size
+            for kwargs in (dict(), dict(mask=3), dict(consecutive=True),
+                           dict(consecutive=False, output='offset'),
+                           dict(min_duration=0.002, output='step')):
+                assert_array_equal(find_events(raw_chunked, 'STI 014',
+                                               **kwargs),
+                                   find_events(raw, 'STI 014', **kwargs))
+            for kwargs in (dict(pad_start=0, pad_stop=0), dict(merge=-2),
+                           dict(merge=2)):
+                assert_array_equal(find_stim_steps(raw_chunked, **kwargs),
+                                   find_stim_steps(raw, **kwargs))
+    finally:
+        io.base._chunk_size = old_chunk_size
+
+
 def test_make_fixed_length_events():
     """Test making events of a fixed length
     """
@@ -296,3 +319,65 @@ def test_define_events():
     n_target_ = events_[events_[:, 2] == 42].shape[0]
 
     assert_true(n_target_ == (n_target - n_miss))
+
+    # compare with a search of each reference event
+    sfreq = raw.info['sfreq']
+    for fill_na in (None, 99):
+        events_, lag = define_target_events(events, 5, 32, sfreq, -0.2, 0.7,
+                                            42, fill_na)
+        n = 0
+        for event in events[events[:, 2] == 5]:
+            match = events[(events[:, 0] > event[0] + int(-0.2 * sfreq)) &
+                           (events[:, 0] < event[0] + int(0.7 * sfreq)) &
+                           (events[:, 2] == 32)]
+            if len(match) > 0:
+                assert_array_equal(events_[n], [event[0], event[1], 42])
+                assert_array_almost_equal(lag[n], abs(event[0] -
+                                                      match[0, 0]) *
+                                          1e3 / sfreq)
+            elif fill_na is None:
+                continue
+            else:
+                assert_array_equal(events_[n], [event[0], event[1], 99])
+            n += 1
+        assert_true(n == len(events_))
+    # the order of the reference events is kept
+    perm = np.random.RandomState(0).permutation(len(events))
+    events_, _ = define_target_events(events[perm], 5, 32, sfreq, -0.2, 0.7,
+                                      42, 99)
+    assert_array_equal(events_[:, 0], events[perm][events[perm][:, 2] == 5,
+                                                   0])
+
+
+def test_events():
+    """Test the Events class
+    """
+    events = read_events(fname)
+    rng = np.random.RandomState(0)
+    ev = Events(events[rng.permutation(len(events))])
+    assert_array_equal(ev.samples, np.sort(events[:, 0]))
+    assert_true(len(ev) == len(events))
+    assert_array_equal(np.asarray(Events(events)), events)
+    assert_raises(ValueError, Events, events[:, :2])
+    # time ranges
+    start, stop = events[3, 0], events[10, 0]
+    assert_array_equal(np.asarray(ev.between(start, stop)), events[3:10])
+    assert_true(len(ev.between(0, events[0, 0])) == 0)
+    # selection by id
+    ev = Events(events)
+    for include in (5, [1, 32], [1, 12345]):
+        assert_array_equal(np.asarray(ev.pick(include=include)),
+                           pick_events(events, include=include))
+    assert_array_equal(np.asarray(ev.pick(exclude=[5])),
+                       pick_events(events, exclude=[5]))
+    assert_true(len(ev.pick(include=12345)) == 0)
+    # pairing
+    ref_idx, target_idx = ev.find_targets(5, 32, -100, 300)
+    assert_array_equal(ref_idx, np.where(events[:, 2] == 5)[0])
+    for ri, ti in zip(ref_idx, target_idx):
+        targets = np.where((events[:, 0] > events[ri, 0] - 100) &
+                           (events[:, 0] < events[ri, 0] + 300) &
+                           (events[:, 2] == 32))[0]
+        assert_true(ti == (targets[0] if len(targets) > 0 else -1))
+    ref_idx, target_idx = ev.find_targets(5, 12345, -100, 300)
+    assert_true(np.all(target_idx == -1))
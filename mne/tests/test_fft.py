@@ -0,0 +1,101 @@
+import os
+
+import numpy as np
+from numpy.testing import assert_allclose
+from nose.tools import assert_equal, assert_raises, assert_true
+
+import mne.fft
+from mne.fft import (set_fft_backend, get_fft_backend, next_fast_len, fft,
+                     ifft, rfft, irfft, _get_scipy_fft, _has_pyfftw)
+from mne.parallel import _thread_map
+from mne.utils import run_tests_if_main
+
+
+def test_next_fast_len():
+    """Test getting fast FFT lengths
+    """
+    for target, n_fft in ((1, 1), (6, 6), (7, 8), (11, 12), (13, 15),
+                          (97, 100), (1024, 1024), (1025, 1080),
+                          (30001, 30375)):
+        assert_equal(next_fast_len(target), n_fft)
+    for target in range(1, 1000):
+        n_fft = next_fast_len(target)
+        assert_true(n_fft >= target)
+        for factor in (2, 3, 5):
+            while n_fft % factor == 0:
+                n_fft //= factor
+        assert_equal(n_fft, 1)
+
+
+def test_fft_backends():
+    """Test the FFT backends
+    """
+    assert_raises(ValueError, set_fft_backend, 'foo')
+    assert_raises(ValueError, set_fft_backend, 'numpy', 0)
+    backends = ['numpy']
+    if _get_scipy_fft() is not None:
+        backends.append('scipy')
+    if _has_pyfftw():
+        backends.append('pyfftw')
+    rng = np.random.RandomState(0)
+    x = rng.randn(3, 100)
+    try:
+        for backend in backends:
+            set_fft_backend(backend, 2)
+            assert_equal(get_fft_backend(), backend)
+            assert_allclose(fft(x), np.fft.fft(x))
+            assert_allclose(fft(x, 120), np.fft.fft(x, 120))
+            assert_allclose(fft(x, axis=0), np.fft.fft(x, axis=0))
+            assert_allclose(ifft(fft(x)).real, x, atol=1e-12)
+            assert_allclose(rfft(x, 135), np.fft.rfft(x, 135))
+            assert_allclose(irfft(rfft(x)), x, atol=1e-12)
+            # single precision data are transformed in double precision
+            x_32 = x.astype(np.float32)
+            assert_equal(rfft(x_32).dtype, np.complex128)
+            assert_equal(fft(x_32.astype(np.complex64)).dtype, np.complex128)
+            assert_equal(irfft(rfft(x_32).astype(np.complex64)).dtype,
+                         np.float64)
+        set_fft_backend('auto')
+        assert_equal(get_fft_backend(), backends[-1])
+    finally:
+        mne.fft._backend['name'] = None
+
+
+class _FakeFFT(object):
+    """Record the number of threads asked for by each FFT"""
+    def __init__(self):
+        self.workers = list()
+
+    def rfft(self, x, n, axis, workers):
+        self.workers.append(workers)
+        return np.fft.rfft(x, n, axis)
+
+
+def test_fft_threads():
+    """Test sharing the FFT threads between threads
+    """
+    old_backend = mne.fft._backend.copy()
+    old_num_threads = os.environ.get('MNE_NUM_THREADS')
+    fake = _FakeFFT()
+    mne.fft._backend.update(name='scipy', module=fake,
+                            threads_kwarg='workers', n_threads=8)
+    os.environ['MNE_NUM_THREADS'] = '8'
+    try:
+        x = np.ones(16)
+        rfft(x)
+        assert_equal(fake.workers, [8])
+        _thread_map(rfft, [(x,)] * 4, 4)
+        assert_equal(fake.workers[1:], [2] * 4)
+        _thread_map(rfft, [(x,)] * 2, 16)  # at most one thread per call
+        assert_equal(fake.workers[5:], [4] * 2)
+        rfft(x)  # the limit only applies within the threads
+        assert_equal(fake.workers[-1], 8)
+    finally:
+        mne.fft._backend.update(old_backend)
+        if old_num_threads is None:
+            os.environ.pop('MNE_NUM_THREADS', None)
+        else:
+            os.environ['MNE_NUM_THREADS'] = old_num_threads
+
+
+run_tests_if_main()
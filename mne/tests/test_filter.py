@@ -4,11 +4,15 @@ from numpy.testing import (assert_array_almost_equal, assert_almost_equal,
 from nose.tools import assert_equal, assert_true, assert_raises
 import os.path as op
 import warnings
-from scipy.signal import resample as sp_resample
+from scipy.signal import resample as sp_resample, hilbert, lfilter
 
 from mne.filter import (band_pass_filter, high_pass_filter, low_pass_filter,
                         band_stop_filter, resample, construct_iir_filter,
-                        notch_filter, detrend)
+                        notch_filter, detrend, _polyphase_ratio,
+                        _resample_polyphase, get_filter_cache_info,
+                        clear_filter_cache, _filter_cache, filter_bank,
+                        StreamingFIR, StreamingIIR)
+import mne.filter
 
 from mne import set_log_file
 from mne.utils import _TempDir, sum_squared, run_tests_if_main, slow_test
@@ -103,6 +107,49 @@ def test_resample():
     assert_array_equal(x_3_rs.swapaxes(0, 2), x_rs)
 
 
+def test_resample_polyphase():
+    """Test polyphase resampling"""
+    sfreq = 1000.
+    t = np.arange(10000) / sfreq
+    x = np.array([np.sin(2 * np.pi * 10 * t), np.cos(2 * np.pi * 7 * t)])
+    x[1] += 1.  # DC offset, to check the edges
+    for up, down in ((1, 10), (1., 3.), (3, 2), (250., 1000.), (2, 1)):
+        x_rs = resample(x, up, down, method='polyphase')
+        n_out = int(round(x.shape[1] * float(up) / down))
+        assert_equal(x_rs.shape, (2, n_out))
+        t_rs = np.arange(n_out) * float(down) / up / sfreq
+        x_true = np.array([np.sin(2 * np.pi * 10 * t_rs),
+                           np.cos(2 * np.pi * 7 * t_rs) + 1.])
+        assert_array_almost_equal(x_rs, x_true, 2)
+        # chunks give the same result as a single block
+        up_int, down_int = _polyphase_ratio(up, down)
+        for chunk in (7, 1000):
+            x_chunked = _resample_polyphase(lambda a, b: x[:, a:b],
+                                            x.shape[1], 2, up_int, down_int,
+                                            x.dtype, chunk=chunk)
+            assert_array_almost_equal(x_chunked, x_rs, 12)
+    assert_array_almost_equal(resample(x, 2, 2, method='polyphase'), x)
+
+    # n-d arrays and axis
+    x = np.random.RandomState(0).randn(4, 3, 100)
+    x_rs = resample(x, 1, 2, method='polyphase')
+    assert_equal(x_rs.shape, (4, 3, 50))
+    x_rs_2 = resample(x.swapaxes(0, 2), 1, 2, axis=0, method='polyphase')
+    assert_array_almost_equal(x_rs_2.swapaxes(0, 2), x_rs)
+    assert_array_almost_equal(resample(x, 1, 2, method='polyphase',
+                                       n_jobs=2), x_rs)
+
+    # integer data
+    x = np.arange(3000).reshape(3, 1000)
+    x_rs = resample(x, 2, 3, method='polyphase')
+    assert_equal(x_rs.dtype, np.float64)
+    assert_array_almost_equal(x_rs, resample(x.astype(np.float64), 2, 3,
+                                             method='polyphase'))
+
+    assert_raises(ValueError, resample, x, 1, 2, method='foo')
+    assert_raises(ValueError, resample, x, 1, np.pi, method='polyphase')
+
+
 @slow_test
 def test_filters():
     """Test low-, band-, high-pass, and band-stop filters plus resampling
@@ -193,6 +240,152 @@ def test_filters():
     assert_true(iir_params['b'].size - 1 == 4)
 
 
+def test_filter_cache():
+    """Test caching of FIR filter kernels and their spectra
+    """
+    sfreq = 500
+    a = np.random.RandomState(0).randn(2, 20 * sfreq)
+    clear_filter_cache()
+    for fl in ['2s', None]:
+        bp = band_pass_filter(a, sfreq, 4, 8, filter_length=fl)
+        info = get_filter_cache_info()
+        assert_true(info['misses'] > 0)
+        n_misses = info['misses']
+        # filtering other signals with the same filter reuses it
+        bp_2 = band_pass_filter(a[::-1], sfreq, 4, 8, filter_length=fl)
+        assert_array_equal(bp, bp_2[::-1])
+        info = get_filter_cache_info()
+        assert_equal(info['misses'], n_misses)
+        assert_equal(info['hits'], n_misses)
+        band_pass_filter(a, sfreq, 4, 8, filter_length=fl, n_jobs='cuda')
+        assert_equal(get_filter_cache_info()['misses'], n_misses)
+        # a different sampling rate is a different filter
+        band_pass_filter(a, 2 * sfreq, 4, 8, filter_length=fl)
+        assert_true(get_filter_cache_info()['misses'] > n_misses)
+        clear_filter_cache()
+        assert_equal(get_filter_cache_info()['n_entries'], 0)
+    # the cache is bounded
+    max_entries = _filter_cache.max_entries
+    try:
+        _filter_cache.max_entries = 2
+        for h_freq in [8., 9., 10.]:
+            low_pass_filter(a, sfreq, h_freq, filter_length='2s')
+        assert_equal(get_filter_cache_info()['n_entries'], 2)
+        low_pass_filter(a, sfreq, 8., filter_length='2s')
+        assert_equal(get_filter_cache_info()['hits'], 0)
+    finally:
+        _filter_cache.max_entries = max_entries
+        clear_filter_cache()
+
+
+def test_filter_blocks():
+    """Test filtering blocks of channels in threads
+    """
+    sfreq = 500
+    a = np.random.RandomState(0).randn(7, 10 * sfreq)
+    picks = [0, 2, 3, 6]
+    block_bytes = mne.filter._block_bytes
+    try:
+        for fl, method in [('1s', 'fft'), (None, 'fft'), (None, 'iir')]:
+            kwargs = dict(filter_length=fl, method=method)
+            mne.filter._block_bytes = block_bytes
+            bp = band_pass_filter(a, sfreq, 4, 8, **kwargs)
+            # one channel at a time (IIR padding depends on the shape)
+            for p in range(len(a) if method == 'fft' else 0):
+                bp_p = band_pass_filter(a[p], sfreq, 4, 8, **kwargs)
+                assert_array_almost_equal(bp[p], bp_p, 12)
+            # blocks of a single channel, filtered in two threads
+            mne.filter._block_bytes = 1
+            bp_blocks = band_pass_filter(a, sfreq, 4, 8, n_jobs=2, **kwargs)
+            assert_array_almost_equal(bp, bp_blocks, 12)
+            bp_picks = band_pass_filter(a, sfreq, 4, 8, n_jobs=2,
+                                        picks=picks, **kwargs)
+            assert_array_almost_equal(bp_picks[picks], bp[picks], 12)
+            not_picked = np.setdiff1d(np.arange(len(a)), picks)
+            assert_array_equal(bp_picks[not_picked], a[not_picked])
+    finally:
+        mne.filter._block_bytes = block_bytes
+
+
+def test_filter_bank():
+    """Test filtering with a bank of filters
+    """
+    sfreq = 500
+    a = np.random.RandomState(0).randn(2, 3, 10 * sfreq)
+    bands = [(4., 8.), (None, 30.), (1., None)]
+    assert_raises(ValueError, filter_bank, a, sfreq, [])
+    assert_raises(ValueError, filter_bank, a, sfreq, [(None, None)])
+    assert_raises(ValueError, filter_bank, a, sfreq, [(8., 4.)])
+    assert_raises(ValueError, filter_bank, a, sfreq, [(4., 250.)])
+    for fl in ('1s', None):
+        bank = filter_bank(a, sfreq, bands, filter_length=fl)
+        assert_equal(bank.shape, (len(bands),) + a.shape)
+        assert_array_almost_equal(
+            bank[0], band_pass_filter(a, sfreq, 4., 8., filter_length=fl), 12)
+        assert_array_almost_equal(
+            bank[1], low_pass_filter(a, sfreq, 30., filter_length=fl), 12)
+        assert_array_almost_equal(
+            bank[2], high_pass_filter(a, sfreq, 1., filter_length=fl), 12)
+        bank_jobs = filter_bank(a, sfreq, bands, filter_length=fl, n_jobs=2)
+        assert_array_almost_equal(bank_jobs, bank, 12)
+        bank_gen = filter_bank(a, sfreq, bands, filter_length=fl,
+                               return_generator=True)
+        assert_array_almost_equal(np.array(list(bank_gen)), bank, 12)
+        env = filter_bank(a, sfreq, bands, filter_length=fl, envelope=True)
+        assert_array_almost_equal(env, np.abs(hilbert(bank)), 12)
+
+
+def test_streaming_filters():
+    """Test filtering consecutive buffers of data
+    """
+    sfreq = 500.
+    rng = np.random.RandomState(0)
+    t = np.arange(5000) / sfreq
+    a = rng.randn(3, len(t))
+    assert_raises(ValueError, StreamingFIR, sfreq, 8., 4.)
+    assert_raises(ValueError, StreamingFIR, sfreq, 4., 8., filter_length='1')
+    # the default length is long enough for the transition bands
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter('always')
+        StreamingFIR(sfreq, 1., None)
+        StreamingFIR(sfreq, 1., 40., h_trans_bandwidth=5.)
+    assert_equal(len(w), 0)
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter('always')
+        StreamingFIR(sfreq, 1., None, filter_length='1s')
+    assert_true('Increase filter_length' in str(w[0].message))
+    assert_raises(ValueError, StreamingIIR, sfreq, None, None)
+    for filt in (StreamingFIR(sfreq, 4., 8.), StreamingFIR(sfreq, None, 30.),
+                 StreamingIIR(sfreq, 4., 8.), StreamingIIR(sfreq, 1., None)):
+        # the whole signal at once
+        whole = filt.process(a)
+        assert_equal(whole.shape, a.shape)
+        # buffers of various sizes, to use the direct and FFT FIR methods
+        filt.reset()
+        bounds = [0, 1, 11, 32, 1000, 1010, 4000, len(t)]
+        buffers = [filt.process(a[:, start:stop])
+                   for start, stop in zip(bounds[:-1], bounds[1:])]
+        assert_array_almost_equal(np.concatenate(buffers, axis=1), whole, 10)
+        # same as filtering from rest
+        filt.reset()
+        a_rest = a - a[:, :1]
+        assert_array_almost_equal(filt.process(a_rest),
+                                  lfilter(filt._b, filt._a, a_rest), 10)
+        assert_raises(ValueError, filt.process, a[:2])
+        filt.reset()
+        assert_array_almost_equal(filt.process(a[0]), whole[0], 10)
+        assert_equal(filt.latency, filt.delay / sfreq)
+
+    # a sine in the pass-band is delayed by the latency
+    sig = np.sin(2 * np.pi * 10. * t)
+    filt = StreamingFIR(sfreq, 5., 15., l_trans_bandwidth=2.,
+                        h_trans_bandwidth=2.)
+    assert_equal(filt.delay, 412)  # 3.3 * 500 / 2 samples
+    sig_filt = filt.process(sig)
+    err = sig_filt[1000:] - sig[1000 - filt.delay:-filt.delay]
+    assert_true(np.abs(err).max() < 0.05)
+
+
 def test_cuda():
     """Test CUDA-based filtering
     """
@@ -18,7 +18,8 @@ def test_hdf5():
     sp = sparse.eye(3, 3, format='csc')
     sp[2, 2] = 2
     x = dict(a=dict(b=np.zeros(3)), c=np.zeros(2, np.complex128),
-             d=[dict(e=(1, -2., 'hello', u'goodbyeu\u2764')), None], f=sp)
+             d=[dict(e=(1, -2., 'hello', u'goodbyeu\u2764')), None], f=sp,
+             g=sparse.csr_matrix(sp[:, :2].T))
     write_hdf5(test_file, 1)
     assert_equal(read_hdf5(test_file), 1)
     assert_raises(IOError, write_hdf5, test_file, x)  # file exists
@@ -0,0 +1,56 @@
+import sys
+from nose.tools import assert_equal, assert_true
+
+import mne
+from mne.utils import run_subprocess, run_tests_if_main
+
+# modules that a bare "import mne" must not import
+heavy_modules = ['matplotlib', 'sklearn', 'pandas', 'mayavi', 'traits',
+                 'mne.viz', 'mne.gui', 'mne.report', 'mne.decoding',
+                 'mne.realtime', 'mne.forward', 'mne.minimum_norm',
+                 'mne.beamformer', 'mne.preprocessing']
+# modules that "import mne" never imported, even before it was lazy
+unused_modules = ['mne.report', 'mne.inverse_sparse']
+
+
+def test_lazy_import():
+    """Test that import mne only loads the submodules that are accessed
+    """
+    # before Python 3.7, the same modules as before are imported
+    modules = (heavy_modules if sys.version_info >= (3, 7)
+               else unused_modules)
+    code = ('import sys; import mne; '
+            'print(" ".join(m for m in %r if m in sys.modules))'
+            % (modules,))
+    stdout, _ = run_subprocess([sys.executable, '-c', code])
+    assert_equal(stdout.strip(), '')
+    # the public namespace is intact
+    for name in mne._lazy_names:
+        assert_true(getattr(mne, name) is not None)
+        assert_true(name in dir(mne))
+    assert_true(mne.pick_types is mne.io.pick.pick_types)
+    assert_true(mne.viz.plot_evoked is not None)
+    from mne import Epochs
+    assert_true(Epochs is mne.epochs.Epochs)
+    assert_true(not hasattr(mne, 'not_a_function'))
+
+
+def test_import_first():
+    """Test importing each public name and submodule first
+    """
+    # the import cycles between the submodules depend on which one is
+    # imported first, so each one is imported in a new interpreter
+    codes = ['from mne import %s' % names[0]
+             for module, names in mne._lazy_functions]
+    codes += ['import mne.%s' % module for module in mne._submodules]
+    for code in codes:
+        run_subprocess([sys.executable, '-c', code])
+    # and every name can be accessed
+    submodules = ('_submodules' if sys.version_info >= (3, 7)
+                  else '_eager_submodules')
+    code = ('import mne; [getattr(mne, name) for name in '
+            'sorted(mne._lazy_names) + mne.%s]' % submodules)
+    run_subprocess([sys.executable, '-c', code])
+
+
+run_tests_if_main()
@@ -0,0 +1,102 @@
+import os
+import sys
+import numpy as np
+from numpy.testing import assert_allclose
+from nose.tools import assert_equal, assert_true, assert_raises
+from nose.plugins.skip import SkipTest
+
+import mne.parallel
+from mne.parallel import (parallel_func, pool, check_n_jobs, _get_joblib,
+                          _auto_chunk_size, _force_serial)
+from mne.utils import (run_subprocess, run_tests_if_main, set_num_threads,
+                       set_memory_limit)
+
+
+def test_pool():
+    """Test keeping a pool of workers for parallel_func
+    """
+    if _get_joblib()[0] is None:
+        raise SkipTest('joblib is required')
+    rng = np.random.RandomState(0)
+    arrays = [rng.randn(300, 1000) for _ in range(3)]  # larger than 1M
+    with pool(1):
+        assert_true(mne.parallel._pool is None)
+    with pool(2) as p:
+        assert_equal(p.n_jobs, 2)
+        assert_raises(RuntimeError, pool(2).__enter__)
+        parallel, my_sum, n_jobs = parallel_func(np.sum, 3)
+        assert_equal(n_jobs, 2)
+        for _ in range(2):  # the workers are reused
+            parallel_2, _, _ = parallel_func(np.sum, 2)
+            assert_true(parallel_2 is parallel)
+            sums = parallel(my_sum(x) for x in arrays)
+            assert_allclose(sums, [np.sum(x) for x in arrays])
+        # a single job does not use the pool
+        assert_true(parallel_func(np.sum, 1)[0] is list)
+    assert_true(mne.parallel._pool is None)
+    assert_true(parallel_func(np.sum, 2)[0] is not parallel)
+
+
+def test_num_threads():
+    """Test limiting the threads used by parallel jobs
+    """
+    if _force_serial:
+        raise SkipTest('MNE_FORCE_SERIAL is set')
+    assert_raises(ValueError, set_num_threads, 0)
+    assert_raises(ValueError, set_num_threads, '4')
+    old_num_threads = os.environ.get('MNE_NUM_THREADS')
+    os.environ['MNE_NUM_THREADS'] = '8'  # the environment overrides config
+    try:
+        assert_equal(check_n_jobs(1), 1)
+        assert_equal(check_n_jobs(4), 4)
+        assert_equal(check_n_jobs(16), 8)
+        assert_equal(check_n_jobs(-1), 8)
+        assert_equal(check_n_jobs(-2), 7)
+        # the function called by the workers limits their BLAS threads,
+        # which is checked in a new interpreter as the limits cannot be
+        # undone reliably
+        code = ('import os; import numpy as np; import mne.parallel; '
+                'limited = mne.parallel._ThreadLimited(np.sum, 3); '
+                'assert limited(np.ones(4)) == 4; '
+                'assert mne.parallel._blas_limit == 3; '
+                'assert os.environ["OMP_NUM_THREADS"] == "3"')
+        run_subprocess([sys.executable, '-c', code])
+        if _get_joblib()[0] is not None:
+            _, my_func, n_jobs = parallel_func(np.sum, 4)
+            assert_equal(n_jobs, 4)
+            assert_equal(my_func(np.ones(2))[0].n_threads, 2)
+    finally:
+        if old_num_threads is None:
+            os.environ.pop('MNE_NUM_THREADS', None)
+        else:
+            os.environ['MNE_NUM_THREADS'] = old_num_threads
+
+
+def test_auto_n_jobs():
+    """Test choosing the number of jobs and chunks from the memory limit
+    """
+    if _force_serial:
+        raise SkipTest('MNE_FORCE_SERIAL is set')
+    assert_raises(ValueError, set_memory_limit, 1000)
+    assert_raises(ValueError, set_memory_limit, '1T')
+    assert_raises(ValueError, check_n_jobs, 'foo')
+    old_env = dict((key, os.environ.get(key))
+                   for key in ('MNE_NUM_THREADS', 'MNE_MEMORY_LIMIT'))
+    os.environ['MNE_NUM_THREADS'] = '8'
+    os.environ['MNE_MEMORY_LIMIT'] = '1M'
+    try:
+        assert_equal(check_n_jobs('auto'), 8)
+        assert_equal(check_n_jobs('auto', job_bytes=2 ** 18), 4)
+        assert_equal(check_n_jobs('auto', job_bytes=2 ** 30), 1)
+        assert_equal(_auto_chunk_size(1024, 2), 512)
+        assert_equal(_auto_chunk_size(1024, 2, fixed_bytes=2 ** 18), 256)
+        assert_equal(_auto_chunk_size(1024, 2, fixed_bytes=2 ** 30), 1)
+    finally:
+        for key, value in old_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+run_tests_if_main()
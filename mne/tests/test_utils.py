@@ -5,6 +5,7 @@ import os.path as op
 import numpy as np
 from scipy import sparse
 import os
+import json
 import warnings
 
 from mne.utils import (set_log_level, set_log_file, _TempDir,
@@ -15,9 +16,10 @@ from mne.utils import (set_log_level, set_log_file, _TempDir,
                        requires_good_network, run_tests_if_main, md5sum,
                        ArgvSetter, _memory_usage, check_random_state,
                        _check_mayavi_version, requires_mayavi,
-                       set_memmap_min_size, _get_stim_channel, _check_fname)
+                       set_memmap_min_size, _get_stim_channel, _check_fname,
+                       verbose, Profiler)
 from mne.io import show_fiff
-from mne import Evoked
+from mne import Evoked, utils
 from mne.externals.six.moves import StringIO
 
 warnings.simplefilter('always')  # enable b/c these tests throw warnings
@@ -137,6 +139,35 @@ def test_hash():
     assert_true(len(object_diff(d1, d0)) > 0)
     assert_not_equal(object_hash(d0), object_hash(d1))
 
+    # numpy scalars and sparse matrices
+    assert_equal(object_hash(np.int64(1)), object_hash(np.int64(1)))
+    assert_not_equal(object_hash(np.int64(1)), object_hash(np.int32(1)))
+    x = sparse.eye(3, 3, format='csr')
+    assert_equal(object_hash(x), object_hash(x.copy()))
+    assert_not_equal(object_hash(x), object_hash(x.tocsc()))
+    assert_not_equal(object_hash(x), object_hash(2 * x))
+
+    # arrays are hashed in C order, whatever their memory layout
+    x = np.random.RandomState(0).randn(100, 30)
+    assert_equal(object_hash(x), object_hash(np.asfortranarray(x)))
+    assert_equal(object_hash(x[::2, 1:]), object_hash(x[::2, 1:].copy()))
+    old_chunk_size = utils._hash_chunk_size
+    utils._hash_chunk_size = 1000  # hash the strided array in chunks
+    try:
+        assert_equal(object_hash(x[::2, 1:]), object_hash(x[::2, 1:].copy()))
+        assert_not_equal(object_hash(x[::2]), object_hash(x[1::2]))
+    finally:
+        utils._hash_chunk_size = old_chunk_size
+    assert_not_equal(object_hash(x), object_hash(x.T))  # shape is hashed
+    x = np.array([dict(a=1), None], object)
+    assert_equal(object_hash(x), object_hash(x.copy()))
+    x = np.array([(1, 'a'), (2, None)], [('a', int), ('b', object)])
+    assert_equal(object_hash(x), object_hash(x.copy()))
+    assert_equal(object_hash(x[0]), object_hash(x.copy()[0]))
+    y = x.copy()
+    y[1]['b'] = 'b'
+    assert_not_equal(object_hash(x), object_hash(y))
+
     d1 = deepcopy(d0)
     d2 = deepcopy(d0)
     d1['e'] = StringIO()
@@ -314,6 +345,67 @@ def test_config():
     assert_equal(get_config(home_dir=tempdir), config)
 
 
+@verbose
+def _profiled_inner(x, verbose=None):
+    return x + 1
+
+
+@verbose
+def _profiled_outer(x, verbose=None):
+    return _profiled_inner(_profiled_inner(x))
+
+
+def test_profiler():
+    """Test profiling the decorated functions"""
+    tempdir = _TempDir()
+    assert_equal(_profiled_outer(1), 3)
+    with Profiler() as profiler:
+        assert_raises(RuntimeError, Profiler().__enter__)
+        assert_equal(_profiled_outer(1), 3)
+        assert_equal(_profiled_inner(1), 2)
+    assert_equal(_profiled_outer(1), 3)  # not recorded
+    inner = __name__ + '._profiled_inner'
+    outer = __name__ + '._profiled_outer'
+    stats = profiler.get_stats()
+    assert_equal(sorted(stats), [(inner,), (outer,), (outer, inner)])
+    assert_equal(stats[(outer,)]['n_calls'], 1)
+    assert_equal(stats[(outer, inner)]['n_calls'], 2)
+    assert_true(stats[(outer,)]['wall'] >= stats[(outer, inner)]['wall'])
+    stats = profiler.get_stats('function')
+    assert_equal(stats[inner]['n_calls'], 3)
+    assert_raises(ValueError, profiler.get_stats, 'foo')
+    table = profiler.as_table()
+    assert_true('\n  ' + inner in table)  # nested call
+    assert_equal(len(profiler.as_table('function').split('\n')), 3)
+    fname = op.join(tempdir, 'trace.json')
+    profiler.save_chrome_trace(fname)
+    with open(fname, 'r') as fid:
+        events = json.load(fid)['traceEvents']
+    assert_equal(len(events), 4)
+    assert_equal(events[-1]['name'], inner)
+    # without a trace, only the statistics are kept
+    with Profiler(trace=False) as profiler:
+        _profiled_outer(1)
+    assert_equal(profiler.events, [])
+    assert_equal(profiler.get_stats()[(outer, inner)]['n_calls'], 2)
+    assert_raises(RuntimeError, profiler.save_chrome_trace, fname)
+    # only 'true' and JSON file names enable the session profiler
+    old_value = os.environ.get('MNE_PROFILE')
+    try:
+        for value, n_warn in (('false', 0), ('0', 1), ('foo', 1)):
+            os.environ['MNE_PROFILE'] = value
+            with warnings.catch_warnings(record=True) as w:
+                warnings.simplefilter('always')
+                utils._start_config_profiler()
+            assert_equal(len(w), n_warn)
+            assert_true(utils._profiler is None)
+    finally:
+        if old_value is None:
+            os.environ.pop('MNE_PROFILE', None)
+        else:
+            os.environ['MNE_PROFILE'] = old_value
+
+
 def test_show_fiff():
     """Test show_fiff
     """
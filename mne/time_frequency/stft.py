@@ -1,7 +1,8 @@
 from math import ceil
 import numpy as np
-from scipy.fftpack import fft, ifft, fftfreq
+from scipy.fftpack import fftfreq
 
+from ..fft import fft, ifft
 from ..utils import logger, verbose
 
 
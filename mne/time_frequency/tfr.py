@@ -13,11 +13,11 @@ from math import sqrt
 from copy import deepcopy
 import numpy as np
 from scipy import linalg
-from scipy.fftpack import fftn, ifftn
 
 from ..fixes import partial
 from ..baseline import rescale
 from ..parallel import parallel_func
+from ..fft import fft, ifft, next_fast_len
 from ..utils import logger, verbose, requires_h5py
 from ..channels.channels import ContainsMixin, PickDropChannelsMixin
 from ..io.pick import pick_info, pick_types
@@ -192,8 +192,8 @@ def _cwt_fft(X, Ws, mode="same"):
 
     Ws_max_size = max(W.size for W in Ws)
     size = n_times + Ws_max_size - 1
-    # Always use 2**n-sized FFT
-    fsize = 2 ** int(np.ceil(np.log2(size)))
+    # Always use a fast FFT size
+    fsize = next_fast_len(size)
 
     # precompute FFTs of Ws
     fft_Ws = np.empty((n_freqs, fsize), dtype=np.complex128)
@@ -201,7 +201,7 @@ def _cwt_fft(X, Ws, mode="same"):
         if len(W) > n_times:
             raise ValueError('Wavelet is too long for such a short signal. '
                              'Reduce the number of cycles.')
-        fft_Ws[i] = fftn(W, [fsize])
+        fft_Ws[i] = fft(W, fsize)
 
     for k, x in enumerate(X):
         if mode == "full":
@@ -209,9 +209,10 @@ def _cwt_fft(X, Ws, mode="same"):
         elif mode == "same" or mode == "valid":
             tfr = np.zeros((n_freqs, n_times), dtype=np.complex128)
 
-        fft_x = fftn(x, [fsize])
+        fft_x = fft(x, fsize)
+        rets = ifft(fft_x * fft_Ws)  # all the wavelets at once
         for i, W in enumerate(Ws):
-            ret = ifftn(fft_x * fft_Ws[i])[:n_times + W.size - 1]
+            ret = rets[i, :n_times + W.size - 1]
             if mode == "valid":
                 sz = abs(W.size - n_times) + 1
                 offset = (n_times - sz) / 2
@@ -10,6 +10,7 @@ from __future__ import print_function
 import warnings
 import logging
 import time
+import threading
 from distutils.version import LooseVersion
 import os
 import os.path as op
@@ -59,6 +60,13 @@ try:
 except ImportError:
     memory_usage = _memory_usage
 
+try:
+    from xxhash import xxh3_128 as _new_hash  # much faster than MD5
+except ImportError:
+    _new_hash = hashlib.md5
+
+_hash_chunk_size = 2 ** 24  # bytes copied at once to hash strided arrays
+
 
 def nottest(f):
     """Decorator to mark a function as not a test"""
@@ -80,13 +88,21 @@ def _sort_keys(x):
 def object_hash(x, h=None):
     """Hash a reasonable python object
 
+    Arrays are streamed through the hash without being copied (strided
+    arrays are copied in chunks). Objects with a ``_get_hash_obj`` method,
+    such as Raw, Epochs and Evoked, are hashed by the content it returns,
+    which leaves out transient attributes (file handles, caches, etc.).
+
     Parameters
     ----------
     x : object
         Object to hash. Can be anything comprised of nested versions of:
-        {dict, list, tuple, ndarray, str, bytes, float, int, None}.
+        {dict, list, tuple, ndarray, str, bytes, float, int, None, numpy
+        scalar, sparse matrix, Raw, Epochs, Evoked}.
     h : hashlib HASH object | None
-        Optional, object to add the hash to. None creates an MD5 hash.
+        Optional, object to add the hash to. None creates an xxHash hash
+        (XXH3 128 bits) if the xxhash module is installed, an MD5 hash
+        otherwise.
 
     Returns
     -------
@@ -94,8 +110,11 @@ def object_hash(x, h=None):
         The digest resulting from the hash.
     """
     if h is None:
-        h = hashlib.md5()
-    if isinstance(x, dict):
+        h = _new_hash()
+    if hasattr(x, '_get_hash_obj'):
+        h.update(str(type(x)).encode('utf-8'))
+        object_hash(x._get_hash_obj(), h)
+    elif isinstance(x, dict):
         keys = _sort_keys(x)
         for key in keys:
             object_hash(key, h)
@@ -111,15 +130,45 @@ def object_hash(x, h=None):
         h.update(str(type(x)).encode('utf-8'))
         h.update(str(x).encode('utf-8'))
     elif isinstance(x, np.ndarray):
-        x = np.asarray(x)
-        h.update(str(x.shape).encode('utf-8'))
-        h.update(str(x.dtype).encode('utf-8'))
-        h.update(x.tostring())
+        _hash_array(np.asarray(x), h)
+    elif isinstance(x, np.generic):
+        object_hash(np.asarray(x), h)
+    elif sparse.isspmatrix(x):
+        h.update(str(type(x)).encode('utf-8'))
+        x = x.tocsr()
+        for xx in (np.array(x.shape), x.data, x.indices, x.indptr):
+            object_hash(xx, h)
     else:
         raise RuntimeError('unsupported type: %s (%s)' % (type(x), x))
     return int(h.hexdigest(), 16)
 
 
+def _hash_array(x, h):
+    """Add the shape, dtype and bytes (in C order) of an array to a hash"""
+    h.update(str(x.shape).encode('utf-8'))
+    h.update(str(x.dtype).encode('utf-8'))
+    if x.dtype.hasobject and x.dtype.names is not None:
+        # the elements would be np.void scalars, hash each field instead
+        for name in x.dtype.names:
+            _hash_array(x[name], h)
+    elif x.dtype.hasobject:
+        for xx in x.ravel():
+            object_hash(xx, h)
+    elif x.flags.c_contiguous:
+        h.update(x.reshape(-1).view(np.uint8))
+    else:
+        n_rows = max(_hash_chunk_size // max(x[0].nbytes, 1), 1)
+        for start in range(0, len(x), n_rows):
+            chunk = np.ascontiguousarray(x[start:start + n_rows])
+            h.update(chunk.reshape(-1).view(np.uint8))
+
+
+def _file_identity(fname):
+    """Identify a file by its name, size and modification time"""
+    stat = os.stat(fname)
+    return (op.abspath(fname), stat.st_size, stat.st_mtime)
+
+
 def object_diff(a, b, pre=''):
     """Compute all differences between two python variables
 
@@ -292,6 +341,35 @@ class _TempDir(str):
         rmtree(self._path, ignore_errors=True)
 
 
+def _make_test_raw(tempdir, ch_types, sfreq, data=None, n_times=1000,
+                   lowpass=None, bads=(), fname='test_raw.fif', **kwargs):
+    """Helper to save synthetic data as a raw file and read it for testing
+
+    The channels are named by type ('EEG 001', 'EOG 001', etc.) and the
+    stim channel is 'STI 014'. The data defaults to white noise of n_times
+    samples. The other keyword arguments are passed to Raw.
+    """
+    from .io import RawArray, Raw
+    from .io.meas_info import create_info
+    ch_names, counts = list(), dict()
+    for ch_type in ch_types:
+        if ch_type == 'stim':
+            ch_names.append('STI 014')
+        else:
+            counts[ch_type] = counts.get(ch_type, 0) + 1
+            ch_names.append('%s %03d' % (ch_type.upper(), counts[ch_type]))
+    if data is None:
+        rng = np.random.RandomState(0)
+        data = rng.randn(len(ch_types), n_times) * 1e-5
+    info = create_info(ch_names, sfreq, ch_types)
+    info['highpass'] = 0.
+    info['lowpass'] = sfreq / 2. if lowpass is None else lowpass
+    info['bads'] = list(bads)
+    fname = op.join(tempdir, fname)
+    RawArray(data, info, verbose=False).save(fname)
+    return Raw(fname, **kwargs)
+
+
 def estimate_rank(data, tol=1e-4, return_singular=False,
                   norm=True, copy=True):
     """Helper to estimate the rank of data
@@ -517,6 +595,13 @@ def verbose(function, *args, **kwargs):
     dec : function
         The decorated function
     """
+    if _profiler is not None:
+        return _profiler._call(_verbose_call, function, args, kwargs)
+    return _verbose_call(function, args, kwargs)
+
+
+def _verbose_call(function, args, kwargs):
+    """Call function with the verbosity level of its verbose argument"""
     arg_names = inspect.getargspec(function).args
     default_level = verbose_level = None
     if len(arg_names) > 0 and arg_names[0] == 'self':
@@ -537,6 +622,221 @@ def verbose(function, *args, **kwargs):
     return function(*args, **kwargs)
 
 
+###############################################################################
+# PROFILING
+
+# The active Profiler, if any. verbose only checks this when it is None, so
+# the decorated functions have no other overhead when not profiling.
+_profiler = None
+
+if hasattr(time, 'process_time'):
+    _cpu_time = time.process_time
+else:
+    _cpu_time = time.clock
+
+
+def _max_rss():
+    """Get the peak resident memory of the process in bytes, 0 if unknown"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on OSX
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+class Profiler(object):
+    """Record the time and memory spent in the functions of MNE-Python
+
+    Within the with block, every call of a function decorated with
+    mne.verbose (most public functions and methods) records its wall
+    time, CPU time and the increase of the peak resident memory of the
+    process during the call. Calls are aggregated by call path, i.e., the
+    chain of decorated functions that led to them, so nested calls are
+    reported separately. Only the calls made by the thread that entered
+    the Profiler are recorded.
+
+    Profiling can also be enabled for a whole session with
+    mne.set_config('MNE_PROFILE', value), which takes effect the next time
+    mne is imported. If value is 'true', the results are logged as a table
+    when Python exits. If it is a file name ending with ".json", they are
+    saved as a Chrome trace.
+
+    Parameters
+    ----------
+    trace : bool
+        If True, keep each call for save_chrome_trace. If False, only the
+        statistics of the calls are kept, which use a bounded amount of
+        memory.
+
+    Examples
+    --------
+    >>> with mne.utils.Profiler() as profiler:  # doctest: +SKIP
+    ...     raw.filter(1., 40.)
+    >>> print(profiler.as_table())  # doctest: +SKIP
+    """
+    def __init__(self, trace=True):
+        self.trace = trace
+        self.stats = dict()
+        self.events = list()
+        self._stack = list()
+        self._thread = None
+        self._t0 = None
+
+    def __enter__(self):
+        global _profiler
+        if _profiler is not None:
+            raise RuntimeError('A Profiler is already active')
+        self._thread = threading.current_thread()
+        self._t0 = time.time()
+        _profiler = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global _profiler
+        _profiler = None
+
+    def _call(self, call, function, args, kwargs):
+        """Call call(function, args, kwargs) and record its resources"""
+        if threading.current_thread() is not self._thread:
+            return call(function, args, kwargs)
+        name = '%s.%s' % (function.__module__,
+                          getattr(function, '__qualname__', function.__name__))
+        self._stack.append(name)
+        path = tuple(self._stack)
+        rss = _max_rss()
+        cpu = _cpu_time()
+        start = time.time()
+        try:
+            return call(function, args, kwargs)
+        finally:
+            wall = time.time() - start
+            cpu = _cpu_time() - cpu
+            rss = _max_rss() - rss
+            self._stack.pop()
+            stats = self.stats.setdefault(path, [0, 0., 0., 0])
+            stats[0] += 1
+            stats[1] += wall
+            stats[2] += cpu
+            stats[3] = max(stats[3], rss)
+            if self.trace:
+                # complete event of the Chrome trace format, times in us
+                self.events.append(dict(name=name, ph='X', pid=os.getpid(),
+                                        tid=0, ts=1e6 * (start - self._t0),
+                                        dur=1e6 * wall,
+                                        args=dict(cpu=cpu,
+                                                  max_rss_delta=rss)))
+
+    def get_stats(self, by='call'):
+        """Get the recorded statistics
+
+        Parameters
+        ----------
+        by : str
+            If 'call', the statistics of each call path, i.e., of each
+            function separately for each chain of decorated functions that
+            called it. If 'function', the statistics of each function,
+            whatever called it (the times of recursive calls are counted
+            once).
+
+        Returns
+        -------
+        stats : dict
+            For each call path (tuple of function names) or function name,
+            a dict with the number of calls ('n_calls'), the total wall and
+            CPU times in seconds ('wall', 'cpu') and the largest increase of
+            the peak resident memory in bytes during a call
+            ('max_rss_delta').
+        """
+        if by not in ('call', 'function'):
+            raise ValueError('by must be "call" or "function", got %s' % by)
+        out = dict()
+        for path, (n_calls, wall, cpu, rss) in self.stats.items():
+            if by == 'function':
+                if path[-1] in path[:-1]:  # recursion, already counted
+                    wall = cpu = 0.
+                path = path[-1]
+            this = out.setdefault(path, dict(n_calls=0, wall=0., cpu=0.,
+                                             max_rss_delta=0))
+            this['n_calls'] += n_calls
+            this['wall'] += wall
+            this['cpu'] += cpu
+            this['max_rss_delta'] = max(this['max_rss_delta'], rss)
+        return out
+
+    def as_table(self, by='call'):
+        """Format the recorded statistics as a table
+
+        Parameters
+        ----------
+        by : str
+            'call' for a call tree, where nested calls are indented under
+            their callers, or 'function' for one row per function, sorted
+            by wall time.
+
+        Returns
+        -------
+        table : str
+            The table.
+        """
+        stats = self.get_stats(by)
+        if by == 'call':
+            keys = sorted(stats)
+            names = ['  ' * (len(path) - 1) + path[-1] for path in keys]
+        else:
+            keys = sorted(stats, key=lambda name: -stats[name]['wall'])
+            names = keys
+        width = max([len(name) for name in names] + [8])
+        row = '%%-%ds %%8s %%10s %%10s %%12s' % width
+        lines = [row % ('Function', 'Calls', 'Wall (s)', 'CPU (s)',
+                        'Peak RSS +')]
+        for key, name in zip(keys, names):
+            this = stats[key]
+            lines.append(row % (name, this['n_calls'], '%0.3f' % this['wall'],
+                                '%0.3f' % this['cpu'],
+                                sizeof_fmt(this['max_rss_delta'])))
+        return '\n'.join(lines)
+
+    def save_chrome_trace(self, fname):
+        """Save the calls in the Chrome trace format
+
+        The file can be opened in the chrome://tracing page of Chrome.
+
+        Parameters
+        ----------
+        fname : str
+            The name of the JSON file.
+        """
+        if not self.trace:
+            raise RuntimeError('The calls are only kept for the Chrome trace '
+                               'if the Profiler is created with trace=True')
+        with open(fname, 'w') as fid:
+            json.dump(dict(traceEvents=self.events), fid)
+
+
+def _start_config_profiler():
+    """Start profiling the session if "MNE_PROFILE" is set"""
+    value = get_config('MNE_PROFILE', 'false')
+    trace = value.endswith('.json')
+    if value.lower() not in ('true', 'false') and not trace:
+        warnings.warn('MNE_PROFILE must be "true", "false" or the name of a '
+                      '.json file, got "%s", not profiling' % value)
+        return
+    if (value.lower() == 'true' or trace) and _profiler is None:
+        profiler = Profiler(trace=trace).__enter__()
+        atexit.register(_stop_config_profiler, profiler, value)
+
+
+def _stop_config_profiler(profiler, value):
+    """Stop profiling the session, and report the results"""
+    profiler.__exit__(None, None, None)
+    if value.endswith('.json'):
+        profiler.save_chrome_trace(value)
+    else:
+        logger.info(profiler.as_table())
+
+
 @nottest
 def slow_test(f):
     """Decorator for slow tests"""
@@ -972,14 +1272,66 @@ def set_memmap_min_size(memmap_min_size):
         mapping for parallel processing, e.g., '1M' for 1 megabyte.
         Use None to disable memmaping of large arrays.
     """
-    if memmap_min_size is not None:
-        if not isinstance(memmap_min_size, string_types):
-            raise ValueError('\'memmap_min_size\' has to be a string.')
-        if memmap_min_size[-1] not in ['K', 'M', 'G']:
+    _check_size_str(memmap_min_size, 'memmap_min_size')
+    set_config('MNE_MEMMAP_MIN_SIZE', memmap_min_size)
+
+
+def set_memory_limit(memory_limit):
+    """Set the memory that MNE-Python may use for parallel processing
+
+    Functions run with n_jobs='auto' estimate the memory each job needs
+    and use as many jobs as fit in memory_limit (and in the number of
+    threads set with set_num_threads). The blocks of data they process
+    at once (e.g., buffer_size='auto') are also sized to fit.
+
+    Parameters
+    ----------
+    memory_limit: str or None
+        The memory limit, e.g., '4G' for 4 gigabytes. Use None to use the
+        available memory (if psutil is installed, no limit otherwise).
+    """
+    _check_size_str(memory_limit, 'memory_limit')
+    set_config('MNE_MEMORY_LIMIT', memory_limit)
+
+
+def _check_size_str(size, name):
+    """Check a human-readable size, e.g., '500M'"""
+    if size is not None:
+        if not isinstance(size, string_types):
+            raise ValueError('\'%s\' has to be a string.' % name)
+        if size[-1] not in ['K', 'M', 'G']:
             raise ValueError('The size has to be given in kilo-, mega-, or '
                              'gigabytes, e.g., 100K, 500M, 1G.')
 
-    set_config('MNE_MEMMAP_MIN_SIZE', memmap_min_size)
+
+def _size_to_bytes(size):
+    """Convert a human-readable size, e.g., '500M', to bytes"""
+    units = dict(K=2 ** 10, M=2 ** 20, G=2 ** 30)
+    if isinstance(size, string_types) and size[-1:] in units:
+        return int(float(size[:-1]) * units[size[-1]])
+    return int(size)
+
+
+def set_num_threads(n_threads):
+    """Set the number of threads MNE-Python may use for parallel processing
+
+    The functions run in parallel with n_jobs use at most n_threads jobs,
+    and each of the n_jobs worker processes limits the threads of its BLAS
+    (and OpenMP) library to n_threads // n_jobs, so that the workers do not
+    oversubscribe the CPUs.
+
+    Parameters
+    ----------
+    n_threads: int or None
+        The number of threads, e.g., the number of cores available. Use
+        None to use all the cores.
+    """
+    if n_threads is not None:
+        if not isinstance(n_threads, int) or n_threads < 1:
+            raise ValueError('n_threads must be a positive int or None, got '
+                             '%s' % (n_threads,))
+        n_threads = str(n_threads)
+    set_config('MNE_NUM_THREADS', n_threads)
 
 
 # List the known configuration values
@@ -992,11 +1344,18 @@ known_config_types = [
     'MNE_DATASETS_SPM_FACE_PATH',
     'MNE_DATASETS_EEGBCI_PATH',
     'MNE_DATASETS_TESTING_PATH',
+    'MNE_FFT_BACKEND',
     'MNE_LOGGING_LEVEL',
     'MNE_USE_CUDA',
+    'MNE_USE_FIFF_INDEX',
     'SUBJECTS_DIR',
     'MNE_CACHE_DIR',
     'MNE_MEMMAP_MIN_SIZE',
+    'MNE_MEMOIZE',
+    'MNE_MEMOIZE_MAX_SIZE',
+    'MNE_MEMORY_LIMIT',
+    'MNE_PROFILE',
+    'MNE_NUM_THREADS',
     'MNE_SKIP_TESTING_DATASET_TESTS',
     'MNE_DATASETS_SPM_FACE_DATASETS_TESTS'
 ]